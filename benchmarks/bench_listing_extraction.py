@@ -0,0 +1,100 @@
+"""
+Benchmarks the precompiled card extraction of eurex_scrapper.extractors against the previous one parsel query per field,
+and checks that both produce the same items.
+
+Pages come from the snapshot archive when one is given (see SNAPSHOT_ENABLED in eurex_scrapper/settings.py),
+otherwise synthetic listing pages are generated.
+
+Usage:
+    python -m benchmarks.bench_listing_extraction --pages 500
+    python -m benchmarks.bench_listing_extraction --snapshots eurex_feature_engineering/output/snapshots
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from scrapy.http import HtmlResponse
+
+from benchmarks.synthetic import listing_page_html
+from eurex_scrapper import extractors
+from eurex_scrapper.snapshots import SnapshotStore
+
+
+def legacy_extract(response) -> List[Dict[str, Any]]:
+    """
+    The per-field parsel extraction the spiders used before, kept here so the baseline does not move
+    """
+    items = []
+    for job in response.xpath('//*[@id="oe-list-container"]/div[3]/div/ul/li'):
+        items.append({
+            "job_type": job.xpath('.//div/div[1]/ul/li[1]/span/text()').get(),
+            "job_country": job.xpath('.//div/div[1]/ul/li[2]/span/text()').get(),
+            "university": job.xpath('.//article/div/ul[1]/li[1]/a/text()').get(),
+            "posted_on": job.xpath('.//article/div/ul[1]/li[2]/text()').get(),
+            "job_title": job.xpath('.//h3/a/span/text()').get(),
+            "job_link": response.urljoin(job.xpath('.//h3/a/@href').get()),
+            "job_description": job.xpath('.//div[@class="ecl-content-block__description"]/p/text()').get(),
+            "department": job.xpath('.//div[contains(@class,"id-Department")]//div[2]/text()').get(),
+            "job_location": job.xpath('.//div[contains(@class,"id-Work-Locations")]//div[2]/text()').get(),
+            "job_field": ' '.join(job.xpath('.//div[contains(@class,"id-Research-Field")]//text()').getall()).strip(),
+            "job_profile": ' '.join(job.xpath('.//div[contains(@class,"id-Researcher-Profile")]//text()').getall()).strip(),
+            "funding_program": job.xpath('.//div[contains(@class,"id-Funding-Programme")]//a/text()').get(),
+            "application_deadline": job.xpath('.//div[contains(@class,"id-Application-Deadline")]//time/text()').get(),
+            "origin_page": response.url
+        })
+    return items
+
+
+def current_extract(response) -> List[Dict[str, Any]]:
+    return list(extractors.extract_cards(response))
+
+
+def load_pages(pages: int, snapshots: str = "") -> List[tuple[str, bytes]]:
+    if snapshots:
+        store = SnapshotStore(snapshots)
+        return [(url, store.body(entry)) for url, entry in sorted(store.latest().items())]
+
+    total_jobs = pages * 10
+    return [
+        (f"https://euraxess.ec.europa.eu/jobs/search?page={page_number}", listing_page_html(page_number, total_jobs).encode("utf-8"))
+        for page_number in range(pages)
+    ]
+
+
+def timed(func: Callable[[HtmlResponse], List[Dict[str, Any]]], pages: List[tuple[str, bytes]]) -> tuple[List[Dict[str, Any]], float]:
+    """
+    Times the parse and the extraction of every page, the responses are rebuilt so no parsed tree is reused between runs
+    """
+    responses = [HtmlResponse(url=url, body=body, encoding="utf-8") for url, body in pages]
+    start = time.perf_counter()
+    items = [item for response in responses for item in func(response)]
+    return items, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500, help="number of synthetic pages, ignored with --snapshots")
+    parser.add_argument("--snapshots", default="", help="a snapshot archive to read the pages from instead")
+    parser.add_argument("--repeat", type=int, default=3, help="the best of this many runs is reported")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.snapshots)
+    print(f"Pages: {len(pages)}")
+
+    results = {}
+    for name, func in [("parsel per field", legacy_extract), ("precompiled", current_extract)]:
+        runs = [timed(func, pages) for _ in range(args.repeat)]
+        items = runs[0][0]
+        seconds = min(run_seconds for _, run_seconds in runs)
+        results[name] = (items, seconds)
+        print(f"{name}: {len(items)} cards in {seconds:.2f}s, {len(items) / seconds:,.0f} cards/s")
+
+    expected, legacy_seconds = results["parsel per field"]
+    actual, seconds = results["precompiled"]
+    assert actual == expected, "the precompiled extraction does not match the parsel extraction"
+    print(f"Speedup {legacy_seconds / seconds:.1f}x (outputs match)")
+
+
+if __name__ == "__main__":
+    main()
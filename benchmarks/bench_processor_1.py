@@ -0,0 +1,111 @@
+"""
+Benchmarks the vectorized TimeExtractors against the previous row-wise implementation
+on a synthetic combined file, and checks that both produce the same output.
+IDTransformations is included as a baseline, it is still row-wise since every job id is distinct.
+
+Usage:
+    python -m benchmarks.bench_processor_1 --rows 2000000
+"""
+
+import argparse
+import time
+import warnings
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from eurex_feature_engineering.transformers.processor_1 import IDTransformations, TimeExtractors
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+
+
+def make_combined(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds a dataframe shaped like jobs_combined.csv with a realistic number of distinct dates,
+    plus a small share of missing and malformed values
+    """
+    rng = np.random.default_rng(seed)
+
+    days = rng.integers(1, 29, rows)
+    months = rng.integers(0, 12, rows)
+    years = rng.integers(2015, 2027, rows)
+    dates = pd.Series([f"{d:02d} {MONTHS[m]} {y}" for d, m, y in zip(days, months, years)], dtype=object)
+
+    posted_on = "Posted on: " + dates
+    deadline = dates + " - 17:00 (Europe/Brussels)"
+
+    broken = rng.random(rows)
+    posted_on[broken < 0.01] = np.nan
+    posted_on[(broken >= 0.01) & (broken < 0.02)] = "Posted on: not a date"
+    deadline[broken < 0.01] = np.nan
+
+    return pd.DataFrame({
+        "job_link": [f"https://euraxess.ec.europa.eu/jobs/{i}" for i in range(rows)],
+        "posted_on": posted_on,
+        "application_deadline": deadline,
+    })
+
+
+def legacy_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Same as IDTransformations, kept here so the baseline does not move if the transformer changes
+    """
+    df["job_id"] = df["job_link"].apply(lambda job_link: job_link.split("/")[-1])
+    return df.set_index("job_id", drop=False)
+
+
+def legacy_times(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The row-wise TimeExtractors this benchmark compares against
+    """
+    def posted(time_str):
+        try:
+            return time_str.split("Posted on: ")[-1]
+        except Exception:
+            return '01 January 1901'
+
+    def deadline(time_str):
+        try:
+            return time_str.split("-")[0].strip()
+        except Exception:
+            return '01 January 1901'
+
+    df['posted_on_date'] = df['posted_on'].apply(posted)
+    df['application_deadline_date'] = df['application_deadline'].apply(deadline)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        df['posted_on_date'] = pd.to_datetime(df['posted_on_date'], infer_datetime_format=True, errors='coerce')
+        df['application_deadline_date'] = pd.to_datetime(df['application_deadline_date'], infer_datetime_format=True, errors='coerce')
+    return df
+
+
+def timed(func: Callable[[pd.DataFrame], pd.DataFrame], df: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+    start = time.perf_counter()
+    out = func(df.copy())
+    return out, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    df = make_combined(args.rows)
+    print(f"Rows: {len(df)}")
+
+    cases = [
+        ("IDTransformations", legacy_ids, IDTransformations()),
+        ("TimeExtractors", legacy_times, TimeExtractors()),
+    ]
+
+    for name, legacy, transformer in cases:
+        expected, legacy_seconds = timed(legacy, df)
+        actual, seconds = timed(transformer, df)
+        pd.testing.assert_frame_equal(actual, expected)
+        print(f"{name}: before {legacy_seconds:.2f}s, now {seconds:.2f}s, speedup {legacy_seconds / seconds:.1f}x (outputs match)")
+
+
+if __name__ == "__main__":
+    main()
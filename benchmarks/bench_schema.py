@@ -0,0 +1,74 @@
+"""
+Memory of the job history read as plain csv (every column a python object string) against the compact schema of
+eurex_feature_engineering/utils/schema.py, and checks that both write the same csv.
+Without --history a synthetic history is transformed and written to a temp file first.
+
+Usage:
+    python -m benchmarks.bench_schema --rows 1000000
+    python -m benchmarks.bench_schema --history eurex_feature_engineering/output/transformed/jobs_combined.csv
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict
+
+import pandas as pd
+
+from benchmarks.synthetic import daily_frame
+from eurex_feature_engineering.utils import schema
+
+
+def write_history(rows: int, path: str) -> None:
+    from eurex_feature_engineering.orchastrator import run_pipeline
+
+    df = run_pipeline(daily_frame(rows)).drop_duplicates(subset="job_id", keep="last")
+    df.to_csv(path, index=False)
+
+
+def print_report(name: str, seconds: float, report: Dict[str, Any]) -> None:
+    print(f"{name}: {report['total_mb']:,} MB for {report['rows']:,} rows, read in {seconds:.2f}s")
+    for column, size in report["columns_mb"].items():
+        print(f"  {column:<28} {size:>10,} MB  {report['dtypes'][column]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows of the synthetic history")
+    parser.add_argument("--history", default=None, help="a history file to measure instead (csv, compressed csv or parquet)")
+    parser.add_argument("--top", type=int, default=8, help="number of columns shown per report")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.history
+    if path is None:
+        tmp_dir = tempfile.mkdtemp(prefix="eurex-bench-")
+        path = os.path.join(tmp_dir, "jobs_combined.csv")
+        write_history(args.rows, path)
+
+    try:
+        start = time.perf_counter()
+        plain = pd.read_csv(path, dtype={schema.ID_COLUMN: str}, parse_dates=schema.DATE_COLUMNS) if not path.endswith(".parquet") else pd.read_parquet(path)
+        plain_seconds = time.perf_counter() - start
+        before = schema.memory_report(plain, top=args.top)
+
+        start = time.perf_counter()
+        compact = schema.read(path)
+        compact_seconds = time.perf_counter() - start
+        after = schema.memory_report(compact, top=args.top)
+
+        print_report("object", plain_seconds, before)
+        print_report("compact", compact_seconds, after)
+        print(f"compact takes {after['total_mb'] / before['total_mb']:.1%} of the memory ({before['total_mb'] / after['total_mb']:.1f}x smaller)")
+
+        assert plain.to_csv(index=False) == compact.to_csv(index=False), "the compact history writes another csv"
+        print("Both write the same csv")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
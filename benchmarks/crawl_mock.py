@@ -0,0 +1,154 @@
+"""
+Runs a spider against the local mock euraxess (see mock_server.py) and reports how the crawl settings did: pages/min and
+the download delay from the crawl metrics, and the job links that are missing or repeated in the output compared to what
+the mock served. The crawl runs in a scratch directory with its own checkpoint, known job links and output, so the ones
+of the repository are left alone.
+
+Run it from the root of the repository:
+    python -m benchmarks.crawl_mock --jobs 500 --latency 0.05 --error-rate 0.05 -s DOWNLOAD_DELAY=0 -s FULL_CRAWL_CONCURRENCY=4
+    python -m benchmarks.crawl_mock --max-rps 5 -s ADAPTIVE_CONCURRENCY_ENABLED=True -s AUTOTHROTTLE_ENABLED=False
+    python -m benchmarks.crawl_mock --drift-every 20 --drift-jobs 3
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from benchmarks import mock_server
+
+SPIDERS = {
+    "vacancy_spider_scrape_all": "eurex_feature_engineering/output/jobs.csv.gz",
+    "recent_date_vacancy_spider": "eurex_feature_engineering/output/daily/jobs_*.csv.gz",
+}
+# fast defaults for a local server, -s overrides them
+DEFAULT_SETTINGS = {
+    "DOWNLOAD_DELAY": "0",
+    "ADAPTIVE_DELAY_MIN": "0",
+    "ADAPTIVE_DELAY_STEP": "0.05",
+    "ADAPTIVE_WINDOW": "5",
+    "AUTOTHROTTLE_START_DELAY": "0.1",
+    "AUTOTHROTTLE_DEBUG": "False",
+    "LOG_LEVEL": "INFO",
+}
+
+
+def crawl(spider: str, base_url: str, work_dir: str, settings: Dict[str, str]) -> float:
+    """
+    Runs `scrapy crawl` in work_dir with the settings of the repository and returns its wall time
+    """
+    repo = os.getcwd()
+    os.makedirs(os.path.join(work_dir, "eurex_scrapper"), exist_ok=True)
+    shutil.copyfile(os.path.join(repo, "eurex_scrapper/config.yaml"), os.path.join(work_dir, "eurex_scrapper/config.yaml"))
+
+    env = {
+        **os.environ,
+        "SCRAPY_SETTINGS_MODULE": "eurex_scrapper.settings",
+        "PYTHONPATH": os.pathsep.join(filter(None, [repo, os.environ.get("PYTHONPATH")])),
+        "EUREX_RUN_ID": "mock",
+    }
+    command = [sys.executable, "-m", "scrapy", "crawl", spider, "-s", f"EURAXESS_BASE_URL={base_url}"]
+    for name, value in {**DEFAULT_SETTINGS, **settings}.items():
+        command += ["-s", f"{name}={value}"]
+
+    start = time.perf_counter()
+    with open(os.path.join(work_dir, "crawl.log"), "w", encoding="utf-8") as log:
+        subprocess.run(command, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT, check=False)
+    return time.perf_counter() - start
+
+
+def read_links(work_dir: str, pattern: str) -> List[str]:
+    links: List[str] = []
+    for path in sorted(glob.glob(os.path.join(work_dir, pattern))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            links += pd.read_csv(f, usecols=["job_link"])["job_link"].tolist()
+    return links
+
+
+def report(
+        spider: str,
+        seconds: float,
+        links: List[str],
+        server_stats: Dict[str, Any],
+        crawl_metrics: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Compares the job links of the output with the jobs the mock served. Jobs posted during the crawl (drift) are
+    expected as well, the full crawl stops at the first repeated link it sees
+    """
+    served = {f"/jobs/{1_000_000 - n}" for n in range(-server_stats["new_jobs"], server_stats["jobs"] - server_stats["new_jobs"])}
+    scraped = [link[link.index("/jobs/"):] for link in links]
+    unique = set(scraped)
+
+    return {
+        "spider": spider,
+        "seconds": round(seconds, 2),
+        "finish_reason": crawl_metrics.get("finish_reason"),
+        "pages": crawl_metrics.get("pages"),
+        "pages_per_min": crawl_metrics.get("pages_per_min"),
+        "download_delay": crawl_metrics.get("download_delay"),
+        "rows": len(scraped),
+        "unique_jobs": len(unique),
+        "repeated_jobs": len(scraped) - len(unique),
+        # the daily spider only scrapes the jobs since the cutoff, so missing jobs are only meaningful for the full crawl
+        "missing_jobs": len(served - unique),
+        "retries": crawl_metrics.get("stats", {}).get("retry/count", 0),
+        # the state of AdaptiveConcurrencyMiddleware at the end of the crawl
+        "adaptive": {name: value for name, value in crawl_metrics.get("stats", {}).items() if name.startswith("adaptive/")},
+        "server": server_stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spider", default="vacancy_spider_scrape_all", choices=sorted(SPIDERS))
+    parser.add_argument("-s", "--set", action="append", default=[], metavar="NAME=VALUE", help="a scrapy setting for the crawl, can be repeated")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory (output, crawl.log and metrics)")
+    parser.add_argument("--out", default=None, help="also write the report to this json file")
+    mock_server.add_arguments(parser)
+    args = parser.parse_args()
+
+    settings = dict(setting.split("=", 1) for setting in args.set)
+    server, state = mock_server.start(mock_server.config_from_args(args))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    work_dir = tempfile.mkdtemp(prefix="eurex-mock-crawl-")
+    print(f"Crawling {base_url} with {args.spider} in {work_dir}")
+
+    try:
+        seconds = crawl(args.spider, base_url, work_dir, settings)
+
+        with urllib.request.urlopen(f"{base_url}/__stats") as response:
+            server_stats = json.load(response)
+
+        metrics_path = os.path.join(work_dir, "eurex_feature_engineering/output/metrics/run_mock.json")
+        crawl_metrics: Dict[str, Any] = {}
+        if os.path.exists(metrics_path):
+            with open(metrics_path, encoding="utf-8") as f:
+                crawl_metrics = json.load(f).get("crawl", {})
+        else:
+            print(f"No crawl metrics were written, see {os.path.join(work_dir, 'crawl.log')}")
+
+        result = report(args.spider, seconds, read_links(work_dir, SPIDERS[args.spider]), server_stats, crawl_metrics)
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+A local stand-in for euraxess that serves the paginated /jobs/search listing from synthetic.py, so the spiders and their
+DOWNLOAD_DELAY, ADAPTIVE_* and concurrency settings can be exercised without touching the real site.
+
+It can add latency, fail a share of the requests with a 500, answer 429 above a request rate and drift: after every
+--drift-every requests, --drift-jobs new jobs are posted at the top of the listing and push every job down, like on
+the real site while a crawl is running (this is what trips the seen_links check of the spiders).
+Point the spiders at it with the EURAXESS_BASE_URL setting. GET /__stats returns the counters of the server as json.
+The detail pages of the listed jobs (/jobs/<id>) carry an ETag and a Last-Modified, and answer conditional requests with a 304.
+
+Usage:
+    python -m benchmarks.mock_server --port 8765 --jobs 3000 --latency 0.05 --error-rate 0.02 --max-rps 20 --drift-every 50
+    scrapy crawl vacancy_spider_scrape_all -s EURAXESS_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Optional
+
+from benchmarks.synthetic import detail_page_html, listing_page_html
+
+DETAIL_PATH = re.compile(r"/jobs/(\d+)")
+# detail pages never change, every one of them has the same Last-Modified and an ETag of its job id
+LAST_MODIFIED = "Mon, 05 Jan 2026 08:00:00 GMT"
+
+
+@dataclass
+class MockConfig:
+    jobs: int = 3000
+    # seconds added to every response, plus up to jitter seconds at random
+    latency: float = 0.0
+    jitter: float = 0.0
+    # share of the listing requests answered with a 500
+    error_rate: float = 0.0
+    # listing requests per second above which the server answers 429, 0 for no limit
+    max_rps: float = 0.0
+    retry_after: int = 1
+    # every drift_every listing requests, drift_jobs new jobs are posted. 0 for a listing that never changes
+    drift_every: int = 0
+    drift_jobs: int = 1
+    seed: int = 0
+
+
+class MockEuraxess:
+    """
+    The state of the server, shared by the handler threads
+    """
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.recent: Deque[float] = deque()
+        self.stats: Dict[str, int] = {
+            "requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "new_jobs": 0, "not_found": 0, "details": 0, "not_modified": 0,
+        }
+
+    def decide(self, listing: bool = True) -> tuple[int, int, float]:
+        """
+        Counts the request and returns (status, new_jobs, delay) for it. Only listing requests make the listing drift
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.stats["requests"] += 1
+
+            if self.config.max_rps:
+                # sliding window of the last second
+                while self.recent and now - self.recent[0] > 1:
+                    self.recent.popleft()
+                if len(self.recent) >= self.config.max_rps:
+                    self.stats["rate_limited"] += 1
+                    return 429, self.stats["new_jobs"], 0.0
+                self.recent.append(now)
+
+            if listing and self.config.drift_every and self.stats["requests"] % self.config.drift_every == 0:
+                self.stats["new_jobs"] += self.config.drift_jobs
+
+            delay = self.config.latency + self.random.random() * self.config.jitter
+
+            if self.random.random() < self.config.error_rate:
+                self.stats["errors"] += 1
+                return 500, self.stats["new_jobs"], delay
+
+            self.stats["ok"] += 1
+            return 200, self.stats["new_jobs"], delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {**self.stats, "jobs": self.config.jobs + self.stats["new_jobs"]}
+
+
+def make_handler(state: MockEuraxess) -> type:
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8", headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            url = urllib.parse.urlparse(self.path)
+
+            if url.path == "/__stats":
+                self.send(200, json.dumps(state.snapshot()).encode("utf-8"), "application/json")
+                return
+
+            detail = DETAIL_PATH.fullmatch(url.path)
+            if detail:
+                self.send_detail(int(detail.group(1)))
+                return
+
+            if url.path != "/jobs/search":
+                with state.lock:
+                    state.stats["not_found"] += 1
+                self.send(404, b"<html><body>Not found</body></html>")
+                return
+
+            status, new_jobs, delay = state.decide()
+            if delay:
+                time.sleep(delay)
+
+            if status == 429:
+                self.send(429, b"<html><body>Too many requests</body></html>", headers={"Retry-After": str(state.config.retry_after)})
+            elif status == 500:
+                self.send(500, b"<html><body>Internal server error</body></html>")
+            else:
+                query = urllib.parse.parse_qs(url.query)
+                page_number = int(query.get("page", ["0"])[0])
+                self.send(200, listing_page_html(page_number, state.config.jobs, new_jobs=new_jobs).encode("utf-8"))
+
+        def send_detail(self, job_id: int) -> None:
+            """
+            A job detail page, or a 304 when the conditional headers of the request match
+            """
+            status, _, delay = state.decide(listing=False)
+            if delay:
+                time.sleep(delay)
+
+            if status == 429:
+                self.send(429, b"<html><body>Too many requests</body></html>", headers={"Retry-After": str(state.config.retry_after)})
+                return
+            if status == 500:
+                self.send(500, b"<html><body>Internal server error</body></html>")
+                return
+
+            etag = f'"job-{job_id}"'
+            validators = {"ETag": etag, "Last-Modified": LAST_MODIFIED, "Cache-Control": "no-cache"}
+            if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                with state.lock:
+                    state.stats["not_modified"] += 1
+                self.send_response(304)
+                for name, value in validators.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+
+            with state.lock:
+                state.stats["details"] += 1
+            self.send(200, detail_page_html(job_id).encode("utf-8"), headers=validators)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def start(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> tuple[ThreadingHTTPServer, MockEuraxess]:
+    """
+    Starts the server in a background thread, port 0 picks a free port (see server.server_address). Stop it with server.shutdown()
+    """
+    state = MockEuraxess(config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockConfig()
+    parser.add_argument("--jobs", type=int, default=defaults.jobs, help="number of jobs in the listing")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="up to this many seconds added at random")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of the requests that get a 500")
+    parser.add_argument("--max-rps", type=float, default=defaults.max_rps, help="requests per second above which a 429 is returned")
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after, help="Retry-After of the 429 responses, in seconds")
+    parser.add_argument("--drift-every", type=int, default=defaults.drift_every, help="post new jobs every this many requests")
+    parser.add_argument("--drift-jobs", type=int, default=defaults.drift_jobs, help="number of jobs posted at every drift")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        jobs=args.jobs,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        max_rps=args.max_rps,
+        retry_after=args.retry_after,
+        drift_every=args.drift_every,
+        drift_jobs=args.drift_jobs,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, _ = start(config_from_args(args), args.host, args.port)
+    print(f"Serving a mock euraxess on http://{args.host}:{server.server_address[1]}, stop it with Ctrl-C")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
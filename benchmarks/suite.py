@@ -0,0 +1,351 @@
+"""
+Offline benchmark suite on synthetic data: the startup of the crawl and merge phases, spider parsing, every transformer, run_pipeline, stack_and_dedup and an
+end-to-end group_and_merge_data (full and incremental). Results are written as json, and a previous result file can be
+given to --compare to print the speedup of every benchmark.
+
+Run it from the root of the repository (the spiders read eurex_scrapper/config.yaml from there):
+    python -m benchmarks.suite
+    python -m benchmarks.suite --rows 10000,1000000,10000000 --pages 2000 --only transformers,merge
+    python -m benchmarks.suite --compare benchmarks/results/<earlier run>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from scrapy.http import HtmlResponse, Request
+
+from benchmarks.synthetic import JOBS_PER_DAY, JOBS_PER_PAGE, daily_frame, listing_page_html
+
+RESULTS_DIR = "benchmarks/results"
+GROUPS = ["startup", "parse", "transformers", "dedup", "merge"]
+# rows per synthetic daily file in the dedup and merge benchmarks
+ROWS_PER_DAY = 10_000
+
+# what entrypoint.py loads before each phase: the crawl loads the spiders and their components in process, the merge
+# imports main and builds the pipeline. Run in a fresh interpreter, they print their import time, peak RSS and whether pandas got loaded
+STARTUP_PHASES = {
+    "crawl": (
+        "import entrypoint\n"
+        "from scrapy.utils.project import get_project_settings\n"
+        "from scrapy.spiderloader import SpiderLoader\n"
+        "loader = SpiderLoader.from_settings(get_project_settings())\n"
+        "[loader.load(name) for name in loader.list()]\n"
+        "import eurex_scrapper.pipelines, eurex_scrapper.middlewares, eurex_scrapper.extensions\n"
+    ),
+    "merge": (
+        "from eurex_feature_engineering.main import group_and_merge_data\n"
+        "from eurex_feature_engineering.orchastrator import get_pipeline\n"
+        "get_pipeline()\n"
+    ),
+}
+# the peak RSS comes from /proc (linux), ru_maxrss keeps the peak of the benchmark process that forked the interpreter
+STARTUP_REPORT = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "exec(sys.argv[1])\n"
+    "seconds = time.perf_counter() - start\n"
+    "status = open('/proc/self/status').read().split('VmHWM:')[1].split()[0]\n"
+    "print(json.dumps({'seconds': seconds, 'peak_rss_kb': int(status), 'pandas': 'pandas' in sys.modules}))\n"
+)
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> tuple[Any, float]:
+    """
+    Runs func repeat times and returns its last result with the best wall time
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def entry(benchmark: str, scale: int, seconds: float, count: int, unit: str, **extra: Any) -> Dict[str, Any]:
+    result = {
+        "benchmark": benchmark,
+        "scale": scale,
+        "seconds": round(seconds, 4),
+        "throughput": round(count / seconds, 1) if seconds else None,
+        "unit": unit,
+        **extra,
+    }
+    print(f"{benchmark} [{scale}]: {seconds:.3f}s, {result['throughput']:,} {unit}")
+    return result
+
+
+def listing_responses(pages: int, meta: Callable[[int], Dict[str, Any]]) -> List[HtmlResponse]:
+    total_jobs = pages * JOBS_PER_PAGE
+    responses = []
+    for page_number in range(pages):
+        url = f"https://euraxess.ec.europa.eu/jobs/search?page={page_number}"
+        body = listing_page_html(page_number % max(1, total_jobs // JOBS_PER_PAGE), total_jobs).encode("utf-8")
+        responses.append(HtmlResponse(url=url, body=body, encoding="utf-8", request=Request(url, meta=meta(page_number))))
+    return responses
+
+
+def bench_startup(repeat: int) -> List[Dict[str, Any]]:
+    """
+    Startup of both phases of entrypoint.py in a fresh interpreter: the import time, the wall time of the process
+    (interpreter start included), its peak RSS and whether it loaded pandas
+    """
+    results = []
+
+    for phase, code in STARTUP_PHASES.items():
+        best: Optional[Dict[str, Any]] = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, "-c", STARTUP_REPORT, code], capture_output=True, text=True, check=True
+            )
+            wall = time.perf_counter() - start
+            # the last line, the phase itself may print
+            report = json.loads(completed.stdout.strip().splitlines()[-1])
+            if best is None or report["seconds"] < best["seconds"]:
+                best = {**report, "wall_seconds": wall}
+
+        results.append(entry(
+            f"startup.{phase}", 1, best["seconds"], 1, "starts/s",
+            wall_seconds=round(best["wall_seconds"], 4),
+            peak_rss_mb=round(best["peak_rss_kb"] / 1024, 1),
+            pandas_loaded=best["pandas"],
+        ))
+        print(f"  peak RSS {results[-1]['peak_rss_mb']} MB, pandas loaded: {best['pandas']}")
+
+    return results
+
+
+def bench_parse(pages: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    Throughput of scrape_vacancy_data of both spiders, including parsing the html (responses are rebuilt for every run)
+    """
+    from eurex_scrapper.spiders.recent_date_vacancy_spider import RecentDateSpider
+    from eurex_scrapper.spiders.vacancy_data_extractor import VacancySpider
+    from eurex_scrapper.utils import PageCheckpoint
+
+    results = []
+    tmp_dir = tempfile.mkdtemp(prefix="eurex-bench-")
+
+    def run_full_crawl() -> int:
+        spider = VacancySpider()
+        spider.checkpoint = PageCheckpoint(os.path.join(tmp_dir, "checkpoint.txt"), defer_writes=True)
+        spider.seen_links = set()
+        cards = 0
+        for response in listing_responses(pages, lambda page_number: {"page_number": page_number}):
+            cards += sum(1 for output in spider.scrape_vacancy_data(response) if isinstance(output, dict))
+        spider.checkpoint.close()
+        return cards
+
+    # the daily spider only accepts jobs posted since the cutoff (today by default), which are the first pages of the listing
+    today_pages = JOBS_PER_DAY // JOBS_PER_PAGE
+
+    def run_daily() -> int:
+        spider = RecentDateSpider()
+        cards = 0
+        for start in range(0, pages, today_pages):
+            seen_links: set = set()
+            responses = listing_responses(min(today_pages, pages - start), lambda page_number: {"page_number": page_number, "seen_links": seen_links})
+            for response in responses:
+                cards += sum(1 for output in spider.scrape_vacancy_data(response) if isinstance(output, dict))
+        return cards
+
+    try:
+        for name, func in [("parse.vacancy_spider_scrape_all", run_full_crawl), ("parse.recent_date_vacancy_spider", run_daily)]:
+            cards, seconds = best_of(repeat, func)
+            results.append(entry(name, pages, seconds, cards, "cards/s", cards=cards))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return results
+
+
+def as_read_from_csv(df: pd.DataFrame, tmp_dir: str) -> pd.DataFrame:
+    """
+    Round trips the frame through a csv file, so the transformers see the same types and NaNs as in a real run
+    """
+    path = os.path.join(tmp_dir, "daily.csv")
+    df.to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def bench_transformers(rows: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    Every registered transformer on its own (in pipeline order, each on the output of the previous ones) and run_pipeline as a whole
+    """
+    from eurex_feature_engineering.orchastrator import get_pipeline, run_pipeline
+
+    tmp_dir = tempfile.mkdtemp(prefix="eurex-bench-")
+    try:
+        df = as_read_from_csv(daily_frame(rows), tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    pipeline = get_pipeline()
+    results = []
+
+    best: Dict[str, Dict[str, Any]] = {}
+    for _ in range(repeat):
+        timings: List[Dict[str, Any]] = []
+        pipeline.run(df.copy(), timings=timings)
+        for timing in timings:
+            if timing["transformer"] not in best or timing["seconds"] < best[timing["transformer"]]["seconds"]:
+                best[timing["transformer"]] = timing
+
+    for name, timing in best.items():
+        results.append(entry(f"transformer.{name}", rows, timing["seconds"], rows, "rows/s", rows_out=timing["rows_out"]))
+
+    out, seconds = best_of(repeat, lambda: run_pipeline(df.copy()))
+    results.append(entry("run_pipeline", rows, seconds, rows, "rows/s", rows_out=len(out)))
+
+    return results
+
+
+def transformed_days(rows: int) -> List[pd.DataFrame]:
+    from eurex_feature_engineering.orchastrator import run_pipeline
+
+    days = max(1, rows // ROWS_PER_DAY)
+    return [run_pipeline(daily_frame(min(ROWS_PER_DAY, rows), seed=day)) for day in range(days)]
+
+
+def bench_dedup(rows: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    stack_and_dedup over a list of transformed daily frames, each with a share of repeated job ids
+    """
+    from eurex_feature_engineering.utils.stack_and_dedup import stack_and_dedup
+
+    days = transformed_days(rows)
+    total = sum(len(day) for day in days)
+
+    merged, seconds = best_of(repeat, lambda: stack_and_dedup(dfs=[day.copy() for day in days], id_column="job_id"))
+    return [entry("stack_and_dedup", rows, seconds, total, "rows/s", files=len(days), rows_out=len(merged))]
+
+
+def bench_merge(rows: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    group_and_merge_data end to end in a scratch directory laid out like the repository: a full run over the daily files,
+    then an incremental run after one more daily file arrives
+    """
+    from eurex_feature_engineering import main
+
+    results = []
+    days = max(1, rows // ROWS_PER_DAY)
+    cwd = os.getcwd()
+    tmp_dir = tempfile.mkdtemp(prefix="eurex-bench-")
+
+    try:
+        os.chdir(tmp_dir)
+        os.makedirs(main.DAILY_DIR)
+        os.makedirs(os.path.dirname(main.COMBINED_FILE))
+        for day in range(days):
+            # the spiders write gzip compressed daily files
+            daily_frame(min(ROWS_PER_DAY, rows), seed=day).to_csv(f"{main.DAILY_DIR}/jobs_day_{day:05d}.csv.gz", index=False)
+
+        def full() -> None:
+            for path in (main.COMBINED_FILE, main.MANIFEST_FILE):
+                if os.path.exists(path):
+                    os.remove(path)
+            main.group_and_merge_data(incremental=True, metrics_dir=None)
+
+        _, seconds = best_of(repeat, full)
+        results.append(entry("group_and_merge_data.full", rows, seconds, days * min(ROWS_PER_DAY, rows), "rows/s", files=days))
+
+        # every repeat gets a daily file the manifest has not seen yet, only the merge itself is timed
+        new_rows = min(ROWS_PER_DAY, rows)
+        new_file = os.path.join(tmp_dir, "new.csv.gz")
+        daily_frame(new_rows, seed=days + 1).to_csv(new_file, index=False)
+
+        timings = []
+        for run in range(repeat):
+            shutil.copyfile(new_file, f"{main.DAILY_DIR}/jobs_day_new_{run}.csv.gz")
+            start = time.perf_counter()
+            main.group_and_merge_data(incremental=True, metrics_dir=None)
+            timings.append(time.perf_counter() - start)
+
+        results.append(entry("group_and_merge_data.incremental", rows, min(timings), new_rows, "rows/s", files=1))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["scale"]): r for r in json.load(f)["results"]}
+
+    print(f"\nCompared to {baseline_path} (speedup > 1 is faster now)")
+    for result in results:
+        before = baseline.get((result["benchmark"], result["scale"]))
+        if before and result["seconds"]:
+            print(f"  {result['benchmark']} [{result['scale']}]: {before['seconds']:.3f}s -> {result['seconds']:.3f}s, {before['seconds'] / result['seconds']:.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000", help="comma separated row counts of the daily data, ex: 10000,1000000,10000000")
+    parser.add_argument("--pages", type=int, default=200, help="number of synthetic listing pages to parse")
+    parser.add_argument("--repeat", type=int, default=3, help="the best of this many runs is reported")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma separated groups to run, out of {GROUPS}")
+    parser.add_argument("--out", default=None, help=f"result file, by default a new file in {RESULTS_DIR}")
+    parser.add_argument("--compare", default=None, help="a previous result file to compare with")
+    args = parser.parse_args()
+
+    scales = [int(rows) for rows in args.rows.split(",")]
+    groups = args.only.split(",")
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"Unknown groups {sorted(unknown)}, expected some of {GROUPS}")
+
+    results: List[Dict[str, Any]] = []
+    if "startup" in groups:
+        results += bench_startup(args.repeat)
+    if "parse" in groups:
+        results += bench_parse(args.pages, args.repeat)
+    for rows in scales:
+        if "transformers" in groups:
+            results += bench_transformers(rows, args.repeat)
+        if "dedup" in groups:
+            results += bench_dedup(rows, args.repeat)
+        if "merge" in groups:
+            results += bench_merge(rows, args.repeat)
+
+    created_at = datetime.now()
+    out = args.out or os.path.join(RESULTS_DIR, f"{created_at.strftime('%Y-%m-%dT%H-%M-%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": created_at.isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {"rows": scales, "pages": args.pages, "repeat": args.repeat, "groups": groups},
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
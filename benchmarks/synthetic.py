@@ -0,0 +1,178 @@
+"""
+Synthetic euraxess data for the benchmarks, so they run offline and at any scale.
+
+The listing pages follow the structure the spiders read under //*[@id="oe-list-container"], including cards with
+missing optional fields, and the daily frames have the columns the spiders write.
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+COUNTRIES = ["Germany", "France", "Spain", "Italy", "Netherlands", "Belgium", "Austria", "Portugal", "Sweden", "Poland"]
+FIELDS = ["Physics", "Chemistry", "Computer science", "Biological sciences", "Engineering", "Mathematics", "Medical sciences"]
+PROFILES = ["First Stage Researcher (R1)", "Recognised Researcher (R2)", "Established Researcher (R3)", "Leading Researcher (R4)"]
+PROGRAMMES = ["HE / MSCA", "Horizon Europe", "ERC", "Not funded by a EU programme"]
+JOB_TYPES = ["Job", "Hosting"]
+WORDS = ["machine", "learning", "quantum", "materials", "climate", "protein", "network", "data", "imaging", "theory",
+         "energy", "sensor", "robotics", "genomics", "catalysis", "optics", "statistics", "ecology"]
+
+# jobs posted per day, the listing is sorted by posting date, newest first
+JOBS_PER_DAY = 120
+JOBS_PER_PAGE = 10
+
+
+def job_date(job_number: int, today: Optional[date] = None) -> date:
+    # negative job numbers are jobs posted after the listing was generated (see listing_page_html), so today
+    return (today or date.today()) - timedelta(days=max(0, job_number) // JOBS_PER_DAY)
+
+
+def card_html(job_number: int, today: Optional[date] = None) -> str:
+    """
+    One <li> job card. Every 7th card has no department and every 11th no funding programme, like on the real site
+    """
+    rng = random.Random(job_number)
+    posted = job_date(job_number, today)
+    deadline = posted + timedelta(days=rng.randint(14, 90))
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+
+    department = "" if job_number % 7 == 0 else f'''
+        <div class="ecl-description-list__item id-Department"><div class="ecl-description-list__term">Department</div><div class="ecl-description-list__definition">Department of {rng.choice(WORDS).capitalize()}</div></div>'''
+    funding = "" if job_number % 11 == 0 else f'''
+        <div class="ecl-description-list__item id-Funding-Programme"><div class="ecl-description-list__term">Funding Programme</div><div class="ecl-description-list__definition"><a href="/funding">{rng.choice(PROGRAMMES)}</a></div></div>'''
+
+    return f'''
+<li class="ecl-u-mb-l">
+  <div class="ecl-content-item">
+    <div class="ecl-content-block__primary-meta-container">
+      <ul class="ecl-content-block__primary-meta-container"><li class="ecl-content-block__primary-meta-item"><span>{rng.choice(JOB_TYPES)}</span></li><li class="ecl-content-block__primary-meta-item"><span>{rng.choice(COUNTRIES)}</span></li></ul>
+    </div>
+  </div>
+  <article class="ecl-content-block">
+    <div class="ecl-content-block__secondary-meta">
+      <ul class="ecl-content-block__secondary-meta-container"><li><a href="/partnering/organisations/{job_number % 997}">University {job_number % 997}</a></li><li>Posted on: {posted.day:02d} {posted.strftime("%B %Y")}</li></ul>
+    </div>
+    <h3 class="ecl-content-block__title"><a href="/jobs/{1_000_000 - job_number}"><span>{title}</span></a></h3>
+    <div class="ecl-content-block__description"><p>{description}</p></div>
+    <div class="ecl-description-list">{department}
+      <div class="ecl-description-list__item id-Work-Locations"><div class="ecl-description-list__term">Work Locations</div><div class="ecl-description-list__definition">Number of offers: 1, {rng.choice(COUNTRIES)}</div></div>
+      <div class="ecl-description-list__item id-Research-Field"><div class="ecl-description-list__term">Research Field</div><div class="ecl-description-list__definition"><span>{rng.choice(FIELDS)}</span> <span>{rng.choice(FIELDS)}</span></div></div>
+      <div class="ecl-description-list__item id-Researcher-Profile"><div class="ecl-description-list__term">Researcher Profile</div><div class="ecl-description-list__definition">{rng.choice(PROFILES)}</div></div>{funding}
+      <div class="ecl-description-list__item id-Application-Deadline"><div class="ecl-description-list__term">Application Deadline</div><div class="ecl-description-list__definition"><time>{deadline.day:02d} {deadline.strftime("%B %Y")} - 17:00 (Europe/Brussels)</time></div></div>
+    </div>
+  </article>
+</li>'''
+
+
+def listing_page_html(page_number: int, total_jobs: int, today: Optional[date] = None, new_jobs: int = 0) -> str:
+    """
+    A full listing page, with the pagination the full-history spider reads its final page number from.
+    new_jobs jobs posted since are listed first (newest first, as job numbers -1, -2, ...) and push every other job further down
+    """
+    total_jobs += new_jobs
+    first = page_number * JOBS_PER_PAGE
+    job_cards = "".join(card_html(n - new_jobs, today) for n in range(first, min(first + JOBS_PER_PAGE, total_jobs)))
+    last_page = max(0, (total_jobs - 1) // JOBS_PER_PAGE)
+    pagination = "".join(f'<li class="ecl-pagination__item"><a href="?page={n}">{n}</a></li>' for n in [1, 2, 3, 4, 5, 6, last_page])
+
+    return f'''<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Jobs | EURAXESS</title></head>
+<body><main>
+<div id="oe-list-container">
+  <div class="ecl-u-mb-l"><h2>Search results</h2></div>
+  <div class="ecl-u-mb-l"><p>{total_jobs} results</p></div>
+  <div class="ecl-row"><div class="ecl-col-12">
+    <ul class="ecl-unordered-list ecl-unordered-list--no-bullet">{job_cards}
+    </ul>
+    <nav class="ecl-pagination"><ul class="ecl-pagination__list">{pagination}</ul></nav>
+  </div></div>
+</div>
+</main></body></html>'''
+
+
+def detail_page_html(job_id: int) -> str:
+    """
+    A job detail page with the sections the detail spider reads (see DETAIL_SECTIONS in eurex_scrapper/extractors.py).
+    Every 5th job has no additional information and every 3rd no contact e-mail
+    """
+    rng = random.Random(-job_id)
+    paragraphs = "".join(f"<p>{' '.join(rng.choice(WORDS) for _ in range(rng.randint(30, 80)))}</p>" for _ in range(rng.randint(1, 4)))
+    requirements = "".join(f"<li>{rng.choice(FIELDS)}: {' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))}</li>" for _ in range(rng.randint(2, 6)))
+    additional = "" if job_id % 5 == 0 else f'''
+  <h2 class="ecl-u-type-heading-2">Additional Information</h2>
+  <div class="ecl"><p>{' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))}</p></div>'''
+    contact = "" if job_id % 3 == 0 else f'<p>E-mail: <a href="mailto:jobs{job_id}@university{job_id % 997}.eu">jobs{job_id}@university{job_id % 997}.eu</a></p>'
+
+    return f'''<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Job {job_id} | EURAXESS</title></head>
+<body><main><article>
+  <h1>{" ".join(rng.choice(WORDS) for _ in range(5)).capitalize()}</h1>
+  <h2 class="ecl-u-type-heading-2">Offer Description</h2>
+  <div class="ecl">{paragraphs}</div>
+  <h2 class="ecl-u-type-heading-2">Requirements</h2>
+  <div class="ecl"><ul>{requirements}</ul></div>{additional}
+  <h2 class="ecl-u-type-heading-2">Where to apply</h2>
+  <div class="ecl">{contact}<p>Website: <a href="https://university{job_id % 997}.eu/apply">apply online</a></p></div>
+</article></main></body></html>'''
+
+
+def _date_strings(today: date, offsets: np.ndarray) -> np.ndarray:
+    """
+    'DD Month YYYY' of today minus every offset (in days), formatted once per distinct offset
+    """
+    distinct, codes = np.unique(offsets, return_inverse=True)
+    formatted = np.array([(today - timedelta(days=int(offset))).strftime("%d %B %Y") for offset in distinct], dtype=object)
+    return formatted[codes]
+
+
+def daily_frame(rows: int, seed: int = 0, today: Optional[date] = None, duplicate_share: float = 0.1) -> pd.DataFrame:
+    """
+    A frame shaped like a daily csv written by the spiders (after VacancyCleanerPipeline), generated with numpy so that
+    millions of rows take seconds. A share of the rows repeat earlier job ids, like jobs that are listed on several days
+    """
+    today = today or date.today()
+    rng = np.random.default_rng(seed)
+
+    positions = np.arange(rows)
+    job_numbers = seed * 10_000_000 + positions
+    repeats = rng.random(rows) < duplicate_share
+    repeats[0] = False
+    job_numbers[repeats] = seed * 10_000_000 + (rng.random(repeats.sum()) * positions[repeats]).astype(np.int64)
+
+    posted_offsets = (job_numbers % (JOBS_PER_DAY * 3650)) // JOBS_PER_DAY
+    deadline_offsets = posted_offsets - rng.integers(14, 91, rows)
+
+    titles = np.array([" ".join(rng.choice(WORDS, 5)).capitalize() for _ in range(1000)], dtype=object)
+    descriptions = np.array([" ".join(rng.choice(WORDS, 30)) for _ in range(1000)], dtype=object)
+    job_ids = pd.Series(job_numbers).astype(str)
+
+    def pick(pool: List[str], template: str = "{}") -> np.ndarray:
+        return np.array([template.format(value) for value in pool], dtype=object)[rng.integers(0, len(pool), rows)]
+
+    return pd.DataFrame({
+        "job_type": pick(JOB_TYPES),
+        "job_country": pick(COUNTRIES),
+        "university": "University " + pd.Series(job_numbers % 997).astype(str),
+        "posted_on": "Posted on: " + pd.Series(_date_strings(today, posted_offsets)),
+        "job_title": titles[rng.integers(0, len(titles), rows)],
+        "job_link": "https://euraxess.ec.europa.eu/jobs/" + job_ids,
+        "job_description": descriptions[rng.integers(0, len(descriptions), rows)],
+        "department": pick([word.capitalize() for word in WORDS], "Department of {}"),
+        "job_location": pick(COUNTRIES, "Number of offers: 1 {}"),
+        "job_field": pick(FIELDS, "Research Field {}"),
+        "job_profile": pick(PROFILES, "Researcher Profile {}"),
+        "funding_program": pick(PROGRAMMES),
+        "application_deadline": pd.Series(_date_strings(today, deadline_offsets)) + " - 17:00 (Europe/Brussels)",
+        "origin_page": "https://euraxess.ec.europa.eu/jobs/search?page=" + pd.Series(job_numbers // JOBS_PER_PAGE).astype(str),
+    })
+
+
+def daily_rows(rows: int, seed: int = 0, today: Optional[date] = None, duplicate_share: float = 0.1) -> List[Dict[str, str]]:
+    """
+    The rows of daily_frame as dicts, like the items the spiders yield
+    """
+    return daily_frame(rows, seed, today, duplicate_share).to_dict("records")
@@ -1,6 +1,9 @@
+import os
+import subprocess
 import sys
+from typing import Any, Dict, Optional
 from scrapy.cmdline import execute
-from eurex_feature_engineering.main import group_and_merge_data
+from eurex_scrapper.utils import read_config
 
 def run_spider(
         spider_name: str
@@ -12,17 +15,85 @@ def run_spider(
     print(f"Running spider : {spider_name}")
     execute(['scrapy','crawl',spider_name])
 
+def run_spider_streaming(
+        spider_name: str,
+        keep_daily_file: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Runs the spider in this process with StreamingHandoffPipeline on, and returns what it handed over for
+    group_and_merge_data(streamed=...): the transformed batches, the daily file they were also written to and their
+    metrics. None if the handoff failed.
+
+    The daily file is written even without keep_daily_file, so that a merge that fails does not lose the day's crawl.
+    It is then returned as the spill, to be removed once the merge has committed the batches
+    """
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from eurex_scrapper.signals import stream_closed
+
+    print(f"Running spider : {spider_name} (combined run)")
+
+    settings = get_project_settings()
+    settings.set("STREAM_HANDOFF_ENABLED", True, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spider_name)
+
+    handoff: Dict[str, Any] = {}
+    crawler.signals.connect(lambda **kwargs: handoff.update(kwargs), signal=stream_closed, weak=False)
+
+    process.crawl(crawler)
+    process.start()
+
+    if not handoff or handoff["error"]:
+        print(f"Combined run failed ({handoff.get('error', 'the spider did not close')}), merging from the daily files")
+        return None
+
+    # the daily file the feed wrote next to the handoff, the merge does not read it again
+    daily_files = [uri for uri in crawler.settings.getdict("FEEDS") if os.path.exists(uri)]
+
+    return {
+        "batches": handoff["batches"],
+        "file": os.path.basename(daily_files[0]) if daily_files else None,
+        "metrics": handoff["metrics"],
+        "spill": daily_files[0] if daily_files and not keep_daily_file else None,
+    }
+
 if __name__ == '__main__':
     spider = "recent_date_vacancy_spider"
+    config = read_config()
+    streamed = None
 
-    try:
-        run_spider(
-            spider_name=spider
+    if config.get("combined_run", False):
+        streamed = run_spider_streaming(
+            spider_name=spider,
+            keep_daily_file=config.get("keep_daily_file", True)
             )
-    except SystemExit as e:
-        if e.code != 0:
-            sys.exit(e.code)
+    else:
+        try:
+            run_spider(
+                spider_name=spider
+                )
+        except SystemExit as e:
+            if e.code != 0:
+                sys.exit(e.code)
     
+    # optional, fetches the detail pages of the new jobs before they are merged. In its own process, the reactor of the
+    # crawl above cannot be started again
+    if config.get("enrich_details", False):
+        print("Running spider : job_detail_spider")
+        result = subprocess.run([sys.executable, "-m", "scrapy", "crawl", "job_detail_spider"])
+        if result.returncode != 0:
+            print(f"Detail enrichment failed with exit code {result.returncode}, merging without it")
+
     print("Running processing")
 
-    group_and_merge_data()
\ No newline at end of file
+    # imported here and not at the top, so that pandas and the transformers are not loaded while the spiders crawl
+    from eurex_feature_engineering.main import group_and_merge_data
+
+    group_and_merge_data(streamed=streamed)
+
+    # the merge has committed the day's jobs to the history, the daily file was only kept until then
+    if streamed and streamed["spill"]:
+        print(f"Removing {streamed['spill']}, keep_daily_file is off")
+        os.remove(streamed["spill"])
@@ -0,0 +1,88 @@
+"""
+This module keeps track of which daily files have already been transformed and merged,
+so that group_and_merge_data only has to touch new or changed files. Only the standard library is used,
+job_detail_spider reads the manifest as well
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List
+
+MANIFEST_VERSION = 1
+
+
+def file_signature(path: str) -> Dict[str, Any]:
+    """
+    Returns the size, mtime and content hash of a file
+    """
+    stat = os.stat(path)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": digest.hexdigest(),
+    }
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """
+    Loads the manifest from disk, an empty manifest is returned if there is none or if it is unreadable
+    """
+    empty = {"version": MANIFEST_VERSION, "transformer_fingerprint": None, "files": {}}
+
+    if not os.path.exists(path):
+        return empty
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read manifest {path} : {e}")
+        return empty
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any], path: str) -> None:
+    """
+    Writes the manifest to a temp file first and swaps it in, so that a crash never leaves a half written manifest
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_unchanged(entry: Dict[str, Any], path: str) -> bool:
+    """
+    Checks a file against its manifest entry. Size and mtime are checked first so the file is only hashed when they differ
+    """
+    if not entry:
+        return False
+
+    stat = os.stat(path)
+    if stat.st_size == entry.get("size") and stat.st_mtime == entry.get("mtime"):
+        return True
+
+    # mtime can change without the content changing (ex: copied files), fall back to the hash
+    return stat.st_size == entry.get("size") and file_signature(path)["sha256"] == entry.get("sha256")
+
+
+def pending_files(manifest: Dict[str, Any], directory: str, files: List[str]) -> List[str]:
+    """
+    Returns the files from the directory that are new or have changed since they were last processed
+    """
+    known = manifest.get("files", {})
+    return [
+        file for file in files
+        if not is_unchanged(known.get(file, {}), os.path.join(directory, file))
+    ]
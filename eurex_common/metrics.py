@@ -0,0 +1,61 @@
+"""
+The metrics file of a run, shared by the crawl and the merge: each of them writes its own section of the file of the same
+run. A run is identified by the EUREX_RUN_ID environment variable when it is set (to tie a separate `scrapy crawl` and
+merge together), otherwise by the start time of the process. Only the standard library is used.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+METRICS_DIR = "eurex_feature_engineering/output/metrics"
+RUN_ID = os.environ.get("EUREX_RUN_ID") or datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    The highest resident memory of this process so far, in MB. None where the resource module is missing (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_file(metrics_dir: str = METRICS_DIR, run_id: Optional[str] = None) -> str:
+    return os.path.join(metrics_dir, f"run_{run_id or RUN_ID}.json")
+
+
+def write_section(
+        section: str,
+        data: Any,
+        metrics_dir: str = METRICS_DIR,
+        run_id: Optional[str] = None
+) -> str:
+    """
+    Sets one section of the metrics file of the run, the other sections are kept. Returns the path of the file
+    """
+    path = run_file(metrics_dir, run_id)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    document: Dict[str, Any] = {"run_id": run_id or RUN_ID}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+
+    document[section] = data
+    document["updated_at"] = datetime.now().isoformat(timespec="seconds")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # default=str for the datetimes in the scrapy stats
+        json.dump(document, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+    return path
@@ -4,18 +4,25 @@ This class is an abstract class and should not be used directly.
 This is to ensure an modular approch to feature engineering and data processing
 """
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, List, Optional
 
 class BaseTransformer(ABC):
 
     registry: list[type] = []
     is_transformation = False
 
+    # The columns the transformer reads and the columns it writes. When both are declared the orchestrator only hands
+    # it the input columns, runs it alongside the transformers it does not depend on and copies the outputs back, so it
+    # must keep the rows of the dataframe (it may set the index). Undeclared transformers get the whole dataframe.
+    inputs: Optional[List[str]] = None
+    outputs: Optional[List[str]] = None
+    # Bump it when the outputs change. A declared transformer whose version the history was already transformed with
+    # is skipped on the history, see Incremental Runs in the README
+    version: Optional[str] = None
+
     def __init_subclass__(cls,**kwargs) -> None:
         super().__init_subclass__(**kwargs)
 
-        print(f"Registering transformer: {cls.__name__}")
-        
         if getattr(cls, "is_transformation", True):
             BaseTransformer.registry.append(cls)
 
@@ -26,5 +33,9 @@ class BaseTransformer(ABC):
         """
         ...
     
+    @classmethod
+    def is_declared(cls) -> bool:
+        return cls.inputs is not None and cls.outputs is not None
+
     def __call__(self, df) -> Any:
         return self.process(df)
\ No newline at end of file
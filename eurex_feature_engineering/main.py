@@ -4,50 +4,435 @@ Will primarily focus on providing the data to the pipeline and calling the pipel
 """
 
 import pandas as pd
-from eurex_feature_engineering.orchastrator import run_pipeline
-from typing import Any
+from eurex_feature_engineering.orchastrator import run_pipeline, get_pipeline
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import itertools
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from eurex_feature_engineering.utils.stack_and_dedup import stack_and_dedup
+from eurex_feature_engineering.utils.feed_reader import is_feed_file, read_feed, read_feed_chunks
+from eurex_feature_engineering.utils import parquet_store
+from eurex_feature_engineering.utils.job_store import JobStore
+from eurex_feature_engineering.utils.rollups import DIMENSIONS as ROLLUP_DIMENSIONS, RollupStore
+from eurex_feature_engineering.utils.search import COLUMNS as SEARCH_INDEX_COLUMNS, SEARCH_FILE, SearchIndex
+from eurex_feature_engineering.utils.details import DETAILS_DIR, enrich, load_details
+from eurex_feature_engineering.utils import schema
+from eurex_feature_engineering.utils.metrics import PhaseTimer, summarize_transformers
+from eurex_feature_engineering.utils.manifest import transformer_fingerprint, transformer_versions
+from eurex_common.metrics import METRICS_DIR, peak_rss_mb, write_section
+from eurex_common.manifest import file_signature, load_manifest, pending_files, save_manifest
 
+DAILY_DIR = "eurex_feature_engineering/output/daily"
+COMBINED_FILE = "eurex_feature_engineering/output/transformed/jobs_combined.csv"
+MANIFEST_FILE = "eurex_feature_engineering/output/transformed/manifest.json"
+PARQUET_DIR = "eurex_feature_engineering/output/transformed/jobs_history"
+SQLITE_FILE = "eurex_feature_engineering/output/transformed/jobs.sqlite"
+ROLLUPS_FILE = "eurex_feature_engineering/output/transformed/rollups.sqlite"
+# output of the full crawl, the first history when there is no combined file yet
+FULL_CRAWL_FILES = [
+    "eurex_feature_engineering/output/jobs.csv.gz",
+    "eurex_feature_engineering/output/jobs.csv.zst",
+    "eurex_feature_engineering/output/jobs.parquet",
+    "eurex_feature_engineering/output/jobs.csv",
+]
+
+# columns that TimeExtractors derives, parsed back to dates when the combined file is not re-transformed
+DATE_COLUMNS = ["posted_on_date", "application_deadline_date"]
+# job ids are digits, read as numbers they would not match the job ids of the daily files when deduplicating
+HISTORY_DTYPES = {"job_id": str}
+# the columns the rollups are computed from
+ROLLUP_COLUMNS = ["job_id", *DATE_COLUMNS, *ROLLUP_DIMENSIONS]
+# the columns the search index is built from
+SEARCH_COLUMNS = ["job_id", *SEARCH_INDEX_COLUMNS]
+
+
+def transform_daily_file(
+        path: str
+) -> Tuple[Optional[pd.DataFrame], Optional[str], Dict[str, Any]]:
+    """
+    Reads one daily file (csv, compressed csv or parquet) and runs it through the pipeline.
+    Errors are returned instead of raised, so that one bad file does not take down the whole pool.
+    The metrics of the file (read and transform time, rows, peak RSS of the process, timings of every transformer) come back with it
+    """
+    file_metrics: Dict[str, Any] = {"file": os.path.basename(path), "pid": os.getpid(), "transformers": []}
+    start = time.perf_counter()
+
+    try:
+        df = read_feed(path, encoding="utf-8")
+        file_metrics["read_seconds"] = round(time.perf_counter() - start, 4)
+        file_metrics["rows_in"] = len(df)
+
+        df = run_pipeline(df, timings=file_metrics["transformers"])
+        file_metrics["rows_out"] = len(df)
+        return df, None, file_metrics
+    except Exception as e:
+        return None, str(e), file_metrics
+    finally:
+        file_metrics["seconds"] = round(time.perf_counter() - start, 4)
+        file_metrics["peak_rss_mb"] = peak_rss_mb()
+
+
+def transform_daily_files(
+        files: List[str],
+        workers: int = 1
+) -> List[Tuple[str, Optional[pd.DataFrame], Optional[str], Dict[str, Any]]]:
+    """
+    Transforms the daily files and returns (file, dataframe, error, metrics) in the same order as the files.
+    With more than one worker the files are spread over a process pool, every worker builds its own pipeline once
+    """
+    paths = [f"{DAILY_DIR}/{file}" for file in files]
+
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+            results = list(executor.map(transform_daily_file, paths))
+    else:
+        results = [transform_daily_file(path) for path in paths]
+
+    return [(file, df, error, file_metrics) for file, (df, error, file_metrics) in zip(files, results)]
+
+
+def read_history_chunks(
+        storage: str,
+        job_store: Optional[JobStore],
+        columns: List[str]
+) -> Iterable[pd.DataFrame]:
+    """
+    Reads the columns of the stored history (those it has) one chunk at a time
+    """
+    if storage == "parquet":
+        if parquet_store.exists(PARQUET_DIR):
+            history = parquet_store.read(PARQUET_DIR)
+            yield history[[column for column in columns if column in history.columns]]
+    elif storage == "sqlite":
+        yield from job_store.read_chunks(columns=[column for column in columns if column in job_store.columns])
+    elif os.path.exists(COMBINED_FILE):
+        yield from read_feed_chunks([COMBINED_FILE], encoding="utf-8", dtype=HISTORY_DTYPES, usecols=lambda column: column in columns)
+
+
+def update_rollups(
+        rollups_file: str,
+        merged_df: Optional[pd.DataFrame],
+        new_datasets: List[pd.DataFrame],
+        storage: str = "csv",
+        job_store: Optional[JobStore] = None
+) -> int:
+    """
+    Adds the jobs a merge brought in (new_datasets) to the rollups, the first time the whole history is counted: the
+    merged history when the merge held it (merged_df), the stored history otherwise. Returns the number of jobs added
+    """
+    with RollupStore(rollups_file) as rollups:
+        if len(rollups) == 0:
+            chunks = [merged_df] if merged_df is not None else read_history_chunks(storage, job_store, ROLLUP_COLUMNS)
+        else:
+            chunks = new_datasets
+        added = sum(rollups.update(chunk) for chunk in chunks)
+
+    print(f"Added {added} jobs to the rollups")
+    return added
+
+
+def update_search_index(
+        search_file: str,
+        merged_df: Optional[pd.DataFrame],
+        new_datasets: List[pd.DataFrame],
+        rerun_history: bool,
+        storage: str = "csv",
+        job_store: Optional[JobStore] = None
+) -> int:
+    """
+    Adds the jobs a merge brought in (new_datasets) to the search index. The first time, and when the history was
+    re-transformed, the whole history goes through it and only the jobs that are new or whose values changed are
+    written. Returns the number of jobs written
+    """
+    with SearchIndex(search_file) as index:
+        if len(index) == 0 or rerun_history:
+            chunks = [merged_df] if merged_df is not None else read_history_chunks(storage, job_store, SEARCH_COLUMNS)
+            indexed = sum(index.update(chunk) for chunk in chunks)
+        else:
+            # the history keeps the jobs it already has as they are, so does the index
+            indexed = sum(index.update(chunk, keep_existing=True) for chunk in new_datasets)
+
+    print(f"Indexed {indexed} jobs for search")
+    return indexed
+
+
+def group_and_merge_data(
+        incremental: bool = False,
+        workers: int = 1,
+        storage: str = "csv",
+        export_csv: bool = False,
+        metrics_dir: Optional[str] = METRICS_DIR,
+        details_dir: Optional[str] = DETAILS_DIR,
+        streamed: Optional[Dict[str, Any]] = None,
+        compact_dtypes: bool = True,
+        rollups_file: Optional[str] = ROLLUPS_FILE,
+        search_file: Optional[str] = SEARCH_FILE
+) -> None:
+    """
+    Transforms the daily files and merges them with the previously transformed history.
+
+    With incremental=True a manifest of the processed daily files is kept next to the combined file,
+    only new or changed daily files are transformed and the history is re-transformed only when the
+    registered transformers have changed since the last run.
+
+    With workers > 1 the daily files are read and transformed in parallel by a process pool.
+
+    storage="parquet" keeps the history in a parquet dataset partitioned by posting month (needs pyarrow) instead of
+    jobs_combined.csv. In incremental runs only the months that receive new job ids are rewritten.
+    storage="sqlite" keeps it in a sqlite file keyed on job_id, incremental runs only insert the new job ids.
+    With export_csv jobs_combined.csv is also written from the parquet dataset or the sqlite store. That rewrites the whole
+    history, so it is off by default and a run only costs time for the rows it adds. The spiders read the job links from
+    the store itself (HISTORY_FILES in eurex_scrapper/settings.py), they do not need the csv.
+
+    The detail pages job_detail_spider fetched for the new jobs (in details_dir) are joined onto the daily files on job_id,
+    and onto the history when it is re-transformed. Pass details_dir=None to leave them out.
+
+    streamed hands over the day's jobs the crawl already transformed in memory (see StreamingHandoffPipeline in
+    eurex_scrapper/pipelines.py): {"batches": [...], "file": <the daily file they were also written to, or None>, "metrics": {...}}.
+    They are merged as the latest daily file, and the daily file itself is neither read nor transformed again.
+
+    With compact_dtypes the frames are kept in the compact schema of utils/schema.py while they are merged (arrow backed
+    strings and dates as they come in). The files written are the same either way.
+
+    The jobs that arrive in the run are added to the rollups in rollups_file (see utils/rollups.py), the first time the
+    whole history is counted. Pass rollups_file=None to leave them out.
+
+    The full-text index in search_file (see utils/search.py) gets the new jobs of the run, and the jobs that changed when
+    the history is re-transformed. The first time the whole history is indexed. Pass search_file=None to leave it out.
+
+    The metrics of the run (every daily file and transformer, the read/concat/dedup/write phases) are written to the 'merge'
+    section of the run's metrics file in metrics_dir, pass metrics_dir=None to skip them.
+    """
+
+    if storage not in ("csv", "parquet", "sqlite"):
+        raise ValueError(f"Unknown storage {storage}, expected 'csv', 'parquet' or 'sqlite'")
+
+    # files the spiders are still writing (.part) are skipped
+    daily_files = sorted(file for file in os.listdir(DAILY_DIR) if is_feed_file(file))
+    streamed_file = streamed.get("file") if streamed else None
+    if streamed_file in daily_files:
+        daily_files.remove(streamed_file)
 
-def group_and_merge_data() -> None:
-    
-    daily_files = os.listdir("eurex_feature_engineering/output/daily")
-    
     previous_transformed_file = next(
                                 (p for p in [
-                                    "eurex_feature_engineering/output/transformed/jobs_combined.csv",
-                                    "eurex_feature_engineering/output/jobs.csv",
+                                    COMBINED_FILE,
+                                    *FULL_CRAWL_FILES,
                                 ]
                                 if os.path.exists(p)
                                 ),
                                 None
                             )
-    
+
+    job_store = JobStore(SQLITE_FILE, id_column="job_id") if storage == "sqlite" else None
+
+    if storage == "parquet":
+        history_exists = parquet_store.exists(PARQUET_DIR)
+    elif storage == "sqlite":
+        history_exists = len(job_store) > 0
+    else:
+        history_exists = previous_transformed_file == COMBINED_FILE
+
+    rerun_history = True
+    files_to_process = daily_files
+    # versions of the transformers the history was already transformed with, those are skipped when it is re-transformed
+    up_to_date: Optional[Dict[str, str]] = None
+
+    timer = PhaseTimer()
+    run_start = time.perf_counter()
+    merge_metrics: Dict[str, Any] = {"storage": storage, "incremental": incremental, "workers": workers, "daily_files": len(daily_files), "streamed": streamed is not None}
+
+    if incremental:
+        fingerprint = transformer_fingerprint(get_pipeline().transformer_classes)
+        versions = transformer_versions(get_pipeline().transformer_classes)
+        manifest = load_manifest(MANIFEST_FILE)
+
+        # the manifest only describes the history it was written with, if that is gone or the transformers changed we start over
+        if (
+            history_exists
+            and manifest["transformer_fingerprint"] == fingerprint
+            and manifest.get("storage", "csv") == storage
+        ):
+            rerun_history = False
+            files_to_process = pending_files(manifest, DAILY_DIR, daily_files)
+        else:
+            print("Transformers changed or no previous manifest found, re-transforming the full history")
+            if history_exists and manifest.get("storage", "csv") == storage:
+                up_to_date = manifest.get("transformer_versions")
+            manifest = {**manifest, "files": {}}
+
+        print(f"{len(files_to_process)} of {len(daily_files)} daily files are new or changed")
+
+        if not files_to_process and not rerun_history and not streamed:
+            print("Nothing new to process")
+            if job_store:
+                job_store.close()
+            if metrics_dir:
+                write_section("merge", {**merge_metrics, "files_processed": 0, "seconds": round(time.perf_counter() - run_start, 4)}, metrics_dir)
+            return
+
     datasets = []
-    for file in daily_files:
-        try:
-            df_current_date = pd.read_csv(f"eurex_feature_engineering/output/daily/{file}",encoding="utf-8")
-            df_current_date = run_pipeline(df_current_date)
-            datasets.append(df_current_date)
-        except Exception as e:
-            print(f"Error on processing {file} : {e}")
-    
-    if previous_transformed_file:
-        previous_transformed_df = pd.read_csv(previous_transformed_file, encoding="utf-8")
-        # to ensure the previous transformed file has the same updated transformations if any, we run the transformations on it again to ensure that. None of the transformations delete any column and therefore I think it is fine to do this
-        previous_transformed_df = run_pipeline(previous_transformed_df)
-        datasets.append(previous_transformed_df)
-    
-    merged_df = stack_and_dedup(
-        dfs = datasets,
-        id_column = "job_id"
-    )
-    
-    merged_df.to_csv("eurex_feature_engineering/output/transformed/jobs_combined.csv", index=False)
-    print(f"Transformed data saved to transformed/jobs_combined.csv")
-        
-    
+    processed_files = []
+    file_metrics = []
+    # every chunk of the merge goes through this once it is transformed and enriched
+    compact_chunk = schema.compact_strings if compact_dtypes else (lambda df: df)
+    with timer.phase("transform_daily"):
+        results = transform_daily_files(files_to_process, workers=workers)
+
+    with timer.phase("details"):
+        details = load_details(details_dir) if details_dir else None
+    merge_metrics["detail_jobs"] = 0 if details is None else len(details)
+
+    for file, df_current_date, error, metrics in results:
+        file_metrics.append({**metrics, "error": error})
+        if error is not None:
+            print(f"Error on processing {file} : {error}")
+            continue
+        with timer.phase("details"):
+            datasets.append(compact_chunk(enrich(df_current_date, details)))
+        processed_files.append(file)
+
+    if streamed:
+        # the day's jobs, newer than every daily file
+        file_metrics.append({**streamed.get("metrics", {}), "file": streamed_file, "streamed": True, "error": None})
+        with timer.phase("details"):
+            datasets.extend(compact_chunk(enrich(batch, details)) for batch in streamed["batches"])
+        if streamed_file:
+            processed_files.append(streamed_file)
+
+    # the frames this run brings in, before the history is added to them
+    new_datasets = list(datasets)
+    merged_df = None
+
+    history_timings: List[Dict[str, Any]] = []
+
+    if storage != "csv" and not rerun_history:
+        # the history is already up to date with the transformers, only the job ids it has not seen need to be written
+        if datasets:
+            with timer.phase("concat_dedup"):
+                new_df = stack_and_dedup(
+                    dfs = datasets,
+                    id_column = "job_id"
+                )
+            merge_metrics["rows_out"] = len(new_df)
+
+            with timer.phase("write"):
+                if storage == "parquet":
+                    parquet_store.append_new(new_df, PARQUET_DIR, id_column="job_id")
+                else:
+                    # rows already in the history are kept as they are, same as in the csv and parquet storage
+                    job_store.upsert(new_df, keep_existing=True)
+    else:
+        # the transformations are rerun on the history for the same reason as the csv below
+        if storage == "parquet" and history_exists:
+            with timer.phase("history_read"):
+                history_df = parquet_store.read(PARQUET_DIR)
+            datasets.append(compact_chunk(enrich(run_pipeline(history_df, timings=history_timings, up_to_date=up_to_date), details)))
+        elif storage == "sqlite" and history_exists:
+            datasets = itertools.chain(datasets, (
+                compact_chunk(enrich(run_pipeline(chunk, timings=history_timings, up_to_date=up_to_date), details))
+                for chunk in timer.timed_iter("history_read", job_store.read_chunks())
+            ))
+        elif previous_transformed_file:
+            # the history is read in chunks so that it never has to be held twice (raw and transformed) in memory
+            # the combined file has the derived date columns, they are parsed back so that skipped transformers keep them as dates
+            parse_dates = DATE_COLUMNS if previous_transformed_file == COMBINED_FILE else None
+            if rerun_history:
+                # to ensure the previous transformed file has the same updated transformations if any, we run the transformations on it again to ensure that. None of the transformations delete any column and therefore I think it is fine to do this
+                history_chunks = (
+                    compact_chunk(enrich(run_pipeline(chunk, timings=history_timings, up_to_date=up_to_date), details))
+                    for chunk in timer.timed_iter(
+                        "history_read",
+                        read_feed_chunks([previous_transformed_file], encoding="utf-8", dtype=HISTORY_DTYPES, parse_dates=parse_dates)
+                    )
+                )
+            else:
+                # transformers have not changed since the combined file was written, so it is already up to date
+                history_chunks = map(compact_chunk, timer.timed_iter(
+                    "history_read",
+                    read_feed_chunks([previous_transformed_file], encoding="utf-8", dtype=HISTORY_DTYPES, parse_dates=DATE_COLUMNS)
+                ))
+            datasets = itertools.chain(datasets, history_chunks)
+
+        read_before = timer.seconds("history_read")
+        transform_before = sum(timing["seconds"] for timing in history_timings)
+        start = time.perf_counter()
+
+        merged_df = stack_and_dedup(
+            dfs = datasets,
+            id_column = "job_id"
+        )
+
+        # the chunked history is read and transformed while it is being stacked, that time goes to its own phases
+        transform_seconds = sum(timing["seconds"] for timing in history_timings)
+        if history_timings:
+            timer.add("history_transform", transform_seconds)
+        timer.add(
+            "concat_dedup",
+            time.perf_counter() - start - (timer.seconds("history_read") - read_before) - (transform_seconds - transform_before)
+        )
+        merge_metrics["rows_out"] = len(merged_df)
+
+        if metrics_dir:
+            with timer.phase("memory_report"):
+                # what the merged history takes as it was merged, and as the object strings of a plain csv read
+                merge_metrics["history_memory"] = {
+                    "merged": schema.memory_report(merged_df, top=5),
+                    "object": schema.memory_report(merged_df, top=5, as_objects=True),
+                }
+            print(
+                f"Merged history takes {merge_metrics['history_memory']['merged']['total_mb']} MB in memory, "
+                f"{merge_metrics['history_memory']['object']['total_mb']} MB with object strings"
+            )
+
+        with timer.phase("write"):
+            if storage == "parquet":
+                parquet_store.write(merged_df, PARQUET_DIR)
+            elif storage == "sqlite":
+                job_store.replace_all(merged_df)
+            else:
+                merged_df.to_csv(COMBINED_FILE, index=False)
+                print(f"Transformed data saved to transformed/jobs_combined.csv")
+
+    if rollups_file:
+        with timer.phase("rollups"):
+            merge_metrics["rollup_jobs_added"] = update_rollups(rollups_file, merged_df, new_datasets, storage, job_store)
+
+    if search_file:
+        with timer.phase("search_index"):
+            merge_metrics["search_jobs_indexed"] = update_search_index(search_file, merged_df, new_datasets, rerun_history, storage, job_store)
+
+    if storage == "parquet" and export_csv:
+        with timer.phase("export_csv"):
+            parquet_store.export_csv(PARQUET_DIR, COMBINED_FILE)
+    elif storage == "sqlite":
+        if export_csv:
+            with timer.phase("export_csv"):
+                job_store.export_csv(COMBINED_FILE)
+        job_store.close()
+
+    if incremental:
+        manifest["transformer_fingerprint"] = fingerprint
+        manifest["transformer_versions"] = versions
+        manifest["storage"] = storage
+        for file in processed_files:
+            manifest["files"][file] = file_signature(f"{DAILY_DIR}/{file}")
+        save_manifest(manifest, MANIFEST_FILE)
+        print(f"Manifest updated with {len(processed_files)} files")
+
+    if metrics_dir:
+        merge_metrics.update({
+            "files_processed": len(processed_files),
+            "files_failed": sum(1 for metrics in file_metrics if metrics["error"] is not None),
+            "rerun_history": rerun_history,
+            "seconds": round(time.perf_counter() - run_start, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "phases": timer.phases,
+            "files": file_metrics,
+            "history_transformers": summarize_transformers(history_timings),
+        })
+        print(f"Metrics written to {write_section('merge', merge_metrics, metrics_dir)}")
+
+
 if __name__ == "__main__":
     group_and_merge_data()
-
@@ -3,10 +3,15 @@ This is where all the orchastration of the processor will be done.
 """
 import pkgutil
 import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
 from eurex_feature_engineering.basetransformer import BaseTransformer
-from typing import Any, List
+from eurex_common.metrics import peak_rss_mb
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+TRANSFORMERS_PACKAGE = "eurex_feature_engineering.transformers"
 
 def load_processors() -> None:
 
@@ -15,39 +20,261 @@ def load_processors() -> None:
     The processors should inherit from the BaseTransformer class.
     """
     # Dynamically load all the processors from the processor_1.py and other processor files - this is basically just using a import but dynamically
-    pkg = importlib.import_module("eurex_feature_engineering.transformers")
+    pkg = importlib.import_module(TRANSFORMERS_PACKAGE)
 
-    for a, name, b in pkgutil.iter_modules(pkg.__path__):
-        print(f"Loading processor: {name}")
+    for _, name, _ in pkgutil.iter_modules(pkg.__path__):
         importlib.import_module(f"{pkg.__name__}.{name}")
-    
-    print(f"Loaded processors: {BaseTransformer.registry}")
 
-def build_pipeline() -> List[BaseTransformer]:
+    print(f"Loaded processors: {[processor.__name__ for processor in unique_transformers()]}")
+
+def unique_transformers() -> List[type]:
+    """
+    Returns the registered transformer classes in registry order with duplicates removed.
+    A module that gets imported twice (ex: reloaded) registers its classes again, only the latest definition is kept
+    """
+    latest = {}
+    for processor in BaseTransformer.registry:
+        latest[f"{processor.__module__}.{processor.__qualname__}"] = processor
+
+    return list(latest.values())
+
+def transformer_key(transformer: type) -> str:
+    return f"{transformer.__module__}.{transformer.__qualname__}"
+
+def plan_stages(transformers: List[BaseTransformer]) -> tuple[List[List[int]], Dict[int, Set[int]]]:
+    """
+    Groups the transformers (by position) into stages that can run in any order, and returns them with the dependencies
+    of every transformer. A transformer depends on an earlier one when it reads a column the earlier one writes, writes a
+    column it reads or writes, or when either of them is undeclared (it could read or write anything).
+    Within a stage the registry order is kept
+    """
+    dependencies: Dict[int, Set[int]] = {}
+    levels: List[int] = []
+
+    for i, transformer in enumerate(transformers):
+        dependencies[i] = set()
+        for j in range(i):
+            earlier = transformers[j]
+            if not (transformer.is_declared() and earlier.is_declared()):
+                dependencies[i].add(j)
+                continue
+
+            reads, writes = set(transformer.inputs), set(transformer.outputs)
+            if set(earlier.outputs) & (reads | writes) or set(earlier.inputs) & writes:
+                dependencies[i].add(j)
+
+        levels.append(1 + max((levels[j] for j in dependencies[i]), default=-1))
+
+    stages = [[i for i, level in enumerate(levels) if level == stage] for stage in range(max(levels, default=-1) + 1)]
+    return stages, dependencies
+
+class Pipeline:
+    """
+    A compiled pipeline, the transformers are discovered and instantiated once and then applied to as many dataframes as needed.
+
+    The transformers are run in stages planned from the columns they declare (see BaseTransformer.inputs/outputs), with
+    threads > 1 the declared transformers of a stage run at the same time
+    """
+
+    def __init__(self, transformers: List[BaseTransformer], threads: int = 1) -> None:
+        self.transformers = transformers
+        self.threads = threads
+        self.stages, self.dependencies = plan_stages(transformers)
+
+    @property
+    def transformer_classes(self) -> List[type]:
+        return [transformer.__class__ for transformer in self.transformers]
+
+    def is_up_to_date(
+            self,
+            position: int,
+            df: pd.DataFrame,
+            up_to_date: Optional[Dict[str, str]],
+            ran: Set[int]
+    ) -> bool:
+        """
+        A declared transformer is up to date when the dataframe was already transformed with its version, has its outputs
+        and none of the transformers it depends on had to run again
+        """
+        transformer = self.transformers[position]
+        if not up_to_date or not transformer.is_declared() or transformer.version is None:
+            return False
+
+        return (
+            up_to_date.get(transformer_key(transformer.__class__)) == transformer.version
+            and all(column in df.columns for column in transformer.outputs)
+            and not self.dependencies[position] & ran
+        )
+
+    def _inputs_of(self, transformer: BaseTransformer, df: pd.DataFrame) -> pd.DataFrame:
+        missing = [column for column in transformer.inputs if column not in df.columns]
+        if missing:
+            raise KeyError(f"{transformer.__class__.__name__} needs the columns {missing}")
+
+        # a copy, the transformer may write into it without touching the dataframe (or the other transformers of the stage)
+        return df[transformer.inputs].copy()
+
+    def _apply_outputs(
+            self,
+            transformer: BaseTransformer,
+            df: pd.DataFrame,
+            part: pd.DataFrame,
+            result: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Copies the outputs of the transformer, computed on part (its input columns), back into the dataframe
+        """
+        if len(result) != len(df):
+            raise ValueError(f"{transformer.__class__.__name__} declares its columns but changed the number of rows")
+
+        for column in transformer.outputs:
+            df[column] = result[column].to_numpy()
+        # a transformer may set the index (ex: IDTransformations)
+        if not result.index.equals(part.index):
+            df.index = result.index
+
+        return df
+
+    def run(
+            self,
+            df: pd.DataFrame,
+            timings: Optional[List[Dict[str, Any]]] = None,
+            up_to_date: Optional[Dict[str, str]] = None
+    ) -> pd.DataFrame:
+        """
+        Runs every transformer of the pipeline on the dataframe, stage by stage.
+        When a timings list is given, the wall time, rows in and out and peak RSS of every transformer are appended to it.
+        up_to_date maps transformer keys (module.Class) to the version the dataframe was already transformed with, the
+        declared transformers that are up to date are skipped
+        """
+        ran: Set[int] = set()
+
+        for stage in self.stages:
+            to_run = []
+            for position in stage:
+                transformer = self.transformers[position]
+                if self.is_up_to_date(position, df, up_to_date, ran):
+                    print(f"Skipping transformer: {transformer.__class__.__name__}, up to date with version {transformer.version}")
+                    if timings is not None:
+                        timings.append({"transformer": transformer.__class__.__name__, "seconds": 0.0, "rows_in": len(df), "rows_out": len(df), "peak_rss_mb": peak_rss_mb(), "skipped": True})
+                else:
+                    to_run.append(position)
+
+            if self.threads > 1 and len(to_run) > 1:
+                df = self._run_concurrently(to_run, df, timings)
+            else:
+                for position in to_run:
+                    df = self._run_one(position, df, timings)
+
+            ran.update(to_run)
+
+        return df
+
+    def _run_one(self, position: int, df: pd.DataFrame, timings: Optional[List[Dict[str, Any]]]) -> pd.DataFrame:
+        transformer = self.transformers[position]
+        print(f"Running transformer: {transformer.__class__.__name__}")
+        rows_in = len(df)
+        start = time.perf_counter()
+
+        if transformer.is_declared():
+            part = self._inputs_of(transformer, df)
+            df = self._apply_outputs(transformer, df, part, transformer(part))
+        else:
+            df = transformer(df)
+
+        if timings is not None:
+            timings.append({
+                "transformer": transformer.__class__.__name__,
+                "seconds": round(time.perf_counter() - start, 4),
+                "rows_in": rows_in,
+                "rows_out": len(df),
+                "peak_rss_mb": peak_rss_mb(),
+            })
+
+        return df
+
+    def _run_concurrently(self, positions: List[int], df: pd.DataFrame, timings: Optional[List[Dict[str, Any]]]) -> pd.DataFrame:
+        """
+        Runs the transformers of a stage (all declared, an undeclared one is always alone in its stage) on a thread pool.
+        Every one gets its own copy of its input columns, the outputs are copied back in registry order
+        """
+        transformers = [self.transformers[position] for position in positions]
+        parts = [self._inputs_of(transformer, df) for transformer in transformers]
+
+        def timed(transformer: BaseTransformer, part: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+            start = time.perf_counter()
+            return transformer(part), time.perf_counter() - start
+
+        print(f"Running transformers: {[transformer.__class__.__name__ for transformer in transformers]} on {self.threads} threads")
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(transformers))) as executor:
+            results = list(executor.map(timed, transformers, parts))
+
+        for transformer, part, (result, seconds) in zip(transformers, parts, results):
+            rows_in = len(df)
+            df = self._apply_outputs(transformer, df, part, result)
+            if timings is not None:
+                timings.append({
+                    "transformer": transformer.__class__.__name__,
+                    "seconds": round(seconds, 4),
+                    "rows_in": rows_in,
+                    "rows_out": len(df),
+                    "peak_rss_mb": peak_rss_mb(),
+                })
+
+        return df
+
+    def run_many(self, dfs: Iterable[pd.DataFrame]) -> List[pd.DataFrame]:
+        """
+        Runs the pipeline on every dataframe, the transformer instances are shared between all of them
+        """
+        return [self.run(df) for df in dfs]
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.run(df)
+
+    def __repr__(self) -> str:
+        return f"Pipeline({[[self.transformers[position].__class__.__name__ for position in stage] for stage in self.stages]})"
+
+_pipeline: Optional[Pipeline] = None
+
+def build_pipeline() -> Pipeline:
     """
     This method builds the pipeline of processors to be used in the feature engineering process.
     The processors are defined in the processor_1.py and other processor files and should inherit from the BaseTransformer class.
     """
     load_processors()
 
-    pipeline: List[BaseTransformer] = []
-    
-    for processor in BaseTransformer.registry:
-        pipeline.append(processor())
-    
+    transformers: List[BaseTransformer] = []
+
+    for processor in unique_transformers():
+        transformers.append(processor())
+
+    pipeline = Pipeline(transformers)
+    print(f"Built pipeline: {pipeline}")
+
     return pipeline
 
+def get_pipeline(rebuild: bool = False, threads: Optional[int] = None) -> Pipeline:
+    """
+    Returns the pipeline of this process, it is only built on the first call (or when rebuild is set).
+    threads sets how many transformers of a stage may run at the same time from then on
+    """
+    global _pipeline
+
+    if _pipeline is None or rebuild:
+        _pipeline = build_pipeline()
+    if threads is not None:
+        _pipeline.threads = threads
+
+    return _pipeline
+
 def run_pipeline(
-        df: pd.DataFrame
+        df: pd.DataFrame,
+        timings: Optional[List[Dict[str, Any]]] = None,
+        up_to_date: Optional[Dict[str, str]] = None
 ) -> pd.DataFrame:
     """
     This method basically orchestrates the entire pipeline and runs the processors in the pipeline.
     """
 
-    pipeline = build_pipeline()
-
-    for transformer in pipeline:
-        print(f"Running transformer: {transformer.__class__.__name__}")
-        df = transformer(df)
-    
-    return df
\ No newline at end of file
+    return get_pipeline().run(df, timings=timings, up_to_date=up_to_date)
@@ -0,0 +1,65 @@
+"""
+This module joins the fields of the job detail pages (written by job_detail_spider to output/details) onto the jobs,
+on the job_id that IDTransformations derives from the job link.
+
+Only the new jobs get their detail page fetched, so the details are joined onto the daily files when they are merged and
+kept in the history from then on.
+"""
+
+import os
+from typing import Optional
+
+import pandas as pd
+
+from eurex_feature_engineering.transformers.processor_1 import IDTransformations
+from eurex_feature_engineering.utils.feed_reader import is_feed_file, read_feed
+
+DETAILS_DIR = "eurex_feature_engineering/output/details"
+DETAIL_COLUMNS = [
+    "detail_offer_description",
+    "detail_requirements",
+    "detail_additional_information",
+    "detail_where_to_apply",
+    "detail_contact_email",
+    "detail_fetched_on",
+]
+
+
+def load_details(details_dir: str = DETAILS_DIR) -> Optional[pd.DataFrame]:
+    """
+    Reads every details file, indexed by job_id. A job fetched more than once keeps its latest details (the files are
+    named by date). None when there are no details
+    """
+    if not os.path.isdir(details_dir):
+        return None
+
+    files = sorted(file for file in os.listdir(details_dir) if is_feed_file(file))
+    if not files:
+        return None
+
+    details = pd.concat(
+        [read_feed(os.path.join(details_dir, file), encoding="utf-8", dtype=str) for file in files],
+        ignore_index=True,
+    )
+    details["job_id"] = details["job_link"].map(IDTransformations().extract_job_id)
+    details = details.drop_duplicates(subset="job_id", keep="last").set_index("job_id")
+
+    return details[[column for column in DETAIL_COLUMNS if column in details.columns]]
+
+
+def enrich(
+        df: pd.DataFrame,
+        details: Optional[pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Fills the detail columns of the jobs that have details, the values the jobs already have are kept.
+    The dataframe needs the job_id column of IDTransformations
+    """
+    if details is None or details.empty:
+        return df
+
+    for column in details.columns:
+        looked_up = df["job_id"].map(details[column])
+        df[column] = df[column].fillna(looked_up) if column in df.columns else looked_up
+
+    return df
@@ -0,0 +1,58 @@
+"""
+This module reads the files the spiders write (the daily files and the output of the full crawl) in any of their formats:
+csv, gzip or zstd compressed csv (.csv.gz, .csv.zst) or parquet.
+
+A feed that is still being written, or whose crawl died, only exists as a .part file, which is never picked up.
+pyarrow is only needed for parquet feeds and zstandard for .zst feeds.
+"""
+
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from eurex_feature_engineering.utils.stack_and_dedup import read_csv_chunks
+
+FEED_EXTENSIONS = (".csv", ".csv.gz", ".csv.zst", ".parquet")
+
+
+def is_feed_file(name: str) -> bool:
+    return name.endswith(FEED_EXTENSIONS)
+
+
+def _like_csv(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet feeds keep empty fields as empty strings, read_csv turns them into NaN and the transformers expect that
+    """
+    return df.where(df != "")
+
+
+def read_feed(
+        path: str,
+        **read_csv_kwargs
+) -> pd.DataFrame:
+    """
+    Reads a whole feed, the read_csv arguments are ignored for parquet feeds
+    """
+    if path.endswith(".parquet"):
+        return _like_csv(pd.read_parquet(path))
+
+    # the compression is inferred from the extension
+    return pd.read_csv(path, **read_csv_kwargs)
+
+
+def read_feed_chunks(
+        paths: Iterable[str],
+        chunksize: int = 200_000,
+        **read_csv_kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads the feeds one chunk at a time, in order. Parquet feeds are read a batch of row groups at a time
+    """
+    for path in paths:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet
+
+            for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunksize):
+                yield _like_csv(batch.to_pandas())
+        else:
+            yield from read_csv_chunks([path], chunksize=chunksize, **read_csv_kwargs)
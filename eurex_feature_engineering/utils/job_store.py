@@ -0,0 +1,179 @@
+"""
+This module keeps the transformed job history in a local sqlite file with job_id as the primary key.
+New rows are upserted in bulk, so a run only costs time for the rows it adds. jobs_combined.csv is exported from the store
+"""
+
+import os
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from eurex_feature_engineering.utils.sqlite_file import SqliteFile
+
+TABLE = "jobs"
+DATE_COLUMNS = ["posted_on_date", "application_deadline_date"]
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _to_rows(df: pd.DataFrame, columns: List[str]) -> Iterable[tuple]:
+    """
+    Converts the dataframe to rows sqlite understands, dates are written the same way to_csv writes them
+    """
+    df = df[columns].copy()
+
+    for column in columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            values = df[column]
+            date_only = (values.dropna() == values.dropna().dt.normalize()).all()
+            df[column] = values.dt.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S")
+
+    df = df.astype(object).where(df.notna(), None)
+    return df.itertuples(index=False, name=None)
+
+
+class JobStore(SqliteFile):
+    """
+    A sqlite table of jobs keyed on the id column. Columns are added on the fly as transformers add them
+    """
+
+    def __init__(
+            self,
+            path: str,
+            id_column: str = "job_id"
+    ) -> None:
+        self.id_column = id_column
+        super().__init__(path)
+
+    @property
+    def columns(self) -> List[str]:
+        return [row[1] for row in self.connection.execute(f"PRAGMA table_info({TABLE})")]
+
+    def __len__(self) -> int:
+        if not self.columns:
+            return 0
+        return self.connection.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+    def _ensure_columns(self, columns: List[str]) -> None:
+        existing = set(self.columns)
+
+        # the table is created on the first write so that it keeps the column order of the data
+        if not existing:
+            definitions = ", ".join(
+                f"{_quote(column)} TEXT PRIMARY KEY" if column == self.id_column else _quote(column)
+                for column in columns
+            )
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} ({definitions})")
+            return
+
+        for column in columns:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(column)}")
+
+    def upsert(
+            self,
+            df: pd.DataFrame,
+            keep_existing: bool = False
+    ) -> int:
+        """
+        Writes the rows in a single transaction. Rows with an id that is already stored replace the stored row,
+        or are skipped when keep_existing is set. Returns the number of rows written
+        """
+        with self.transaction():
+            written = self._write(df, keep_existing)
+
+        print(f"Upserted {written} of {len(df)} rows into {self.path}")
+        return written
+
+    def _write(
+            self,
+            df: pd.DataFrame,
+            keep_existing: bool
+    ) -> int:
+        df = df.reset_index(drop=True)
+
+        missing_ids = df[self.id_column].isna()
+        if missing_ids.any():
+            print(f"Skipping {missing_ids.sum()} rows without a {self.id_column}")
+            df = df[~missing_ids]
+
+        # the last occurrence wins within the batch, same as stack_and_dedup
+        df = df.drop_duplicates(subset=[self.id_column], keep="last")
+        df = df.assign(**{self.id_column: df[self.id_column].astype(str)})
+
+        columns = list(df.columns)
+        column_list = ", ".join(_quote(column) for column in columns)
+        placeholders = ", ".join("?" for _ in columns)
+
+        if keep_existing:
+            statement = f"INSERT OR IGNORE INTO {TABLE} ({column_list}) VALUES ({placeholders})"
+        else:
+            updates = ", ".join(
+                f"{_quote(column)} = excluded.{_quote(column)}" for column in columns if column != self.id_column
+            ) or f"{_quote(self.id_column)} = excluded.{_quote(self.id_column)}"
+            statement = (
+                f"INSERT INTO {TABLE} ({column_list}) VALUES ({placeholders}) "
+                f"ON CONFLICT({_quote(self.id_column)}) DO UPDATE SET {updates}"
+            )
+
+        before = self.connection.total_changes
+        self._ensure_columns(columns)
+        self.connection.executemany(statement, _to_rows(df, columns))
+
+        return self.connection.total_changes - before
+
+    def replace_all(self, df: pd.DataFrame) -> None:
+        """
+        Replaces every stored row with the dataframe
+        """
+        with self.transaction():
+            self.connection.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            written = self._write(df, keep_existing=False)
+
+        print(f"Replaced the store with {written} rows")
+
+    def read_chunks(
+            self,
+            columns: Optional[List[str]] = None,
+            chunksize: int = 200_000
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Reads the stored rows in insertion order, one chunk at a time
+        """
+        columns = columns or self.columns
+        if not columns:
+            return
+
+        query = f"SELECT {', '.join(_quote(column) for column in columns)} FROM {TABLE} ORDER BY rowid"
+
+        for chunk in pd.read_sql_query(query, self.connection, chunksize=chunksize):
+            for column in DATE_COLUMNS:
+                if column in chunk.columns:
+                    chunk[column] = pd.to_datetime(chunk[column], errors="coerce")
+            yield chunk
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        chunks = list(self.read_chunks(columns=columns))
+        if not chunks:
+            return pd.DataFrame(columns=columns or self.columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    def export_csv(self, path: str) -> None:
+        """
+        Writes the stored rows as a csv file for the consumers that expect jobs_combined.csv
+        """
+        tmp_path = f"{path}.tmp"
+        rows = 0
+        header = True
+        for chunk in self.read_chunks():
+            chunk.to_csv(tmp_path, index=False, header=header, mode="w" if header else "a")
+            header = False
+            rows += len(chunk)
+
+        if header:
+            pd.DataFrame(columns=self.columns).to_csv(tmp_path, index=False)
+
+        os.replace(tmp_path, path)
+        print(f"Exported {rows} rows to {path}")
@@ -0,0 +1,38 @@
+"""
+The transformer side of the manifest: the fingerprint and versions of the transformers the history was transformed with.
+The manifest file itself is read and written by eurex_common/manifest.py
+"""
+
+import hashlib
+import inspect
+from typing import Dict, List
+
+
+def transformer_fingerprint(transformers: List[type]) -> str:
+    """
+    Fingerprint of the transformer set the pipeline runs.
+    This changes when a transformer is added, removed, reordered or when its source code changes
+    """
+    digest = hashlib.sha256()
+
+    for transformer in transformers:
+        digest.update(f"{transformer.__module__}.{transformer.__qualname__}".encode("utf-8"))
+        try:
+            digest.update(inspect.getsource(transformer).encode("utf-8"))
+        except (OSError, TypeError):
+            # source is not always available (ex: classes defined in a REPL), the name is the best we can do then
+            pass
+
+    return digest.hexdigest()
+
+
+def transformer_versions(transformers: List[type]) -> Dict[str, str]:
+    """
+    The version of every declared transformer (module.Class -> version), Pipeline.run skips the transformers whose
+    version the history was already transformed with
+    """
+    return {
+        f"{transformer.__module__}.{transformer.__qualname__}": transformer.version
+        for transformer in transformers
+        if getattr(transformer, "version", None) is not None
+    }
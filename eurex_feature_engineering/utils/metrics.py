@@ -0,0 +1,74 @@
+"""
+This module collects the metrics of a run (crawl, transform and merge) and writes them to one json file per run
+in output/metrics, so they can be loaded into dashboards instead of grepped from the logs.
+
+The file itself is written by eurex_common/metrics.py, which the spiders use as well. This module adds the timings
+of the transform and the merge.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List
+
+from eurex_common.metrics import peak_rss_mb
+
+
+def summarize_transformers(timings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Adds up the timings of the same transformer over several runs of the pipeline (ex: the chunks of the history)
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for timing in timings:
+        entry = summary.setdefault(
+            timing["transformer"],
+            {"transformer": timing["transformer"], "runs": 0, "seconds": 0.0, "rows_in": 0, "rows_out": 0, "peak_rss_mb": None, "skipped": 0},
+        )
+        entry["runs"] += 1
+        # runs on input the transformer was already up to date with, see Pipeline.run
+        entry["skipped"] += int(timing.get("skipped", False))
+        entry["seconds"] = round(entry["seconds"] + timing["seconds"], 4)
+        entry["rows_in"] += timing["rows_in"]
+        entry["rows_out"] += timing["rows_out"]
+        entry["peak_rss_mb"] = timing["peak_rss_mb"]
+
+    return list(summary.values())
+
+
+class PhaseTimer:
+    """
+    Wall time of the named phases of a run, a phase that runs several times adds up
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.phases.setdefault(name, {"seconds": 0.0})
+        entry["seconds"] = round(entry["seconds"] + seconds, 4)
+        entry["peak_rss_mb"] = peak_rss_mb()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed_iter(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        """
+        Yields from the iterable and counts the time spent producing its items (ex: reading chunks lazily) as the phase
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def seconds(self, name: str) -> float:
+        return self.phases.get(name, {}).get("seconds", 0.0)
@@ -0,0 +1,177 @@
+"""
+This module stores the transformed job history as a parquet dataset partitioned by the month a job was posted on.
+Unlike jobs_combined.csv the dates and types survive a round trip, reads can be limited to some columns and months
+and new jobs only rewrite the months they were posted in.
+
+pyarrow is an optional dependency, it is only needed when this storage is used.
+"""
+
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+PARTITION_COLUMN = "posted_month"
+# rows without a usable posted_on_date still need a home
+UNKNOWN_PARTITION = "unknown"
+PART_FILE = "part-0.parquet"
+
+# Types of the columns we know about, any other column a transformer adds keeps its inferred type
+STRING_COLUMNS = [
+    "job_type", "job_country", "university", "posted_on", "job_title", "job_link",
+    "job_description", "department", "job_location", "job_field", "job_profile",
+    "funding_program", "application_deadline", "origin_page", "job_id",
+]
+DATE_COLUMNS = ["posted_on_date", "application_deadline_date"]
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The parquet storage needs pyarrow, install it with `pip install pyarrow`") from e
+
+    return pyarrow
+
+
+def exists(root: str) -> bool:
+    """
+    Checks if there is a dataset at root
+    """
+    return os.path.isdir(root) and any(name.startswith(f"{PARTITION_COLUMN}=") for name in os.listdir(root))
+
+
+def partition_months(df: pd.DataFrame) -> pd.Series:
+    """
+    Returns the partition (YYYY-MM of posted_on_date) of every row
+    """
+    months = pd.to_datetime(df["posted_on_date"], errors="coerce").dt.strftime("%Y-%m")
+    return months.fillna(UNKNOWN_PARTITION)
+
+
+def _to_table(df: pd.DataFrame) -> Any:
+    """
+    Converts the dataframe to an arrow table with the typed schema
+    """
+    pa = _pyarrow()
+
+    df = df.drop(columns=[PARTITION_COLUMN], errors="ignore").copy()
+    for column in STRING_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("string")
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _write_partition(root: str, month: str, df: pd.DataFrame) -> None:
+    """
+    Writes one partition to a temp file and swaps it in, so readers never see a half written partition
+    """
+    pq = _pyarrow().parquet
+
+    directory = os.path.join(root, f"{PARTITION_COLUMN}={month}")
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, PART_FILE)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(_to_table(df), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _dataset(root: str) -> Any:
+    pa = _pyarrow()
+
+    partitioning = pa.dataset.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+    dataset = pa.dataset.dataset(root, format="parquet", partitioning=partitioning)
+
+    # partitions written by an older set of transformers can miss columns, read them all with the union of the schemas
+    schema = pa.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()] + [dataset.schema])
+    return pa.dataset.dataset(root, format="parquet", partitioning=partitioning, schema=schema)
+
+
+def read(
+        root: str,
+        columns: Optional[List[str]] = None,
+        months: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    """
+    Reads the dataset, only the given columns and months (YYYY-MM) are read from disk when they are set
+    """
+    pa = _pyarrow()
+
+    if not exists(root):
+        return pd.DataFrame(columns=columns)
+
+    dataset = _dataset(root)
+
+    filter_expression = None
+    if months is not None:
+        filter_expression = pa.dataset.field(PARTITION_COLUMN).isin(list(months))
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != PARTITION_COLUMN]
+
+    return dataset.to_table(columns=columns, filter=filter_expression).to_pandas()
+
+
+def write(df: pd.DataFrame, root: str) -> None:
+    """
+    Replaces the whole dataset with the dataframe
+    """
+    tmp_root = f"{root}.tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+
+    for month, partition in df.groupby(partition_months(df), sort=True):
+        _write_partition(tmp_root, month, partition)
+
+    old_root = f"{root}.old"
+    shutil.rmtree(old_root, ignore_errors=True)
+    if os.path.exists(root):
+        os.rename(root, old_root)
+    os.rename(tmp_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+
+    print(f"Wrote {len(df)} rows to {root}")
+
+
+def append_new(
+        df: pd.DataFrame,
+        root: str,
+        id_column: str = "job_id"
+) -> Dict[str, int]:
+    """
+    Adds the rows whose id is not in the dataset yet, rows already in the dataset are kept as they are.
+    Only the partitions the new rows fall into are rewritten. Returns the number of rows added per partition
+    """
+    known_ids = set(read(root, columns=[id_column])[id_column]) if exists(root) else set()
+
+    new_rows = df[~df[id_column].isin(known_ids)]
+    if new_rows.empty:
+        print("No new job ids to store")
+        return {}
+
+    added = {}
+    for month, partition in new_rows.groupby(partition_months(new_rows), sort=True):
+        existing = read(root, months=[month])
+        _write_partition(root, month, pd.concat([existing, partition], ignore_index=True))
+        added[month] = len(partition)
+
+    print(f"Stored {len(new_rows)} new rows in {len(added)} partitions: {sorted(added)}")
+    return added
+
+
+def export_csv(root: str, path: str) -> None:
+    """
+    Writes the whole dataset as a single csv file for the consumers that expect jobs_combined.csv
+    """
+    df = read(root)
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"Exported {len(df)} rows to {path}")
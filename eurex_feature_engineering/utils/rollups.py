@@ -0,0 +1,264 @@
+"""
+This module keeps pre-aggregated counts of the job history in a sqlite file, so trend questions (postings per week in a
+country, the universities that post the most, how long before the deadline jobs are posted) are answered in
+milliseconds without loading jobs_combined.csv.
+
+The rollups are updated during every merge with the jobs whose job_id they have not counted yet, a job is counted
+once with the values it had when it was first added. Counted job ids are kept in the file, so feeding the same rows
+twice changes nothing.
+"""
+
+from typing import Iterable, List, Optional, Set
+
+import pandas as pd
+
+from eurex_feature_engineering.utils.schema import known_dates
+from eurex_feature_engineering.utils.sqlite_file import SqliteFile
+
+DIMENSIONS = ["job_country", "job_field", "job_profile", "university", "funding_program"]
+# the dimension of the totals, its value is always ""
+ALL = "all"
+# the periods are named by the day they start on, weeks start on monday
+GRAINS = ["day", "week", "month"]
+
+# days between posting and deadline, [start, end) per bucket
+LEAD_TIME_BINS = [float("-inf"), 0, 7, 14, 30, 60, 90, 180, float("inf")]
+LEAD_TIME_BUCKETS = ["< 0", "0-6", "7-13", "14-29", "30-59", "60-89", "90-179", "180+"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counted (job_id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS postings (
+    grain TEXT, dimension TEXT, value TEXT, period TEXT, count INTEGER,
+    PRIMARY KEY (grain, dimension, value, period)
+);
+-- the ranges of periods top() sums over
+CREATE INDEX IF NOT EXISTS postings_by_period ON postings (grain, dimension, period);
+CREATE TABLE IF NOT EXISTS lead_times (
+    dimension TEXT, value TEXT, month TEXT, bucket INTEGER, count INTEGER, days INTEGER,
+    PRIMARY KEY (dimension, value, month, bucket)
+);
+"""
+
+
+def covering_grain(start: Optional[str], end: Optional[str]) -> str:
+    """
+    The coarsest grain whose periods start at start and end at end (open ends fit every grain)
+    """
+    start_day = pd.Timestamp(start) if start is not None else None
+    end_day = pd.Timestamp(end) if end is not None else None
+
+    if (start_day is None or start_day.day == 1) and (end_day is None or end_day.is_month_end):
+        return "month"
+    if (start_day is None or start_day.weekday() == 0) and (end_day is None or end_day.weekday() == 6):
+        return "week"
+    return "day"
+
+
+class RollupStore(SqliteFile):
+    """
+    The rollups of the job history: postings per day, week and month by every dimension, and the distribution of the
+    deadline lead time by posting month and every dimension
+    """
+
+    schema = SCHEMA
+
+    def __len__(self) -> int:
+        """
+        Number of jobs counted
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM counted").fetchone()[0]
+
+    def update(self, df: pd.DataFrame, id_column: str = "job_id") -> int:
+        """
+        Adds the jobs of the dataframe that were not counted yet to the rollups, in a single transaction.
+        Returns the number of jobs added
+        """
+        columns = [column for column in [id_column, "posted_on_date", "application_deadline_date", *DIMENSIONS] if column in df.columns]
+        df = df[columns].reset_index(drop=True)
+        df = df[df[id_column].notna()]
+        ids = df[id_column].astype(str)
+        # within the frame the last occurrence wins, like in the history
+        df = df[~ids.duplicated(keep="last")]
+        ids = ids[df.index]
+
+        with self.transaction():
+            new_ids = self._claim(ids.tolist())
+            df = df[ids.isin(new_ids)]
+            if not df.empty:
+                self._add(df)
+
+        return len(df)
+
+    def rebuild(self, chunks: Iterable[pd.DataFrame], id_column: str = "job_id") -> int:
+        """
+        Empties the rollups and counts the chunks (ex: the whole history) again, for when a transformer changed the dates
+        """
+        with self.transaction():
+            for table in ("counted", "postings", "lead_times"):
+                self.connection.execute(f"DELETE FROM {table}")
+
+        return sum(self.update(chunk, id_column=id_column) for chunk in chunks)
+
+    def _claim(self, ids: List[str]) -> Set[str]:
+        """
+        Marks the ids as counted and returns the ones that were not counted before
+        """
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (job_id TEXT PRIMARY KEY)")
+        self.connection.execute("DELETE FROM incoming")
+        self.connection.executemany("INSERT OR IGNORE INTO incoming VALUES (?)", ((job_id,) for job_id in ids))
+
+        new_ids = {
+            row[0] for row in self.connection.execute(
+                "SELECT job_id FROM incoming WHERE job_id NOT IN (SELECT job_id FROM counted)"
+            )
+        }
+        self.connection.execute("INSERT OR IGNORE INTO counted SELECT job_id FROM incoming")
+        return new_ids
+
+    def _add(self, df: pd.DataFrame) -> None:
+        # the jobs without a posting date are left out of the postings and the lead times
+        posted = known_dates(df["posted_on_date"]) if "posted_on_date" in df.columns else pd.Series(pd.NaT, index=df.index)
+        day = posted.dt.normalize()
+        # grouped as dates, only the keys of the groups are formatted
+        periods = {
+            "day": day,
+            "week": day - pd.to_timedelta(day.dt.weekday, unit="D"),
+            "month": day.dt.to_period("M").dt.to_timestamp(),
+        }
+
+        dimensions = {ALL: pd.Series("", index=df.index)}
+        for dimension in DIMENSIONS:
+            if dimension in df.columns:
+                # missing values are counted under ""
+                dimensions[dimension] = df[dimension].astype(object).where(df[dimension].notna(), "")
+
+        rows = []
+        for grain, period in periods.items():
+            for dimension, values in dimensions.items():
+                counts = pd.DataFrame({"value": values, "period": period}).dropna().groupby(["value", "period"]).size()
+                names = counts.index.get_level_values("period").strftime("%Y-%m-%d")
+                rows += [
+                    (grain, dimension, value, name, int(count))
+                    for value, name, count in zip(counts.index.get_level_values("value"), names, counts.to_numpy())
+                ]
+
+        self.connection.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (grain, dimension, value, period) DO UPDATE SET count = count + excluded.count",
+            rows,
+        )
+
+        if "application_deadline_date" not in df.columns:
+            return
+
+        days = (known_dates(df["application_deadline_date"]) - posted).dt.days
+        buckets = pd.cut(days, LEAD_TIME_BINS, right=False, labels=False)
+        month = periods["month"]
+
+        rows = []
+        for dimension, values in dimensions.items():
+            frame = pd.DataFrame({"value": values, "month": month, "bucket": buckets, "days": days}).dropna()
+            stats = frame.groupby(["value", "month", "bucket"])["days"].agg(["size", "sum"])
+            names = stats.index.get_level_values("month").strftime("%Y-%m")
+            rows += [
+                (dimension, value, name, int(bucket), int(count), int(total))
+                for (value, _, bucket), name, count, total in zip(stats.index, names, stats["size"], stats["sum"])
+            ]
+
+        self.connection.executemany(
+            "INSERT INTO lead_times VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (dimension, value, month, bucket) DO UPDATE SET count = count + excluded.count, days = days + excluded.days",
+            rows,
+        )
+
+    @staticmethod
+    def _check(dimension: str, grain: Optional[str] = None) -> None:
+        if dimension != ALL and dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dimension}, expected '{ALL}' or one of {DIMENSIONS}")
+        if grain is not None and grain not in GRAINS:
+            raise ValueError(f"Unknown grain {grain}, expected one of {GRAINS}")
+
+    @staticmethod
+    def _filters(values: Optional[List[str]], start: Optional[str], end: Optional[str], period_column: str) -> tuple[str, list]:
+        clauses, params = [], []
+        if values is not None:
+            clauses.append(f"value IN ({', '.join('?' for _ in values)})")
+            params += list(values)
+        if start is not None:
+            clauses.append(f"{period_column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{period_column} <= ?")
+            params.append(end)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def postings(
+            self,
+            dimension: str = ALL,
+            values: Optional[List[str]] = None,
+            grain: str = "week",
+            start: Optional[str] = None,
+            end: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Postings per period and value of the dimension, for the periods that start between start and end (YYYY-MM-DD,
+        inclusive). A period is named by its first day (the monday of a week). Only the given values when they are set
+        """
+        self._check(dimension, grain)
+        where, params = self._filters(values, start, end, "period")
+
+        return pd.read_sql_query(
+            f"SELECT period, value, count FROM postings WHERE grain = ? AND dimension = ?{where} ORDER BY period, value",
+            self.connection,
+            params=[grain, dimension, *params],
+        )
+
+    def top(
+            self,
+            dimension: str,
+            n: int = 10,
+            start: Optional[str] = None,
+            end: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        The n values of the dimension with the most postings between start and end (YYYY-MM-DD, inclusive).
+        The counts are summed over the coarsest grain whose periods fit the range exactly
+        """
+        self._check(dimension)
+        where, params = self._filters(None, start, end, "period")
+
+        return pd.read_sql_query(
+            f"SELECT value, SUM(count) AS count FROM postings WHERE grain = ? AND dimension = ?{where} "
+            "GROUP BY value ORDER BY count DESC, value LIMIT ?",
+            self.connection,
+            params=[covering_grain(start, end), dimension, *params, n],
+        )
+
+    def lead_times(
+            self,
+            dimension: str = ALL,
+            values: Optional[List[str]] = None,
+            start: Optional[str] = None,
+            end: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Distribution of the days between posting and deadline, for the jobs posted in the months between start and end
+        (YYYY-MM, inclusive). One row per bucket with its count, share and mean days
+        """
+        self._check(dimension)
+        where, params = self._filters(values, start, end, "month")
+
+        df = pd.read_sql_query(
+            f"SELECT bucket, SUM(count) AS count, SUM(days) AS days FROM lead_times WHERE dimension = ?{where} GROUP BY bucket",
+            self.connection,
+            params=[dimension, *params],
+        )
+
+        df = df.set_index("bucket").reindex(range(len(LEAD_TIME_BUCKETS)), fill_value=0)
+        total = df["count"].sum()
+        return pd.DataFrame({
+            "bucket": LEAD_TIME_BUCKETS,
+            "count": df["count"].to_numpy(),
+            "share": (df["count"] / total).round(4).to_numpy() if total else 0.0,
+            "mean_days": (df["days"] / df["count"].where(df["count"] > 0)).round(1).to_numpy(),
+        })
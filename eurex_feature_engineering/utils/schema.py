@@ -0,0 +1,147 @@
+"""
+This module is the schema of the job history in memory. Read as plain csv every column is a python object string, the
+schema keeps the columns with few distinct values (job_type, job_country, ...) as categoricals, the other text as
+arrow backed strings (when pyarrow is installed), the dates as datetime64 and job_id as an integer when every job id
+is a number.
+
+The files on disk do not change, a compact frame writes the same csv, parquet and sqlite rows as an object one.
+Columns the schema does not know (ex: added by a new transformer) keep their type.
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from eurex_feature_engineering.transformers.processor_1 import DEFAULT_DATE
+from eurex_feature_engineering.utils.feed_reader import read_feed
+
+# a few hundred distinct values for millions of rows, origin_page is a long url that repeats for every job of a page
+CATEGORY_COLUMNS = ["job_type", "job_country", "university", "job_profile", "funding_program", "origin_page"]
+STRING_COLUMNS = [
+    "posted_on", "job_title", "job_link", "job_description", "department", "job_location", "job_field",
+    "application_deadline",
+]
+DATE_COLUMNS = ["posted_on_date", "application_deadline_date"]
+ID_COLUMN = "job_id"
+
+# job ids that fit in an int64
+NUMERIC_ID = re.compile(r"\d{1,18}")
+
+
+def string_dtype() -> Any:
+    """
+    Arrow backed strings when pyarrow is installed, python object strings otherwise
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return object
+
+    return pd.StringDtype("pyarrow")
+
+
+def _as_strings(values: pd.Series, dtype: Any) -> pd.Series:
+    if values.dtype == dtype:
+        return values
+    # numbers read from a csv column without any text (ex: all empty) are written back as text first
+    return values.astype(object).where(values.notna()).astype(dtype)
+
+
+def compact_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The part of the schema that can be applied to every chunk of a merge on its own: text columns (job_id and the
+    category columns included) become arrow backed strings and the date columns datetime64.
+    Chunks compacted this way can be stacked without their columns falling back to objects
+    """
+    dtype = string_dtype()
+
+    for column in [*CATEGORY_COLUMNS, *STRING_COLUMNS, ID_COLUMN]:
+        if column in df.columns:
+            df[column] = _as_strings(df[column], dtype)
+
+    for column in DATE_COLUMNS:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+
+    return df
+
+
+def known_dates(values: pd.Series) -> pd.Series:
+    """
+    A date column as datetime64 with the dates that are not known missing: values that do not parse, and the
+    DEFAULT_DATE (1901-01-01) TimeExtractors fills in for a missing date
+    """
+    dates = pd.to_datetime(values, errors="coerce")
+    return dates.where(dates != pd.Timestamp(DEFAULT_DATE))
+
+
+def compact_ids(ids: pd.Series) -> pd.Series:
+    """
+    The job ids as integers (Int64, missing ids stay missing) when every one of them is a number, unchanged otherwise
+    """
+    if pd.api.types.is_integer_dtype(ids):
+        return ids
+
+    present = ids.dropna().astype(str)
+    if not present.str.fullmatch(NUMERIC_ID).all():
+        return ids
+
+    return pd.to_numeric(ids.astype(object).where(ids.notna()), errors="coerce").astype("Int64")
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the whole schema to a frame that holds all the rows it will ever hold (ex: the merged history).
+    Categories are only compact on the whole frame, chunks with other categories stack back to objects
+    """
+    df = compact_strings(df)
+
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+
+    if ID_COLUMN in df.columns:
+        df[ID_COLUMN] = compact_ids(df[ID_COLUMN])
+
+    return df
+
+
+def read(path: str, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Reads a history file (csv, compressed csv or parquet, ex: jobs_combined.csv) with the schema applied
+    """
+    dtype = string_dtype()
+    # the text columns are read straight into arrow strings, an object copy of them is never held
+    dtypes: Dict[str, Any] = {column: dtype for column in [*CATEGORY_COLUMNS, *STRING_COLUMNS, ID_COLUMN]}
+    dtypes.update(read_csv_kwargs.pop("dtype", None) or {})
+
+    return compact(read_feed(path, dtype=dtypes, **read_csv_kwargs))
+
+
+def _is_text(values: pd.Series) -> bool:
+    return isinstance(values.dtype, (pd.StringDtype, pd.CategoricalDtype))
+
+
+def memory_report(df: pd.DataFrame, top: Optional[int] = None, as_objects: bool = False) -> Dict[str, Any]:
+    """
+    Memory of the frame in MB (strings counted by their content), in total and per column, largest columns first.
+    With as_objects the arrow string and category columns are measured as the python object strings a plain csv read
+    gives them, one column at a time so that an object copy of the whole frame is never held
+    """
+    if as_objects:
+        usage = pd.Series({
+            column: (df[column].astype(object) if _is_text(df[column]) else df[column]).memory_usage(deep=True, index=False)
+            for column in df.columns
+        }, dtype="int64")
+    else:
+        usage = df.memory_usage(deep=True, index=False)
+    usage = usage.sort_values(ascending=False)
+    columns = usage if top is None else usage.head(top)
+
+    return {
+        "rows": len(df),
+        "total_mb": round(usage.sum() / 1024 ** 2, 2),
+        "columns_mb": {column: round(size / 1024 ** 2, 2) for column, size in columns.items()},
+        "dtypes": {column: "object" if as_objects and _is_text(df[column]) else str(df[column].dtype) for column in columns.index},
+    }
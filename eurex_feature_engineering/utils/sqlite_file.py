@@ -0,0 +1,50 @@
+"""
+The sqlite plumbing the stores of the history share (job_store.py, rollups.py, search.py): one connection in WAL mode,
+explicit transactions and a with block that closes it
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, TypeVar
+
+T = TypeVar("T", bound="SqliteFile")
+
+
+class SqliteFile:
+    """
+    A sqlite file with one connection, created with its directory when missing. The schema of the subclass (if it has
+    one) is run when the file is opened. Transactions are managed explicitly with transaction(), so that schema changes
+    and the rows they belong to commit together
+    """
+
+    schema: Optional[str] = None
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        if self.schema:
+            self.connection.executescript(self.schema)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self: T) -> T:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        self.connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
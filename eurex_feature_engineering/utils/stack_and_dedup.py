@@ -2,21 +2,229 @@
 This module contains the function to stack and dedup the dataframes
 """
 
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
 import pandas as pd
 
-def stack_and_dedup(dfs: list[pd.DataFrame], id_column: str) -> pd.DataFrame:
+# column used internally to remember the position of every row in the stacked frame
+SEQ_COLUMN = "__seq__"
+
+
+def _id_strings(ids: pd.Series) -> pd.Series:
     """
-    Function to stack multiple dataframes and dedup it based on id_column
+    Numeric ids as strings, so that a history read without a dtype (job ids parsed as int64, or float64 with a missing
+    id) still matches the string ids of the transformed daily files. Other ids are returned as they are
+    """
+    if not pd.api.types.is_numeric_dtype(ids):
+        return ids
+    return ids.astype("Int64").astype(str).where(ids.notna())
+
+
+class StreamingDedup:
+    """
+    Stacks dataframes one chunk at a time and keeps only the last occurrence of every id, like
+    pd.concat(dfs, ignore_index=True).drop_duplicates(subset=[id_column], keep="last") but without holding the full stack.
+
+    Which row survives only depends on an index of the position (seq) of the last occurrence of every id. While the rows
+    fit in max_rows_in_memory they are buffered, and rows superseded by a later occurrence are dropped when the buffer is
+    compacted. Beyond that the rows are spilled to disk in the order they came in, and their (id, seq) pairs to hash
+    partitions by id. At the end the partitions are resolved one at a time to the seqs of the last occurrences, and the
+    spilled rows are read back in order keeping only those, so only one chunk of rows is in memory at a time.
+    """
+
+    def __init__(
+            self,
+            id_column: str,
+            max_rows_in_memory: int = 1_000_000,
+            partitions: int = 16,
+            spill_dir: Optional[str] = None
+    ) -> None:
+        self.id_column = id_column
+        self.max_rows_in_memory = max_rows_in_memory
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+
+        self.total_rows = 0
+        self._columns: List[str] = []
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered_rows = 0
+        self._spill_path: Optional[str] = None
+        self._spill_parts = 0
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_path is not None
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Adds the next chunk, its rows come after every row added before it
+        """
+        df = df.reset_index(drop=True)
+        df[self.id_column] = _id_strings(df[self.id_column])
+        self._columns.extend(column for column in df.columns if column not in self._columns)
+        df[SEQ_COLUMN] = range(self.total_rows, self.total_rows + len(df))
+        self.total_rows += len(df)
+
+        df = df.drop_duplicates(subset=[self.id_column], keep="last")
+
+        if self.spilled:
+            self._spill(df)
+            return
+
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+
+        if self._buffered_rows > self.max_rows_in_memory:
+            self._compact()
+            # even without duplicates the buffer is too big, move it to disk
+            if self._buffered_rows > self.max_rows_in_memory // 2:
+                print(f"Spilling {self._buffered_rows} unique rows to disk, their ids to {self.partitions} partitions")
+                self._spill_path = tempfile.mkdtemp(prefix="stack_and_dedup_", dir=self.spill_dir)
+                buffered = self._buffer[0]
+                self._buffer = []
+                self._buffered_rows = 0
+                self._spill(buffered)
+
+    def _compact(self) -> None:
+        """
+        Drops the buffered rows that have a later occurrence
+        """
+        buffered = pd.concat(self._buffer, ignore_index=True)
+        buffered = buffered.drop_duplicates(subset=[self.id_column], keep="last")
+        self._buffer = [buffered]
+        self._buffered_rows = len(buffered)
+
+    def _spill(self, df: pd.DataFrame) -> None:
+        """
+        Appends the rows to the spilled rows and their (id, seq) pairs to the hash partition of their id
+        """
+        df.to_pickle(os.path.join(self._spill_path, f"rows-{self._spill_parts:06d}.pkl"))
+
+        ids = df[[self.id_column, SEQ_COLUMN]]
+        buckets = pd.util.hash_pandas_object(ids[self.id_column], index=False) % self.partitions
+        for bucket, part in ids.groupby(buckets.to_numpy()):
+            part.to_pickle(os.path.join(self._spill_path, f"ids-{bucket}-{self._spill_parts:06d}.pkl"))
+        self._spill_parts += 1
+
+    def _last_seqs(self) -> np.ndarray:
+        """
+        The sorted seqs of the last occurrence of every id, one partition of the index is read at a time
+        """
+        files = sorted(os.listdir(self._spill_path))
+        last = []
+
+        for bucket in range(self.partitions):
+            # the names sort in the order the parts were spilled, so the last occurrence is also the last row here
+            parts = [
+                pd.read_pickle(os.path.join(self._spill_path, name))
+                for name in files if name.startswith(f"ids-{bucket}-")
+            ]
+            if parts:
+                ids = pd.concat(parts, ignore_index=True)
+                last.append(ids.drop_duplicates(subset=[self.id_column], keep="last")[SEQ_COLUMN].to_numpy())
+
+        return np.sort(np.concatenate(last)) if last else np.empty(0, dtype=np.int64)
+
+    def _spilled_rows(self) -> Iterator[pd.DataFrame]:
+        last = self._last_seqs()
+
+        for part in range(self._spill_parts):
+            df = pd.read_pickle(os.path.join(self._spill_path, f"rows-{part:06d}.pkl"))
+            seqs = df[SEQ_COLUMN].to_numpy()
+            if not len(seqs):
+                continue
+            # the seqs of a part are a contiguous range, only that slice of the last seqs is looked at
+            window = last[np.searchsorted(last, seqs.min()):np.searchsorted(last, seqs.max(), side="right")]
+            df = df[np.isin(seqs, window, assume_unique=True)]
+            if len(df):
+                # parts spilled before a chunk added a column miss it
+                yield df.reindex(columns=self._columns + [SEQ_COLUMN])
+
+    def iter_result(self) -> Iterator[pd.DataFrame]:
+        """
+        Yields the deduplicated rows in the order of their last occurrence, indexed by their position in the stack.
+        Once spilled they come back one spilled chunk at a time, so a caller can write them without holding them all
+        """
+        try:
+            if self.spilled:
+                chunks: Iterable[pd.DataFrame] = self._spilled_rows()
+            else:
+                if self._buffer:
+                    self._compact()
+                chunks = self._buffer
+
+            for df in chunks:
+                df.index = pd.Index(df.pop(SEQ_COLUMN).to_numpy())
+                yield df
+        finally:
+            if self.spilled:
+                shutil.rmtree(self._spill_path, ignore_errors=True)
+                self._spill_path = None
+            self._buffer = []
+            self._buffered_rows = 0
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns the deduplicated rows in the order of their last occurrence, indexed by their position in the stack
+        """
+        chunks = list(self.iter_result())
+        return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
+
+def read_csv_chunks(
+        paths: Iterable[str],
+        chunksize: int = 200_000,
+        **read_csv_kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads the csv files one chunk at a time, in order
+    """
+    for path in paths:
+        yield from pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs)
+
+
+def stream_dedup(
+        chunks: Iterable[Union[pd.DataFrame, str]],
+        id_column: str,
+        max_rows_in_memory: int = 1_000_000,
+        partitions: int = 16,
+        spill_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Stacks the chunks (dataframes or csv paths, read in chunks) and keeps the last occurrence of every id
     """
-    
-    df = pd.concat(dfs, ignore_index=True)
-    
-    # Count duplicates based on id_column
-    duplicate_counts = df[id_column].value_counts()
-    print(f"Number of unique IDs: {len(duplicate_counts)}")
-    print(f"Number of duplicate IDs: {len(df) - len(duplicate_counts)}")
-    print(f"Total number of rows: {len(df)}")
-    unique_df = df.drop_duplicates(subset=[id_column],keep="last")
+    dedup = StreamingDedup(
+        id_column=id_column,
+        max_rows_in_memory=max_rows_in_memory,
+        partitions=partitions,
+        spill_dir=spill_dir,
+    )
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            for csv_chunk in read_csv_chunks([chunk], encoding="utf-8"):
+                dedup.add(csv_chunk)
+        else:
+            dedup.add(chunk)
+
+    unique_df = dedup.result()
+
+    # counted like value_counts, missing ids are not counted as an id
+    unique_ids = unique_df[id_column].nunique()
+    print(f"Number of unique IDs: {unique_ids}")
+    print(f"Number of duplicate IDs: {dedup.total_rows - unique_ids}")
+    print(f"Total number of rows: {dedup.total_rows}")
 
     return unique_df
 
+
+def stack_and_dedup(dfs: Iterable[pd.DataFrame], id_column: str) -> pd.DataFrame:
+    """
+    Function to stack multiple dataframes and dedup it based on id_column
+    """
+
+    return stream_dedup(dfs, id_column=id_column)
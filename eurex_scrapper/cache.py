@@ -0,0 +1,20 @@
+"""
+HTTP cache policy of the detail pages, see job_detail_spider.
+"""
+
+from scrapy.extensions.httpcache import RFC2616Policy
+
+
+class RevalidatingPolicy(RFC2616Policy):
+    """
+    RFC2616Policy that never serves a cached page without asking the site: every cached page is revalidated with its
+    ETag (If-None-Match) and Last-Modified (If-Modified-Since), and served from the cache when the site answers 304.
+
+    RFC2616Policy serves pages without a max-age for a tenth of their age since Last-Modified without a request (a page
+    that is months old would not be looked at for weeks), and sends no validators at all for a 'Cache-Control: no-cache'
+    page, which is exactly the page that asks to be revalidated
+    """
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        self._set_conditional_validators(request, cachedresponse)
+        return False
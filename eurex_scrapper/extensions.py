@@ -0,0 +1,74 @@
+# Define here the extensions of this project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import time
+from typing import Any, Dict, List
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from eurex_common.metrics import METRICS_DIR, peak_rss_mb, write_section
+
+
+class RunMetricsExtension:
+    """
+    Writes the metrics of the crawl to the 'crawl' section of the run's metrics file when the spider closes:
+    pages/min, items/page, the download delay the throttle used and the complete scrapy stats
+    """
+
+    def __init__(self, crawler, metrics_dir: str) -> None:
+        self.crawler = crawler
+        self.metrics_dir = metrics_dir
+        self.start = time.perf_counter()
+        self.delays: List[float] = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured
+
+        extension = cls(crawler, crawler.settings.get("METRICS_DIR") or METRICS_DIR)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider) -> None:
+        self.start = time.perf_counter()
+
+    def response_received(self, response, request, spider) -> None:
+        # the delay of the download slot the response came through, as autothrottle has set it at that point.
+        # Responses served without the downloader (ex: snapshot replay) have no slot
+        slot = self.crawler.engine.downloader.slots.get(request.meta.get("download_slot"))
+        if slot is not None:
+            self.delays.append(slot.delay)
+
+    def spider_closed(self, spider, reason) -> None:
+        stats: Dict[str, Any] = self.crawler.stats.get_stats()
+        seconds = time.perf_counter() - self.start
+        pages = stats.get("response_received_count", 0)
+        items = stats.get("item_scraped_count", 0)
+
+        crawl_metrics = {
+            "spider": spider.name,
+            "finish_reason": reason,
+            "seconds": round(seconds, 3),
+            "pages": pages,
+            "items": items,
+            "pages_per_min": round(pages / seconds * 60, 2) if seconds else None,
+            "items_per_page": round(items / pages, 2) if pages else None,
+            "download_delay": {
+                "setting": self.crawler.settings.getfloat("DOWNLOAD_DELAY"),
+                "autothrottle": self.crawler.settings.getbool("AUTOTHROTTLE_ENABLED"),
+                "mean": round(sum(self.delays) / len(self.delays), 3) if self.delays else None,
+                "max": round(max(self.delays), 3) if self.delays else None,
+                "last": round(self.delays[-1], 3) if self.delays else None,
+            },
+            "peak_rss_mb": peak_rss_mb(),
+            "stats": stats,
+        }
+
+        path = write_section("crawl", crawl_metrics, self.metrics_dir)
+        print(f"Crawl metrics written to {path}")
@@ -0,0 +1,118 @@
+"""
+Field definitions of a job card on the euraxess listing pages, shared by every spider, and of the job detail pages.
+
+Each field is defined once and precompiled to an lxml XPath. This is not a single pass over a card: every compiled
+expression is still evaluated on the card element, one per field, only the compilation and the parsel selectors are saved.
+"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+from lxml import etree
+
+JOB_LIST_XPATH = '//*[@id="oe-list-container"]/div[3]/div/ul/li'
+FINAL_PAGE_XPATH = '//*[@id="oe-list-container"]/div[3]/div/nav/ul/li[7]/a/text()'
+
+# (field, xpath, how) - 'first' takes the first match like parsel's .get(), 'join' joins every match with spaces and strips
+# the result, 'link' takes the first match and makes it absolute against the page url
+CARD_FIELDS: List[Tuple[str, str, str]] = [
+    ("job_type", './/div/div[1]/ul/li[1]/span/text()', "first"),
+    ("job_country", './/div/div[1]/ul/li[2]/span/text()', "first"),
+    ("university", './/article/div/ul[1]/li[1]/a/text()', "first"),
+    ("posted_on", './/article/div/ul[1]/li[2]/text()', "first"),
+    ("job_title", './/h3/a/span/text()', "first"),
+    ("job_link", './/h3/a/@href', "link"),
+    ("job_description", './/div[@class="ecl-content-block__description"]/p/text()', "first"),
+    ("department", './/div[contains(@class,"id-Department")]//div[2]/text()', "first"),
+    ("job_location", './/div[contains(@class,"id-Work-Locations")]//div[2]/text()', "first"),
+    ("job_field", './/div[contains(@class,"id-Research-Field")]//text()', "join"),
+    ("job_profile", './/div[contains(@class,"id-Researcher-Profile")]//text()', "join"),
+    ("funding_program", './/div[contains(@class,"id-Funding-Programme")]//a/text()', "first"),
+    ("application_deadline", './/div[contains(@class,"id-Application-Deadline")]//time/text()', "first"),
+]
+
+_job_list = etree.XPath(JOB_LIST_XPATH, smart_strings=False)
+_final_page = etree.XPath(FINAL_PAGE_XPATH, smart_strings=False)
+_compiled_fields = [(name, etree.XPath(xpath, smart_strings=False), how) for name, xpath, how in CARD_FIELDS]
+_posted_on = dict((name, xpath) for name, xpath, how in _compiled_fields)["posted_on"]
+
+
+def cards(response) -> List[Any]:
+    """
+    Returns the lxml elements of the job cards of a listing page
+    """
+    return _job_list(response.selector.root)
+
+
+def posted_on(card) -> Any:
+    """
+    The raw 'Posted on: ...' text of a card, None when it has none
+    """
+    matches = _posted_on(card)
+    return matches[0] if matches else None
+
+
+def final_page_number(response) -> int:
+    """
+    The last page number shown in the pagination of a listing page, 0 when there is none
+    """
+    matches = _final_page(response.selector.root)
+    return int(matches[0].strip()) if matches else 0
+
+
+def extract_card(card, response) -> Dict[str, Any]:
+    """
+    Extracts every field of a card by evaluating each precompiled field XPath on it, the result is the same dict the spiders
+    used to build with one parsel query per field
+    """
+    vacancy_data: Dict[str, Any] = {}
+
+    for name, xpath, how in _compiled_fields:
+        matches = xpath(card)
+        if how == "join":
+            vacancy_data[name] = ' '.join(matches).strip()
+        elif how == "link":
+            vacancy_data[name] = response.urljoin(matches[0] if matches else None)
+        else:
+            vacancy_data[name] = matches[0] if matches else None
+
+    vacancy_data["origin_page"] = response.url
+    return vacancy_data
+
+
+def extract_cards(response) -> Iterator[Dict[str, Any]]:
+    """
+    Extracts every card of a listing page, in page order
+    """
+    for card in cards(response):
+        yield extract_card(card, response)
+
+
+# Sections of a job detail page, (field, heading). The text of a section is everything between its <h2> and the next one
+DETAIL_SECTIONS: List[Tuple[str, str]] = [
+    ("detail_offer_description", "Offer Description"),
+    ("detail_requirements", "Requirements"),
+    ("detail_additional_information", "Additional Information"),
+    ("detail_where_to_apply", "Where to apply"),
+]
+DETAIL_FIELDS = [name for name, _ in DETAIL_SECTIONS] + ["detail_contact_email"]
+
+_section_text = etree.XPath(
+    '//h2[normalize-space()=$heading]/following-sibling::*[not(self::h2)][preceding-sibling::h2[1][normalize-space()=$heading]]//text()',
+    smart_strings=False,
+)
+_contact_emails = etree.XPath('//a[starts-with(@href, "mailto:")]/@href', smart_strings=False)
+
+
+def extract_detail(response) -> Dict[str, str]:
+    """
+    Extracts the sections and the first contact e-mail of a job detail page, a section the page does not have is empty
+    """
+    root = response.selector.root
+    detail: Dict[str, str] = {}
+
+    for name, heading in DETAIL_SECTIONS:
+        detail[name] = ' '.join(text.strip() for text in _section_text(root, heading=heading) if text.strip())
+
+    emails = _contact_emails(root)
+    detail["detail_contact_email"] = emails[0][len("mailto:"):].split("?")[0] if emails else ""
+    return detail
@@ -0,0 +1,177 @@
+"""
+Feed storage and exporters for the files the spiders write.
+
+A feed is written to a .part file next to its target through a large write buffer and is only renamed to the target
+when the spider closes, so a crawl that dies never leaves a half-written file behind. The file name decides the
+compression: .gz is gzip, .zst is zstd (needs the zstandard package), anything else is written as is.
+"""
+
+import gzip
+import io
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+from scrapy.exporters import BaseItemExporter
+from scrapy.extensions.feedexport import FileFeedStorage
+
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def _zstd() -> Any:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd feeds need the zstandard package, install it with `pip install zstandard`") from e
+
+    return zstandard
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("parquet feeds need pyarrow, install it with `pip install pyarrow`") from e
+
+    return pyarrow
+
+
+def compression_of(path: str) -> Optional[str]:
+    return COMPRESSIONS.get(os.path.splitext(path)[1])
+
+
+def part_path(path: str) -> str:
+    return f"{path}.part"
+
+
+def open_feed(
+        path: str,
+        mode: str = "rt",
+        compression: Optional[str] = None
+) -> Any:
+    """
+    Opens a feed file for reading or writing, text modes use utf-8 and no newline translation like the csv module expects.
+    The compression is taken from the file name unless given
+    """
+    compression = compression or compression_of(path)
+    text = "t" in mode
+    binary_mode = mode.replace("t", "").replace("b", "") + "b"
+
+    if compression == "gzip":
+        f = gzip.open(path, binary_mode)
+    elif compression == "zstd":
+        f = _zstd().open(path, binary_mode)
+    else:
+        f = open(path, binary_mode)
+
+    return io.TextIOWrapper(f, encoding="utf-8", newline="") if text else f
+
+
+class FeedFile(io.BufferedWriter):
+    """
+    Buffered writer over the (compressing) stream of a feed. Closing it flushes the buffer, finishes the compressed
+    stream and closes the underlying file
+    """
+
+    def __init__(self, stream: Any, raw: Any, buffer_size: int) -> None:
+        super().__init__(stream, buffer_size)
+        self._raw = raw
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            # also when the exporter closed the stream already, like pyarrow does
+            self._raw.close()
+
+
+class AtomicFileFeedStorage(FileFeedStorage):
+    """
+    Local feed storage that publishes the file with an atomic rename once the spider closes.
+
+    Feeds that are not overwritten start from a copy of the published file and the new rows go after it. A compressed
+    feed then gets a new gzip member or zstd frame, which readers decompress as one stream.
+    """
+
+    def __init__(self, uri, *, feed_options=None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(uri, feed_options=feed_options)
+        self.path = str(self.path)
+        self.part_path = part_path(self.path)
+        self.compression = compression_of(self.path)
+        self.buffer_size = buffer_size
+
+    @classmethod
+    def from_crawler(cls, crawler, uri, *, feed_options=None):
+        return cls(
+            uri,
+            feed_options=feed_options,
+            buffer_size=crawler.settings.getint("FEED_BUFFER_SIZE", DEFAULT_BUFFER_SIZE),
+        )
+
+    def open(self, spider) -> FeedFile:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        if self.write_mode == "ab" and os.path.exists(self.path):
+            shutil.copyfile(self.path, self.part_path)
+            raw = open(self.part_path, "ab")
+        else:
+            raw = open(self.part_path, "wb")
+
+        if self.compression == "gzip":
+            # mtime=0 so that the same rows always give the same bytes
+            stream = gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=6, mtime=0)
+        elif self.compression == "zstd":
+            stream = _zstd().ZstdCompressor(level=3).stream_writer(raw, closefd=False, write_return_read=True)
+        else:
+            stream = raw
+
+        return FeedFile(stream, raw, self.buffer_size)
+
+    def store(self, file) -> None:
+        file.close()
+        os.replace(self.part_path, self.path)
+
+
+class ParquetItemExporter(BaseItemExporter):
+    """
+    Writes the items as a parquet file of string columns, row_group_size items per row group (needs pyarrow).
+
+    The row groups are written as they fill up, so only one row group is held in memory. Parquet files cannot be
+    appended to, so the feed has to be written with 'overwrite': True. Options go in the feed's item_export_kwargs,
+    ex: {'row_group_size': 10000, 'compression': 'zstd'}
+    """
+
+    def __init__(self, file, row_group_size: int = 10_000, compression: str = "snappy", **kwargs):
+        super().__init__(dont_fail=True, **kwargs)
+        self.file = file
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.rows: List[Dict[str, Any]] = []
+        self.writer = None
+        self.schema = None
+
+    def export_item(self, item) -> None:
+        fields = dict(self._get_serialized_fields(item, default_value=None, include_empty=True))
+
+        if self.schema is None:
+            pa = _pyarrow()
+            columns = list(self.fields_to_export or fields.keys())
+            self.schema = pa.schema([(column, pa.string()) for column in columns])
+            self.writer = pa.parquet.ParquetWriter(self.file, self.schema, compression=self.compression)
+
+        self.rows.append(fields)
+        if len(self.rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if self.rows:
+            table = _pyarrow().Table.from_pylist(self.rows, schema=self.schema)
+            self.writer.write_table(table)
+            self.rows = []
+
+    def finish_exporting(self) -> None:
+        if self.writer is not None:
+            self._write_row_group()
+            self.writer.close()
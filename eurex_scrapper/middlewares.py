@@ -3,11 +3,19 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from eurex_scrapper.snapshots import SnapshotStore
+
 
 class EurexScrapperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -101,3 +109,241 @@ class EurexScrapperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class SnapshotMiddleware:
+    # Archives the listing pages the spiders download (SNAPSHOT_ENABLED) or serves them back
+    # from the archive without touching the network (SNAPSHOT_REPLAY).
+    # See eurex_scrapper/snapshots.py for the storage layout.
+
+    def __init__(self, store, url_pattern, archive, replay, replay_until):
+        self.store = store
+        self.url_pattern = re.compile(url_pattern)
+        self.archive = archive
+        self.replay = replay
+        self.replay_entries = store.latest(until=replay_until) if replay else {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        archive = settings.getbool("SNAPSHOT_ENABLED")
+        replay = settings.getbool("SNAPSHOT_REPLAY")
+
+        if not archive and not replay:
+            raise NotConfigured("Snapshots are disabled")
+
+        store = SnapshotStore(settings.get("SNAPSHOT_DIR"), compression=settings.get("SNAPSHOT_COMPRESSION", "gzip"))
+        s = cls(
+            store=store,
+            url_pattern=settings.get("SNAPSHOT_URL_PATTERN"),
+            archive=archive and not replay,
+            replay=replay,
+            replay_until=settings.get("SNAPSHOT_REPLAY_DATE"),
+        )
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        return s
+
+    def process_request(self, request, spider):
+        if not self.replay:
+            return None
+
+        entry = self.replay_entries.get(request.url)
+        if entry is None:
+            spider.crawler.stats.inc_value("snapshot/replay_missing")
+            raise IgnoreRequest(f"No snapshot of {request.url}")
+
+        spider.crawler.stats.inc_value("snapshot/replayed")
+        return self.store.response(entry, request)
+
+    def process_response(self, request, response, spider):
+        if self.archive and response.status == 200 and self.url_pattern.search(response.url):
+            self.store.put(response.url, response.body, encoding=getattr(response, "encoding", "utf-8"))
+            spider.crawler.stats.inc_value("snapshot/archived")
+
+        return response
+
+    def spider_opened(self, spider):
+        if self.replay:
+            spider.logger.info("Replaying %d snapshots from %s" % (len(self.replay_entries), self.store.root))
+        else:
+            spider.logger.info("Archiving listing pages to %s" % self.store.root)
+
+
+class AdaptiveConcurrencyMiddleware:
+    # Sets the concurrency and the download delay of every download slot (one per domain) with AIMD instead of
+    # fixed settings: after every ADAPTIVE_WINDOW responses of a slot without trouble the delay goes down by
+    # ADAPTIVE_DELAY_STEP. Scrapy sends one request per delay to a slot whatever its concurrency, so the concurrency
+    # only goes up by one once the delay is down to 0. A 429, a share of 5xx/download errors above
+    # ADAPTIVE_MAX_ERROR_RATE or a mean latency above ADAPTIVE_TARGET_LATENCY in a window back off by ADAPTIVE_BACKOFF:
+    # the concurrency first while there is no delay, then the delay, and a Retry-After header is kept as the delay.
+    # Both stay within ADAPTIVE_CONCURRENCY_MIN/MAX and ADAPTIVE_DELAY_MIN/MAX. Without ADAPTIVE_DELAY_MIN the floor of
+    # a slot is the delay it started from, so the crawl is never faster than configured. The state of every slot is
+    # kept in the crawl stats under adaptive/<slot>/. It replaces AutoThrottle, which would set the same delays.
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.min_concurrency = max(1, settings.getint("ADAPTIVE_CONCURRENCY_MIN", 1))
+        self.max_concurrency = max(self.min_concurrency, settings.getint("ADAPTIVE_CONCURRENCY_MAX", 4))
+        # None keeps the starting delay of every slot as its floor
+        self.min_delay = settings.getfloat("ADAPTIVE_DELAY_MIN") if settings.get("ADAPTIVE_DELAY_MIN") is not None else None
+        self.max_delay = settings.getfloat("ADAPTIVE_DELAY_MAX", 60.0)
+        self.delay_step = settings.getfloat("ADAPTIVE_DELAY_STEP", 1.0)
+        self.backoff = settings.getfloat("ADAPTIVE_BACKOFF", 0.5)
+        self.window = max(1, settings.getint("ADAPTIVE_WINDOW", 10))
+        self.target_latency = settings.getfloat("ADAPTIVE_TARGET_LATENCY", 5.0)
+        self.max_error_rate = settings.getfloat("ADAPTIVE_MAX_ERROR_RATE", 0.1)
+        self.slots = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured("Adaptive concurrency is disabled")
+        if settings.getbool("SNAPSHOT_REPLAY"):
+            raise NotConfigured("Nothing to adapt to when replaying snapshots")
+
+        s = cls(crawler)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        return s
+
+    def spider_opened(self, spider):
+        # CONCURRENT_REQUESTS caps every slot together, it has to leave room for the ceiling
+        downloader = self.crawler.engine.downloader
+        downloader.total_concurrency = max(downloader.total_concurrency, self.max_concurrency)
+        if self.crawler.settings.getbool("AUTOTHROTTLE_ENABLED"):
+            spider.logger.warning("AUTOTHROTTLE_ENABLED and ADAPTIVE_CONCURRENCY_ENABLED both set the download delay, disable one of them")
+        floor = "the starting delay" if self.min_delay is None else "%.1fs" % self.min_delay
+        spider.logger.info(
+            "Adaptive concurrency between %d and %d requests, delay between %s and %.1fs"
+            % (self.min_concurrency, self.max_concurrency, floor, self.max_delay)
+        )
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get("download_latency")
+        # responses that did not come from the network (ex: snapshot replay) say nothing about the site
+        if latency is None:
+            return response
+
+        state = self.slot_state(request)
+        if state is None:
+            return response
+
+        if response.status == 429 or (response.status == 503 and "Retry-After" in response.headers):
+            self.stats.inc_value(f"adaptive/{state['key']}/throttled")
+            self.decrease(state, retry_after=retry_after_seconds(response.headers.get("Retry-After")))
+            return response
+
+        self.observe(state, latency, error=response.status >= 500)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        state = self.slot_state(request)
+        if state is not None:
+            self.observe(state, request.meta.get("download_latency", 0.0), error=True)
+
+    def slot_state(self, request):
+        key = request.meta.get("download_slot")
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return None
+
+        if key not in self.slots:
+            min_delay = slot.delay if self.min_delay is None else self.min_delay
+            max_delay = max(min_delay, self.max_delay)
+            slot.concurrency = min(max(slot.concurrency, self.min_concurrency), self.max_concurrency)
+            slot.delay = min(max(slot.delay, min_delay), max_delay)
+            self.slots[key] = {
+                "key": key, "slot": slot, "min_delay": min_delay, "max_delay": max_delay,
+                "responses": 0, "errors": 0, "latency": 0.0, "last_decrease": 0.0,
+            }
+            self.publish(self.slots[key])
+
+        return self.slots[key]
+
+    def observe(self, state, latency, error):
+        state["responses"] += 1
+        state["errors"] += int(error)
+        state["latency"] += latency
+        if error:
+            self.stats.inc_value(f"adaptive/{state['key']}/errors")
+
+        if state["responses"] < self.window:
+            return
+
+        error_rate = state["errors"] / state["responses"]
+        mean_latency = state["latency"] / state["responses"]
+        state["responses"] = state["errors"] = 0
+        state["latency"] = 0.0
+        self.stats.set_value(f"adaptive/{state['key']}/latency", round(mean_latency, 3))
+
+        if error_rate > self.max_error_rate or mean_latency > self.target_latency:
+            self.decrease(state)
+        else:
+            self.increase(state)
+
+    def increase(self, state):
+        slot = state["slot"]
+        if slot.delay > state["min_delay"]:
+            slot.delay = max(state["min_delay"], slot.delay - self.delay_step)
+        # with a delay the slot sends one request per delay, more concurrency would not send any more of them
+        elif slot.delay <= 0 and slot.concurrency < self.max_concurrency:
+            slot.concurrency += 1
+        else:
+            return
+
+        self.stats.inc_value(f"adaptive/{state['key']}/increases")
+        self.publish(state)
+
+    def decrease(self, state, retry_after=None):
+        slot = state["slot"]
+        now = time.monotonic()
+        # the requests that were in flight when the first sign of trouble came back report the same trouble, so the
+        # slot is only backed off once per delay + latency, like a window of TCP. A later Retry-After still sets the delay
+        if now - state["last_decrease"] < slot.delay + self.target_latency:
+            if retry_after is not None and retry_after > slot.delay:
+                slot.delay = min(state["max_delay"], retry_after)
+                self.publish(state)
+            return
+        state["last_decrease"] = now
+
+        if slot.delay <= 0 and slot.concurrency > self.min_concurrency and retry_after is None:
+            # without a delay the concurrency is what sets the rate, it backs off before a delay comes back
+            slot.concurrency = max(self.min_concurrency, int(slot.concurrency * self.backoff))
+        else:
+            slot.concurrency = self.min_concurrency
+            slot.delay = min(
+                state["max_delay"],
+                max(state["min_delay"], slot.delay / self.backoff, self.delay_step, retry_after or 0.0),
+            )
+        state["responses"] = state["errors"] = 0
+        state["latency"] = 0.0
+
+        self.stats.inc_value(f"adaptive/{state['key']}/decreases")
+        self.publish(state)
+
+    def publish(self, state):
+        slot = state["slot"]
+        self.stats.set_value(f"adaptive/{state['key']}/concurrency", slot.concurrency)
+        self.stats.set_value(f"adaptive/{state['key']}/delay", round(slot.delay, 3))
+
+
+def retry_after_seconds(value):
+    """
+    The seconds of a Retry-After header, given in seconds or as an HTTP date. None when there is none or it can't be read
+    """
+    if not value:
+        return None
+
+    value = value.decode("latin-1") if isinstance(value, bytes) else value
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
@@ -5,21 +5,113 @@
 
 
 import re
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from scrapy.exceptions import NotConfigured
+from eurex_scrapper.signals import stream_closed
+from twisted.internet import defer, reactor
+from twisted.python.failure import Failure
+
+# These stuffs might break the csv file, therefore we need to remove them
+CLEAN_TABLE = str.maketrans({'\n': ' ', '\r': ' ', '"': None, ',': None})
+WHITESPACE = re.compile(r'\s+')
+# joins the values of a batch so they are translated in one pass
+SEPARATOR = '\x00'
+
 class EurexScrapperPipeline:
     def process_item(self, item, spider):
         return item
 
 class VacancyCleanerPipeline:
+    """
+    Data passes throguh this pipeline before getting saved to the csv file, so we clean it in here.
+
+    Items are held back and cleaned CLEANER_BATCH_SIZE at a time, process_item returns a deferred that fires once the
+    batch is cleaned. A batch that does not fill up is flushed after CLEANER_FLUSH_INTERVAL seconds (the spider cannot
+    go idle while items are pending) and whatever is left is flushed on close_spider. Batches are flushed in order, so
+    the feed gets the items in the same order as before.
+    """
+
+    def __init__(
+            self,
+            batch_size: int = 1,
+            flush_interval: float = 1.0
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: List[Tuple[Dict[str, Any], defer.Deferred]] = []
+        self.flush_call: Optional[Any] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            batch_size=crawler.settings.getint("CLEANER_BATCH_SIZE", 1),
+            flush_interval=crawler.settings.getfloat("CLEANER_FLUSH_INTERVAL", 1.0),
+        )
+
+    def process_item(self, item: Dict[str,str], spider) -> Any:
+        if self.batch_size <= 1:
+            return self.clean_items([item])[0]
+
+        d = defer.Deferred()
+        self.pending.append((item, d))
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_call is None:
+            self.flush_call = reactor.callLater(self.flush_interval, self.flush)
+
+        return d
 
-    def process_item(self, item: Dict[str,str], spider) -> Dict[str,str]:
+    def close_spider(self, spider) -> None:
+        self.flush()
+
+    def flush(self) -> None:
         """
-        Data passes throguh this pipeline before getting saved to the csv file, so we clean it in here
-        """        
-        for key, value in item.items():
-            item[key] = self.clean_text(value)
-        
-        return item
+        Cleans every pending item and hands them on to the feed, in the order they came in
+        """
+        if self.flush_call is not None and self.flush_call.active():
+            self.flush_call.cancel()
+        self.flush_call = None
+
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        try:
+            self.clean_items([item for item, _ in batch])
+        except Exception:
+            failure = Failure()
+            for _, d in batch:
+                d.errback(failure)
+            return
+
+        for item, d in batch:
+            d.callback(item)
+
+    @classmethod
+    def clean_items(cls, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Cleans every field of every item in place, with the same result as clean_text on each value
+        """
+        values = ["" if value is None else value for item in items for value in item.values()]
+        joined = SEPARATOR.join(values)
+
+        if joined.count(SEPARATOR) != len(values) - 1:
+            # a value contains the separator itself, fall back to cleaning one value at a time
+            cleaned = [cls.clean_text(value) for value in values]
+        else:
+            # split() with no separator splits on the same whitespace as \s, so joining the words back collapses and strips in one go
+            cleaned = [' '.join(value.split()) for value in joined.translate(CLEAN_TABLE).split(SEPARATOR)]
+
+        position = 0
+        for item in items:
+            for key in item.keys():
+                item[key] = cleaned[position]
+                position += 1
+
+        return items
 
     @staticmethod
     def clean_text(text: str) -> str:
@@ -28,7 +120,87 @@ class VacancyCleanerPipeline:
         """
         if text is None:
             return ""
-        
-        # These stuffs might break the csv file, therefore we need to remove them
-        text = text.replace('\n', ' ').replace('\r', ' ').replace('"', '').replace(',', '')
-        return re.sub(r'\s+', ' ', text).strip()
\ No newline at end of file
+
+        text = text.translate(CLEAN_TABLE)
+        return WHITESPACE.sub(' ', text).strip()
+
+
+class StreamingHandoffPipeline:
+    """
+    Combined run mode: the cleaned items are collected into dataframes of STREAM_BATCH_SIZE rows, every batch is run
+    through the transformers (run_pipeline) as soon as it fills, and the transformed batches are handed to the merge
+    in the same process when the spider closes (the stream_closed signal). The day's jobs then go from the spider to
+    the history without being written to and parsed back from the daily csv, which becomes an optional side output.
+
+    Only enabled with STREAM_HANDOFF_ENABLED, pandas and the transformers are imported once it is.
+    A batch that fails to transform stops the handoff, the error is sent instead of the batches
+    """
+
+    def __init__(
+            self,
+            crawler,
+            batch_size: int = 5000
+    ) -> None:
+        from eurex_feature_engineering.orchastrator import get_pipeline
+
+        self.crawler = crawler
+        self.batch_size = batch_size
+        self.pipeline = get_pipeline()
+        self.items: List[Dict[str, Any]] = []
+        self.batches: List[Any] = []
+        self.timings: List[Dict[str, Any]] = []
+        self.rows = 0
+        self.seconds = 0.0
+        self.error: Optional[str] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("STREAM_HANDOFF_ENABLED"):
+            raise NotConfigured
+
+        return cls(crawler, batch_size=crawler.settings.getint("STREAM_BATCH_SIZE", 5000))
+
+    def process_item(self, item: Dict[str, Any], spider) -> Any:
+        self.items.append(dict(item))
+
+        if len(self.items) >= self.batch_size:
+            self.transform_batch()
+
+        return item
+
+    def transform_batch(self) -> None:
+        batch, self.items = self.items, []
+        if not batch or self.error is not None:
+            return
+
+        import pandas as pd
+
+        start = time.perf_counter()
+        try:
+            df = pd.DataFrame(batch)
+            # the cleaner leaves missing fields as empty strings, read_csv would read them as NaN
+            df = self.pipeline.run(df.where(df != ""), timings=self.timings)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"Streaming handoff stopped, a batch failed to transform : {self.error}")
+            return
+        finally:
+            self.seconds += time.perf_counter() - start
+
+        self.batches.append(df)
+        self.rows += len(batch)
+
+    def close_spider(self, spider) -> None:
+        self.transform_batch()
+
+        self.crawler.signals.send_catch_log(
+            signal=stream_closed,
+            batches=None if self.error else self.batches,
+            error=self.error,
+            metrics={
+                "rows_in": self.rows,
+                "rows_out": sum(len(batch) for batch in self.batches),
+                "seconds": round(self.seconds, 4),
+                "transformers": self.timings,
+            },
+        )
@@ -12,6 +12,10 @@ BOT_NAME = "eurex_scrapper"
 SPIDER_MODULES = ["eurex_scrapper.spiders"]
 NEWSPIDER_MODULE = "eurex_scrapper.spiders"
 
+# The site the spiders crawl. Point it at the local mock server to try the crawl settings offline
+# (ex: scrapy crawl vacancy_spider_scrape_all -s EURAXESS_BASE_URL=http://127.0.0.1:8765, see benchmarks/mock_server.py)
+EURAXESS_BASE_URL = "https://euraxess.ec.europa.eu"
+
 
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = False
@@ -32,6 +36,7 @@ DEFAULT_REQUEST_HEADERS = {
 
 
 # Enable and configure the AutoThrottle extension (disabled by default)
+# turn it off when ADAPTIVE_CONCURRENCY_ENABLED is on, both set the delays
 AUTOTHROTTLE_ENABLED = True
 #The initial download delay
 AUTOTHROTTLE_START_DELAY = 5
@@ -50,15 +55,118 @@ FEED_EXPORT_ENCODING = "utf-8"
 
 ITEM_PIPELINES = {
    "eurex_scrapper.pipelines.VacancyCleanerPipeline": 100,
+   "eurex_scrapper.pipelines.StreamingHandoffPipeline": 200,
 }
 
+# VacancyCleanerPipeline cleans the items this many at a time, a batch that does not fill up is flushed after CLEANER_FLUSH_INTERVAL seconds
+CLEANER_BATCH_SIZE = 500
+CLEANER_FLUSH_INTERVAL = 1.0
+
+# Combined run (combined_run in config.yaml): StreamingHandoffPipeline turns the cleaned items into dataframes of
+# STREAM_BATCH_SIZE rows, transforms them as they fill and hands them to the merge in the same process. entrypoint.py
+# turns it on for its crawl, it needs pandas and the transformers so it stays off for a plain `scrapy crawl`
+STREAM_HANDOFF_ENABLED = False
+STREAM_BATCH_SIZE = 5000
+
 COOKIES_ENABLED = False
 
+# Local feeds are written to a .part file and renamed into place when the spider closes, see eurex_scrapper/feeds.py.
+# The file name picks the compression (.gz gzip, .zst zstd) and the 'parquet' format writes row groups (needs pyarrow)
+FEED_STORAGES = {
+   "": "eurex_scrapper.feeds.AtomicFileFeedStorage",
+   "file": "eurex_scrapper.feeds.AtomicFileFeedStorage",
+}
+FEED_EXPORTERS = {
+   "parquet": "eurex_scrapper.feeds.ParquetItemExporter",
+}
+FEED_BUFFER_SIZE = 1048576
+
+# The history group_and_merge_data keeps, depending on its storage: jobs_combined.csv, the parquet dataset or the sqlite
+# store (jobs_combined.csv is only exported from the last two with export_csv). The most recently written one is read
+HISTORY_FILES = [
+   "eurex_feature_engineering/output/transformed/jobs_combined.csv",
+   "eurex_feature_engineering/output/transformed/jobs_history",
+   "eurex_feature_engineering/output/transformed/jobs.sqlite",
+]
+
+# Links of the jobs scraped in previous runs, recent_date_vacancy_spider stops paging once a whole page is already known
+KNOWN_JOBS_ENABLED = True
+KNOWN_JOBS_FILE = "eurex_feature_engineering/output/known_job_links.txt.gz"
+# Used to seed the index the first time, when there is no index file yet
+KNOWN_JOBS_SEED_FILES = HISTORY_FILES
+
+# When cutoff_date in config.yaml is in the past, recent_date_vacancy_spider binary searches the last page in range
+# and then fetches the pages up to it this many at a time. The 10s DOWNLOAD_DELAY is divided by it, 2 is about 12 pages/min
+CATCH_UP_ENABLED = True
+CATCH_UP_CONCURRENCY = 2
+
+# vacancy_spider_scrape_all schedules every listing page up front and crawls this many at once. Its 10s DOWNLOAD_DELAY is
+# divided by it, 1 is about 6 pages/min and 4 about 24
+FULL_CRAWL_CONCURRENCY = 1
+FULL_CRAWL_START_PAGE = 0
+# Pages whose jobs were all scraped, an interrupted crawl only requests the pages missing from it
+FULL_CRAWL_CHECKPOINT_FILE = "eurex_feature_engineering/output/jobs_checkpoint.txt"
+
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
    "scrapy_user_agents.middlewares.RandomUserAgentMiddleware": 400,
+   # sees the responses before RetryMiddleware (550) turns a 429/5xx into a retry
+   "eurex_scrapper.middlewares.AdaptiveConcurrencyMiddleware": 900,
+   "eurex_scrapper.middlewares.SnapshotMiddleware": 950,
 }
 
+# AIMD on the concurrency and the delay of every domain, see AdaptiveConcurrencyMiddleware in middlewares.py.
+# DOWNLOAD_DELAY and CONCURRENT_REQUESTS_PER_DOMAIN are where it starts from, within these floors and ceilings.
+# Off by default, enable it with AUTOTHROTTLE_ENABLED = False (ex: -s ADAPTIVE_CONCURRENCY_ENABLED=True -s AUTOTHROTTLE_ENABLED=False)
+ADAPTIVE_CONCURRENCY_ENABLED = False
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 4
+# the delay never goes below the DOWNLOAD_DELAY the spider starts from unless this is set. The concurrency is only raised
+# once the delay is down to 0, so it takes ADAPTIVE_DELAY_MIN = 0 for the concurrency to change anything
+# ADAPTIVE_DELAY_MIN = 0
+ADAPTIVE_DELAY_MAX = 60.0
+# the delay goes down by this much after a window of responses without trouble, at 0 the concurrency goes up by one instead
+ADAPTIVE_DELAY_STEP = 1.0
+ADAPTIVE_WINDOW = 10
+# a window is trouble when its mean latency (seconds) or its share of 5xx and download errors is above these.
+# A 429 (or a 503 with Retry-After) is trouble straight away
+ADAPTIVE_TARGET_LATENCY = 5.0
+ADAPTIVE_MAX_ERROR_RATE = 0.1
+# the concurrency is multiplied and the delay divided by this on trouble
+ADAPTIVE_BACKOFF = 0.5
+
+# job_detail_spider fetches the detail pages of the jobs in the daily files not merged yet (see DETAIL_MANIFEST_FILE)
+# that are not in the history either: the latest of DETAIL_HISTORY_FILES, or before the first merge the first of
+# DETAIL_FULL_CRAWL_FILES that exists, same as the history the merge reads
+DETAIL_DAILY_DIR = "eurex_feature_engineering/output/daily"
+DETAIL_MANIFEST_FILE = "eurex_feature_engineering/output/transformed/manifest.json"
+DETAIL_HISTORY_FILES = HISTORY_FILES
+DETAIL_FULL_CRAWL_FILES = [
+   "eurex_feature_engineering/output/jobs.csv.gz",
+   "eurex_feature_engineering/output/jobs.csv.zst",
+   "eurex_feature_engineering/output/jobs.parquet",
+   "eurex_feature_engineering/output/jobs.csv",
+]
+# the fetched pages are cached here with their ETag/Last-Modified, a page fetched again is revalidated with a conditional request
+DETAIL_CACHE_DIR = "eurex_feature_engineering/output/detail_cache"
+# the detail pages fetched at once, job_detail_spider's 5s DOWNLOAD_DELAY is divided by it, 2 is about 24 pages/min
+DETAIL_CONCURRENCY = 2
+# 0 for no limit
+DETAIL_MAX_JOBS = 0
+
+# Archive of the downloaded listing pages, see eurex_scrapper/snapshots.py
+SNAPSHOT_ENABLED = False
+SNAPSHOT_DIR = "eurex_feature_engineering/output/snapshots"
+# 'gzip' or 'zstd' (needs the zstandard package)
+SNAPSHOT_COMPRESSION = "gzip"
+SNAPSHOT_URL_PATTERN = r"/jobs/search"
+# Serve the requests from the archive instead of the network, optionally as of a fetch date (YYYY-MM-DD)
+SNAPSHOT_REPLAY = False
+SNAPSHOT_REPLAY_DATE = None
+SNAPSHOT_REPLAY_CONCURRENCY = 32
+# A replay writes its feeds and the full crawl checkpoint here, and does not use or update the known job links
+SNAPSHOT_REPLAY_OUTPUT_DIR = "eurex_feature_engineering/output/replay"
+
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 #SPIDER_MIDDLEWARES = {
@@ -69,9 +177,14 @@ DOWNLOADER_MIDDLEWARES = {
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+   "eurex_scrapper.extensions.RunMetricsExtension": 500,
+}
+
+# Crawl metrics (pages/min, items/page, download delay, scrapy stats) go to the run's metrics file in METRICS_DIR,
+# the merge adds its own section to the same file, see eurex_common/metrics.py
+METRICS_ENABLED = True
+METRICS_DIR = "eurex_feature_engineering/output/metrics"
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Signals of this project, sent through crawler.signals like the scrapy ones (scrapy.signals).
+Nothing in here imports twisted, so it can be imported before the crawler process installs its reactor
+"""
+
+# sent by StreamingHandoffPipeline when the spider closes, with the transformed batches, the error that stopped the
+# handoff (None if there was none) and the metrics of the handoff, see entrypoint.py
+stream_closed = object()
@@ -0,0 +1,170 @@
+"""
+A local archive of the listing pages the spiders download, so that they can be extracted again without crawling euraxess.
+
+Bodies are compressed (gzip, or zstd when the zstandard package is installed) and stored by the sha256 of their content,
+so a page that did not change between two fetches is only stored once. index.jsonl records every fetch with its url and date.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from scrapy.http import HtmlResponse, Request
+
+EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+
+def _zstd() -> Any:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd snapshots need the zstandard package, install it with `pip install zstandard`") from e
+
+    return zstandard
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return _zstd().ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return _zstd().ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotStore:
+    """
+    Content addressed store of response bodies with an index by url and fetch date
+    """
+
+    def __init__(
+            self,
+            root: str,
+            compression: str = "gzip"
+    ) -> None:
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unknown snapshot compression {compression}, expected one of {list(EXTENSIONS)}")
+
+        self.root = root
+        self.compression = compression
+        self.index_path = os.path.join(root, "index.jsonl")
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def _object_path(self, digest: str, compression: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.{EXTENSIONS[compression]}")
+
+    def put(
+            self,
+            url: str,
+            body: bytes,
+            encoding: str = "utf-8",
+            fetched_at: Optional[datetime] = None
+    ) -> str:
+        """
+        Stores the body (once per distinct content) and records the fetch in the index. Returns the sha256 of the body
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest, self.compression)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compress(body, self.compression))
+            os.replace(tmp_path, path)
+
+        entry = {
+            "url": url,
+            "fetched_at": (fetched_at or datetime.now()).isoformat(timespec="seconds"),
+            "sha256": digest,
+            "compression": self.compression,
+            "encoding": encoding,
+        }
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+        return digest
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def latest(self, until: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the most recent fetch of every url, optionally only considering fetches on or before the date until (YYYY-MM-DD)
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries():
+            if until and entry["fetched_at"][:10] > until:
+                continue
+            if entry["url"] not in latest or entry["fetched_at"] >= latest[entry["url"]]["fetched_at"]:
+                latest[entry["url"]] = entry
+        return latest
+
+    def body(self, entry: Dict[str, Any]) -> bytes:
+        with open(self._object_path(entry["sha256"], entry["compression"]), "rb") as f:
+            return decompress(f.read(), entry["compression"])
+
+    def response(
+            self,
+            entry: Dict[str, Any],
+            request: Optional[Request] = None
+    ) -> HtmlResponse:
+        """
+        Rebuilds the response of a fetch, this is what the replay mode hands to the spiders
+        """
+        return HtmlResponse(
+            url=entry["url"],
+            body=self.body(entry),
+            encoding=entry.get("encoding", "utf-8"),
+            request=request or Request(entry["url"]),
+        )
+
+    def iter_responses(self, until: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> Iterator[HtmlResponse]:
+        """
+        Yields the latest response of every archived url, handy to run scrape_vacancy_data over the archive in tests
+        """
+        for url, entry in sorted(self.latest(until).items()):
+            yield self.response(entry, Request(url, meta=dict(meta or {})))
+
+
+def _override(settings, name: str, value: Any) -> None:
+    """
+    Sets the setting over the spider's own value and one given on the command line (ex: -s DOWNLOAD_DELAY=2)
+    """
+    from scrapy.settings import SETTINGS_PRIORITIES
+
+    settings.set(name, value, priority=max(settings.getpriority(name) or 0, SETTINGS_PRIORITIES["spider"]))
+
+
+def apply_snapshot_settings(settings) -> None:
+    """
+    Called from the spiders' update_settings. In replay mode nothing goes over the network, so there is no reason to throttle.
+    A replay must not touch what the real crawls read and write: the feeds go to SNAPSHOT_REPLAY_OUTPUT_DIR, the index of
+    known jobs is off (pages it knows would stop the daily spider on page 0) and the full crawl keeps its checkpoint there too
+    """
+    if settings.getbool("SNAPSHOT_REPLAY"):
+        concurrency = settings.getint("SNAPSHOT_REPLAY_CONCURRENCY", 32)
+        _override(settings, "DOWNLOAD_DELAY", 0)
+        _override(settings, "RANDOMIZE_DOWNLOAD_DELAY", False)
+        _override(settings, "AUTOTHROTTLE_ENABLED", False)
+        _override(settings, "CONCURRENT_REQUESTS", concurrency)
+        _override(settings, "CONCURRENT_REQUESTS_PER_DOMAIN", concurrency)
+
+        output_dir = settings.get("SNAPSHOT_REPLAY_OUTPUT_DIR")
+        _override(settings, "FEEDS", {
+            os.path.join(output_dir, os.path.basename(uri)): options
+            for uri, options in settings.getdict("FEEDS").items()
+        })
+        _override(settings, "KNOWN_JOBS_ENABLED", False)
+        _override(settings, "FULL_CRAWL_CHECKPOINT_FILE", os.path.join(output_dir, os.path.basename(settings.get("FULL_CRAWL_CHECKPOINT_FILE"))))
@@ -0,0 +1,92 @@
+"""
+Enriches the new jobs with the fields of their detail page (offer description, requirements, contact e-mail ...).
+
+Only the jobs of the daily files the merge has not processed yet, and that are not in the combined history, are fetched.
+Run it after the daily crawl and before the merge, which joins the details on job_id. The detail pages are cached with
+their ETag/Last-Modified, so fetching a page again (ex: a rerun before the merge) is a conditional request that costs a 304
+"""
+
+import os
+import scrapy
+from datetime import datetime
+from typing import Any, Dict, Generator, List
+from eurex_scrapper import extractors
+from eurex_scrapper.utils import apply_concurrency_budget, latest_history, read_job_links
+from eurex_common.manifest import load_manifest, pending_files
+
+# the feeds the spiders write, same as eurex_feature_engineering/utils/feed_reader.py (not imported, it loads pandas)
+FEED_EXTENSIONS = (".csv", ".csv.gz", ".csv.zst", ".parquet")
+
+
+class JobDetailSpider(scrapy.Spider):
+
+    name = "job_detail_spider"
+
+    date = datetime.today().date().strftime("%Y-%m-%d")
+    custom_settings = {
+        'FEEDS': {
+            f'eurex_feature_engineering/output/details/details_{date}.csv.gz': {
+                'format': 'csv',
+                'overwrite': True,
+                'encoding': 'utf-8',
+                'fields': ['job_link', *extractors.DETAIL_FIELDS, 'detail_fetched_on'],
+            }
+        },
+        'DOWNLOAD_DELAY': 5,
+        'RANDOMIZE_DOWNLOAD_DELAY': True,
+        # the cached pages are revalidated with If-None-Match/If-Modified-Since and served again on a 304, see eurex_scrapper/cache.py
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_POLICY': 'eurex_scrapper.cache.RevalidatingPolicy',
+        'HTTPCACHE_GZIP': True,
+    }
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+
+        # the pages are fetched DETAIL_CONCURRENCY at a time, the 5s delay is divided by it so that the pages per minute go up with it
+        apply_concurrency_budget(settings, settings.getint("DETAIL_CONCURRENCY", 2))
+
+        # an absolute path, a relative HTTPCACHE_DIR would end up in the .scrapy directory of the project
+        settings.set("HTTPCACHE_DIR", os.path.abspath(settings.get("DETAIL_CACHE_DIR")), priority="spider")
+
+    def start_requests(self) -> Generator[scrapy.Request, Any, Any]:
+        links = self.new_job_links()
+        print(f"Fetching the detail pages of {len(links)} new jobs")
+
+        for link in links:
+            yield scrapy.Request(url=link, callback=self.parse_detail, meta={"job_link": link})
+
+    def new_job_links(self) -> List[str]:
+        """
+        The job links of the daily files that are new or changed since the last merge, minus the ones already in the history
+        """
+        settings = self.settings
+        daily_dir = settings.get("DETAIL_DAILY_DIR")
+
+        # the history the merge keeps, or the output of the full crawl when the merge has not written one yet
+        history_file = latest_history(settings.getlist("DETAIL_HISTORY_FILES")) or next(
+            (path for path in settings.getlist("DETAIL_FULL_CRAWL_FILES") if os.path.exists(path)), None
+        )
+        history = set(read_job_links(history_file)) if history_file else set()
+
+        daily_files = sorted(file for file in os.listdir(daily_dir) if file.endswith(FEED_EXTENSIONS)) if os.path.isdir(daily_dir) else []
+        files = pending_files(load_manifest(settings.get("DETAIL_MANIFEST_FILE")), daily_dir, daily_files)
+
+        links: Dict[str, None] = {}
+        for file in files:
+            for link in read_job_links(os.path.join(daily_dir, file)):
+                if link not in history:
+                    links[link] = None
+
+        print(f"{len(links)} new jobs in {len(files)} daily files not merged yet, {len(history)} jobs in the history")
+        links_list = list(links)
+        max_jobs = settings.getint("DETAIL_MAX_JOBS", 0)
+        return links_list[:max_jobs] if max_jobs else links_list
+
+    def parse_detail(self, response) -> Generator[Dict[str, Any], Any, Any]:
+        yield {
+            "job_link": response.meta["job_link"],
+            **extractors.extract_detail(response),
+            "detail_fetched_on": self.date,
+        }
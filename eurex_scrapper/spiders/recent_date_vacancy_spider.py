@@ -3,10 +3,13 @@ Only scrape the data from the Euraxess website which is posted today
 """
 
 import scrapy
-from typing import Dict, Any, Generator, Union
+from typing import Dict, Any, Generator, Optional, Union
 from datetime import datetime
+from scrapy import signals
 from scrapy.exceptions import CloseSpider
-from eurex_scrapper.utils import lower_bound_date_check #type: ignore
+from eurex_scrapper.snapshots import apply_snapshot_settings
+from eurex_scrapper import extractors
+from eurex_scrapper.utils import apply_concurrency_budget, lower_bound_date_check, KnownJobIndex, cutoff_date, parse_posted_on #type: ignore
 class RecentDateSpider(scrapy.Spider):
     """
     This spider is a one time run spider that extracts all the data from the Euraxess website
@@ -26,7 +29,7 @@ class RecentDateSpider(scrapy.Spider):
     date = datetime.today().date().strftime("%Y-%m-%d")
     custom_settings = {
         'FEEDS': {
-            f'eurex_feature_engineering/output/daily/jobs_{date}.csv': {
+            f'eurex_feature_engineering/output/daily/jobs_{date}.csv.gz': {
                 'format': 'csv',
                 'overwrite': True,
                 'encoding': 'utf-8',
@@ -38,6 +41,48 @@ class RecentDateSpider(scrapy.Spider):
         'CONCURRENT_REQUESTS_PER_DOMAIN': 1,
     }
 
+    known_jobs = None
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+
+        # a cutoff in the past means catching up on several days, the pages in range are then fetched CATCH_UP_CONCURRENCY
+        # at a time. The 10s delay is divided by it, otherwise the pages per minute would not change
+        if settings.getbool("CATCH_UP_ENABLED") and cutoff_date() < datetime.today().date():
+            apply_concurrency_budget(settings, settings.getint("CATCH_UP_CONCURRENCY", 1))
+
+        apply_snapshot_settings(settings)
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+
+        spider.base_url = crawler.settings.get("EURAXESS_BASE_URL", spider.base_url)
+        spider.start_urls = [spider.page_url(0)]
+        spider.cutoff = cutoff_date()
+        spider.catch_up = crawler.settings.getbool("CATCH_UP_ENABLED") and spider.cutoff < datetime.today().date()
+        spider.probed_pages = {}
+        spider.seen_links = set()
+
+        # the index of jobs scraped in previous runs is loaded once here and saved when the spider closes
+        if crawler.settings.getbool("KNOWN_JOBS_ENABLED"):
+            spider.known_jobs = KnownJobIndex.load(
+                crawler.settings.get("KNOWN_JOBS_FILE"),
+                seed_files=crawler.settings.getlist("KNOWN_JOBS_SEED_FILES"),
+            )
+            print(f"Loaded {len(spider.known_jobs)} known job links")
+            crawler.signals.connect(spider.save_known_jobs, signal=signals.spider_closed)
+
+        return spider
+
+    def save_known_jobs(self, spider, reason) -> None:
+        self.known_jobs.save()
+        print(f"Saved known job links, {self.known_jobs.added} new this run")
+
+    def page_url(self, page_number: int) -> str:
+        return f"{self.base_url}/jobs/search?sort%5Bname%5D=created&sort%5Bdirection%5D=DESC&page={page_number}"
+
     # let this parse be a metadata extactor, for now the only metadata is the recent date
     def parse(self,
               response
@@ -45,12 +90,19 @@ class RecentDateSpider(scrapy.Spider):
 
         print(f"Parsing page: {response.url}")
 
+        if self.catch_up:
+            # the start url is page 0, so it doubles as the first probe
+            print(f"Catching up to {self.cutoff}, searching for the last page with jobs posted since then")
+            response.meta["page_number"] = 0
+            yield from self.probe_page(response)
+            return
+
         page_number = 0
 
         # we are using a sorted list of pages based on date and therefore if there is a date that is not today, we will stop the entire process
-        next_url = f"{self.base_url}/jobs/search?sort%5Bname%5D=created&sort%5Bdirection%5D=DESC&page={page_number}"
+        next_url = self.page_url(page_number)
 
-        seen_links = []
+        seen_links = set()
 
         # We scrape only the first page here and succussive pages will be scraped in the scrape_vacancy_data method of this class itself (recusrison to avoid infinite while loop)
         yield scrapy.Request(
@@ -73,47 +125,43 @@ class RecentDateSpider(scrapy.Spider):
         seen_links = response.meta.get("seen_links")
 
         # Extracting the vacancy data
-        job_list = response.xpath('//*[@id="oe-list-container"]/div[3]/div/ul/li')
-        
+        job_list = extractors.cards(response)
+
+        # stays True only if every job on this page was already scraped in a previous run
+        page_fully_known = self.known_jobs is not None and len(job_list) > 0
+
         for job in job_list:
             
             # extracting date from each job
-            recent_date = job.xpath('.//article/div/ul[1]/li[2]/text()').get()
+            recent_date = extractors.posted_on(job)
 
             # check if the date is today or not, if not raise and error and gracefully shutdown the spider
             if lower_bound_date_check(recent_date):
 
-                vacancy_data = {
-                "job_type": job.xpath('.//div/div[1]/ul/li[1]/span/text()').get(),
-                "job_country": job.xpath('.//div/div[1]/ul/li[2]/span/text()').get(),
-                "university": job.xpath('.//article/div/ul[1]/li[1]/a/text()').get(),
-                "posted_on": job.xpath('.//article/div/ul[1]/li[2]/text()').get(),
-                "job_title": job.xpath('.//h3/a/span/text()').get(),
-                "job_link": response.urljoin(job.xpath('.//h3/a/@href').get()),
-                "job_description": job.xpath('.//div[@class="ecl-content-block__description"]/p/text()').get(),
-                "department": job.xpath('.//div[contains(@class,"id-Department")]//div[2]/text()').get(),
-                "job_location": job.xpath('.//div[contains(@class,"id-Work-Locations")]//div[2]/text()').get(),
-                "job_field": ' '.join(job.xpath('.//div[contains(@class,"id-Research-Field")]//text()').getall()).strip(),
-                "job_profile": ' '.join(job.xpath('.//div[contains(@class,"id-Researcher-Profile")]//text()').getall()).strip(),
-                "funding_program": job.xpath('.//div[contains(@class,"id-Funding-Programme")]//a/text()').get(),
-                "application_deadline": job.xpath('.//div[contains(@class,"id-Application-Deadline")]//time/text()').get(),
-                "origin_page": response.url
-            }
+                vacancy_data = extractors.extract_card(job, response)
 
                 if vacancy_data["job_link"] in seen_links:
                     # todo : repeat the same page after some delay instead of throwing an error
                     raise CloseSpider(f"Seen a repeat of job ids at this page link : {response.url}")
                 
-                seen_links.append(vacancy_data["job_link"])
+                seen_links.add(vacancy_data["job_link"])
+
+                if self.known_jobs is not None:
+                    page_fully_known = page_fully_known and vacancy_data["job_link"] in self.known_jobs
+                    self.known_jobs.add(vacancy_data["job_link"])
 
                 yield vacancy_data
 
             else:
                 # raise an error and gracefully shutdown the spider
                 raise CloseSpider(f"Job {recent_date}. Aborting...")
-        
+
+        # the listing is sorted by date, so every page after a fully known one was scraped before as well
+        if page_fully_known:
+            raise CloseSpider(f"Every job on {response.url} was scraped in a previous run. Stopping...")
+
         next_page_number = page_number + 1
-        next_url = f"{self.base_url}/jobs/search?sort%5Bname%5D=created&sort%5Bdirection%5D=DESC&page={next_page_number}"
+        next_url = self.page_url(next_page_number)
 
         # We scrape only the first page here and succussive pages will be scraped in the scrape_vacancy_data method of this class itself (recusrison to avoid infinite while loop)
         yield scrapy.Request(
@@ -123,4 +171,98 @@ class RecentDateSpider(scrapy.Spider):
                 "page_number": next_page_number,
                 "seen_links": seen_links
             }
-        )
\ No newline at end of file
+        )
+
+    def probe_request(self, page_number: int, lo: int, hi: Optional[int]) -> scrapy.Request:
+        return scrapy.Request(
+            url=self.page_url(page_number),
+            callback=self.probe_page,
+            # probes decide what else to fetch, so they go before anything else
+            priority=100,
+            meta={"page_number": page_number, "lo": lo, "hi": hi},
+        )
+
+    def probe_page(self,
+                   response
+                   ) -> Generator[Union[dict[str, Any], scrapy.Request], None, None]:
+        """
+        Looks for the last page that still has a job posted on or after the cutoff, using only the first and last posting date of each page.
+        The listing is sorted by date, so pages are galloped through (1, 2, 4, 8, ...) until one starts before the cutoff and the boundary
+        is then binary searched between the last page known to be in range (lo) and the first one known to be out of range (hi).
+        """
+        page_number = response.meta["page_number"]
+        lo = response.meta.get("lo", -1)
+        hi = response.meta.get("hi")
+
+        job_list = extractors.cards(response)
+        self.probed_pages[page_number] = response
+
+        first_date = parse_posted_on(extractors.posted_on(job_list[0])) if job_list else None
+        last_date = parse_posted_on(extractors.posted_on(job_list[-1])) if job_list else None
+        print(f"Probed page {page_number}: first {first_date}, last {last_date}")
+
+        in_range = first_date is not None and first_date >= self.cutoff
+
+        if in_range and last_date is not None and last_date < self.cutoff:
+            # the cutoff falls inside this page, so it is the boundary
+            yield from self.fetch_catch_up_range(page_number)
+            return
+
+        if in_range:
+            lo = page_number
+            next_page = max(1, page_number * 2) if hi is None else (lo + hi) // 2
+        else:
+            hi = page_number
+            next_page = (lo + hi) // 2
+
+        if hi is not None and hi - lo <= 1:
+            yield from self.fetch_catch_up_range(lo)
+            return
+
+        yield self.probe_request(next_page, lo, hi)
+
+    def fetch_catch_up_range(self,
+                             last_page: int
+                             ) -> Generator[Union[dict[str, Any], scrapy.Request], None, None]:
+        """
+        Scrapes pages 0 to last_page, the pages that were already probed are not downloaded again
+        """
+        print(f"Found the boundary at page {last_page} after {len(self.probed_pages)} probes")
+
+        for page_number in range(0, last_page + 1):
+            if page_number in self.probed_pages:
+                yield from self.scrape_catch_up_page(self.probed_pages[page_number])
+            else:
+                yield scrapy.Request(
+                    url=self.page_url(page_number),
+                    callback=self.scrape_catch_up_page,
+                    priority=-page_number,
+                    meta={"page_number": page_number},
+                )
+
+        self.probed_pages = {}
+
+    def scrape_catch_up_page(self,
+                             response
+                             ) -> Generator[dict[str, Any], None, None]:
+        """
+        Scrapes one page of the catch-up range. Pages are fetched concurrently here, so a job older than the cutoff
+        or a job that shifted to another page in the meantime is skipped instead of stopping the spider
+        """
+        print(f"Scraping catch-up page : {response.url}")
+
+        for job in extractors.cards(response):
+
+            if not lower_bound_date_check(extractors.posted_on(job)):
+                continue
+
+            vacancy_data = extractors.extract_card(job, response)
+
+            if vacancy_data["job_link"] in self.seen_links:
+                continue
+            self.seen_links.add(vacancy_data["job_link"])
+
+            if self.known_jobs is not None:
+                self.known_jobs.add(vacancy_data["job_link"])
+
+            yield vacancy_data
@@ -5,8 +5,14 @@ Scraping the vacancy data from the Euraxess website. Use this scrapper to get th
 import scrapy
 from typing import Dict, Any, Generator, Union
 
+import os
 import scrapy.resolver
+from scrapy import signals
 from scrapy.exceptions import CloseSpider
+from eurex_scrapper.snapshots import apply_snapshot_settings
+from eurex_scrapper import extractors
+from eurex_scrapper.feeds import part_path
+from eurex_scrapper.utils import PageCheckpoint, apply_concurrency_budget, rebuild_page_order, recover_orphaned_rows #type: ignore
 
 class VacancySpider(scrapy.Spider):
     """
@@ -23,10 +29,12 @@ class VacancySpider(scrapy.Spider):
         f"{base_url}/jobs/search?page=1"
     ]
 
+    output_file = 'eurex_feature_engineering/output/jobs.csv.gz'
+
     # This is custom FEEDS only for this spider
     custom_settings = {
         'FEEDS': {
-            'eurex_feature_engineering/output/jobs.csv': {
+            output_file: {
                 'format': 'csv',
                 #'overwrite': True,
                 'encoding': 'utf-8',
@@ -36,87 +44,129 @@ class VacancySpider(scrapy.Spider):
         'RANDOMIZE_DOWNLOAD_DELAY': True,
         'CONCURRENT_REQUESTS': 1,
         'CONCURRENT_REQUESTS_PER_DOMAIN': 1,
-    } 
+    }
+
+    checkpoint = None
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+
+        # the concurrency budget comes from FULL_CRAWL_CONCURRENCY (ex: scrapy crawl vacancy_spider_scrape_all -s FULL_CRAWL_CONCURRENCY=4),
+        # the 10s delay is divided by it so that the pages per minute go up with it
+        apply_concurrency_budget(settings, settings.getint("FULL_CRAWL_CONCURRENCY", 1))
+
+        apply_snapshot_settings(settings)
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+
+        spider.base_url = crawler.settings.get("EURAXESS_BASE_URL", spider.base_url)
+        # the feed the crawl writes to, somewhere else in snapshot replay
+        spider.output_file = next(iter(crawler.settings.getdict("FEEDS")), spider.output_file)
+        spider.start_urls = [f"{spider.base_url}/jobs/search?page=1"]
+        # the output is only published when the spider closes, so are the pages of this run
+        spider.checkpoint = PageCheckpoint(crawler.settings.get("FULL_CRAWL_CHECKPOINT_FILE"), defer_writes=True)
+        # a run that was killed before it published left its rows in the .part file, which the feed storage is about
+        # to overwrite. The pages whose rows all made it there are published and committed now
+        spider.checkpoint.recover(recover_orphaned_rows(spider.output_file, spider.checkpoint.orphaned))
+        spider.start_page = crawler.settings.getint("FULL_CRAWL_START_PAGE", 0)
+        spider.final_page_number = None
+        spider.seen_links = set()
+        # engine_stopped fires after the feed exporter has closed the output file on spider_closed
+        crawler.signals.connect(spider.finish_crawl, signal=signals.engine_stopped)
+
+        return spider
 
     # let this parse be a metadata extactor, for now the only metadata is the final number of web pages to scrape
-    def parse(self, 
+    def parse(self,
               response
               ) -> Generator[scrapy.Request, Any, Any]:
 
-        # This is the xpath for final number
-        final_number: str = response.xpath('//*[@id="oe-list-container"]/div[3]/div/nav/ul/li[7]/a/text()').get()
-        final_number_int: int = int(final_number.strip()) if final_number else 0
+        # The final number is the last page shown in the pagination
+        final_number_int: int = extractors.final_page_number(response)
 
         print(f"Final number: {final_number_int}")
         print(f"Parsing page: {response.url}")
-        page_number = 489
-        
-        # We go through every page and scrape the data using scrape_vacancy_data method of this class itself
-        next_url = f"{self.base_url}/jobs/search?page={page_number}"
-        
-        seen_links = []
-        
-        yield scrapy.Request(
-            url=next_url,
-            callback=self.scrape_vacancy_data,
-            meta={
-                "page_number": page_number,
-                "final_page_number": final_number_int,
-                "seen_links": seen_links
-            }
-        )
-            
+
+        self.final_page_number = final_number_int
+
+        pages = [
+            page_number for page_number in range(self.start_page, final_number_int + 1)
+            if page_number not in self.checkpoint
+        ]
+        print(f"Scheduling {len(pages)} pages, {len(self.checkpoint.done)} already done according to the checkpoint")
+
+        # Every page is scheduled up front and the downloader works through them with the configured concurrency.
+        # Earlier pages get a higher priority so the crawl still moves roughly in page order
+        for page_number in pages:
+            yield scrapy.Request(
+                url=f"{self.base_url}/jobs/search?page={page_number}",
+                callback=self.scrape_vacancy_data,
+                priority=-page_number,
+                meta={
+                    "page_number": page_number,
+                    "final_page_number": final_number_int,
+                }
+            )
+
     # This is where individual vacancy data for each page will be scraped
-    def scrape_vacancy_data(self, 
+    def scrape_vacancy_data(self,
                             response
                         ) -> Generator[Union[Dict[str,Any],scrapy.Request], None, None]:
-        
-        
+
+
         print(f"Scraping next page : {response.url}")
-        
+
         page_number = response.meta.get("page_number")
-        final_page_number = response.meta.get("final_page_number")
-        seen_links = response.meta.get("seen_links")
 
         # Extracting the vacancy data
-        job_list = response.xpath('//*[@id="oe-list-container"]/div[3]/div/ul/li')
-        
+        job_list = extractors.cards(response)
+        rows = 0
+
         for job in job_list:
-            vacancy_data = {
-            "job_type": job.xpath('.//div/div[1]/ul/li[1]/span/text()').get(),
-            "job_country": job.xpath('.//div/div[1]/ul/li[2]/span/text()').get(),
-            "university": job.xpath('.//article/div/ul[1]/li[1]/a/text()').get(),
-            "posted_on": job.xpath('.//article/div/ul[1]/li[2]/text()').get(),
-            "job_title": job.xpath('.//h3/a/span/text()').get(),
-            "job_link": response.urljoin(job.xpath('.//h3/a/@href').get()),
-            "job_description": job.xpath('.//div[@class="ecl-content-block__description"]/p/text()').get(),
-            "department": job.xpath('.//div[contains(@class,"id-Department")]//div[2]/text()').get(),
-            "job_location": job.xpath('.//div[contains(@class,"id-Work-Locations")]//div[2]/text()').get(),
-            "job_field": ' '.join(job.xpath('.//div[contains(@class,"id-Research-Field")]//text()').getall()).strip(),
-            "job_profile": ' '.join(job.xpath('.//div[contains(@class,"id-Researcher-Profile")]//text()').getall()).strip(),
-            "funding_program": job.xpath('.//div[contains(@class,"id-Funding-Programme")]//a/text()').get(),
-            "application_deadline": job.xpath('.//div[contains(@class,"id-Application-Deadline")]//time/text()').get(),
-            "origin_page": response.url
-        }
-            
-            if vacancy_data["job_link"] in seen_links:
+            vacancy_data = extractors.extract_card(job, response)
+
+            if vacancy_data["job_link"] in self.seen_links:
                 # todo : repeat the same page after some delay instead of throwing an error
                 raise CloseSpider(f"Seen a repeat of job ids at this page link : {response.url}")
-            
-            seen_links.append(vacancy_data["job_link"])
+
+            self.seen_links.add(vacancy_data["job_link"])
+            rows += 1
 
             yield vacancy_data
-        
-        if page_number < final_page_number:
-            page_number += 1
-            next_url = f"{self.base_url}/jobs/search?page={page_number}"
-            
-            yield scrapy.Request(
-                url=next_url,
-                callback=self.scrape_vacancy_data,
-                meta={
-                    "page_number": page_number,
-                    "final_page_number": final_page_number,
-                    "seen_links": seen_links
-                    }
-            )
\ No newline at end of file
+
+        # only reached when every job of the page was yielded
+        self.checkpoint.mark_done(page_number, rows)
+
+    def finish_crawl(self) -> None:
+        """
+        Commits the pages of this run once the output was published, and once every page is done, puts the rows of the output
+        back in page order
+        """
+        if os.path.exists(part_path(self.output_file)):
+            print(f"{self.output_file} was not published, the next run recovers the pages of this run from its .part file")
+            self.checkpoint.close()
+            return
+
+        self.checkpoint.commit()
+        self.checkpoint.close()
+
+        if self.final_page_number is None:
+            return
+
+        missing = [
+            page_number for page_number in range(self.start_page, self.final_page_number + 1)
+            if page_number not in self.checkpoint
+        ]
+
+        if missing:
+            print(f"{len(missing)} pages are still missing, run the spider again to resume them")
+            return
+
+        rows = rebuild_page_order(self.output_file)
+        print(f"All pages done, rebuilt the page order of {rows} rows in {self.output_file}")
+
+        # the crawl is complete, the next one should request every page again
+        self.checkpoint.clear()
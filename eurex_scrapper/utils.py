@@ -2,9 +2,17 @@
 All the utility code goes here
 """
 from os import name
-from typing import Dict, Any
+from collections import Counter
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+import csv
+import gzip
+import os
+import re
+import shutil
+import zlib
 import yaml
-from datetime import datetime
+from datetime import date, datetime
+from eurex_scrapper.feeds import compression_of, open_feed, part_path
 
 def read_config() -> Dict[Any,Any]:
     
@@ -13,22 +21,339 @@ def read_config() -> Dict[Any,Any]:
     
     return conf_dict
 
-def lower_bound_date_check(date_string:str) -> bool:
+def cutoff_date() -> date:
     """
-    This method checks if the date string is today or not
+    The oldest posting date to scrape, from cutoff_date in config.yaml
     """
     conf = read_config()
-    cutoff = datetime.today().date() if str(str.lower(conf['cutoff_date'])) == 'today' else datetime.strptime(conf['cutoff_date'], '%d-%m-%Y').date()
+    return datetime.today().date() if str(str.lower(conf['cutoff_date'])) == 'today' else datetime.strptime(conf['cutoff_date'], '%d-%m-%Y').date()
 
+def parse_posted_on(date_string:str) -> Optional[date]:
+    """
+    Parses 'Posted on: 12 April 2026' into a date, None when it cannot be parsed
+    """
     try:
         parts = date_string.strip().replace('Posted on:','').strip()
-        date_object = datetime.strptime(parts, '%d %B %Y').date()
-    
+        return datetime.strptime(parts, '%d %B %Y').date()
+
     except Exception as e:
         print(f"Error parsing date string: {date_string} - {e}")
+        return None
+
+def lower_bound_date_check(date_string:str) -> bool:
+    """
+    This method checks if the date string is today or not
+    """
+    cutoff = cutoff_date()
+    date_object = parse_posted_on(date_string)
+
+    if date_object is None:
         return False
     
     return date_object >= cutoff
 
+def apply_concurrency_budget(settings: Any, concurrency: int) -> None:
+    """
+    Lets the spider download concurrency pages at once. Scrapy sends one request per DOWNLOAD_DELAY to a domain
+    whatever its concurrency, so the delay is divided by the concurrency as well: DOWNLOAD_DELAY stays the delay of a
+    one page at a time crawl, and the crawl makes concurrency times as many requests per minute
+    """
+    from scrapy.settings import SETTINGS_PRIORITIES
+
+    concurrency = max(concurrency, 1)
+    # a DOWNLOAD_DELAY given on the command line is divided too
+    priority = max(settings.getpriority("DOWNLOAD_DELAY") or 0, SETTINGS_PRIORITIES["spider"])
+
+    settings.set("CONCURRENT_REQUESTS", concurrency, priority="spider")
+    settings.set("CONCURRENT_REQUESTS_PER_DOMAIN", concurrency, priority="spider")
+    settings.set("DOWNLOAD_DELAY", settings.getfloat("DOWNLOAD_DELAY") / concurrency, priority=priority)
+
+# table of the sqlite store of the merge, see eurex_feature_engineering/utils/job_store.py
+HISTORY_TABLE = "jobs"
+
+def read_job_links(path: str) -> Iterator[str]:
+    """
+    The job_link column of a feed or of the history the merge keeps (csv, compressed csv, parquet file, the parquet
+    dataset directory or the sqlite store), empty links are skipped
+    """
+    if path.endswith(".sqlite"):
+        import sqlite3
+
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            links = [row[0] for row in connection.execute(f"SELECT job_link FROM {HISTORY_TABLE}")]
+        finally:
+            connection.close()
+        yield from (link for link in links if link)
+        return
+
+    if path.endswith(".parquet") or os.path.isdir(path):
+        import pyarrow.dataset
+
+        # a dataset directory is partitioned like posted_month=YYYY-MM, only job_link is read from it
+        dataset = pyarrow.dataset.dataset(path, format="parquet", partitioning="hive")
+        links = dataset.to_table(columns=["job_link"]).column("job_link").to_pylist()
+        yield from (link for link in links if link)
+        return
+
+    # plain csv module, the crawl should not have to load pandas for this
+    csv.field_size_limit(1 << 24)
+    with open_feed(path) as f:
+        yield from (row["job_link"] for row in csv.DictReader(f) if row.get("job_link"))
+
+def _written_at(path: str) -> float:
+    """
+    When a history was last written: the newest file of a dataset directory, the write-ahead log of a sqlite store
+    """
+    if os.path.isdir(path):
+        return max(
+            (os.path.getmtime(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names),
+            default=os.path.getmtime(path),
+        )
+    return max(os.path.getmtime(candidate) for candidate in (path, f"{path}-wal") if os.path.exists(candidate))
+
+def latest_history(paths: Iterable[str]) -> Optional[str]:
+    """
+    The most recently written of the paths that exist, None when none does. The merge keeps its history in one of them
+    depending on its storage, one it does not write to anymore is older than the one it does
+    """
+    existing = [path for path in paths if os.path.exists(path)]
+    return max(existing, key=_written_at, default=None)
+
+class KnownJobIndex:
+    """
+    A set of job links that were already scraped, persisted between runs as a gzipped text file with one link per line.
+    When the file does not exist yet it is seeded from the job_link column of the history the merge keeps
+    """
+
+    def __init__(self, path: str, links: Iterable[str] = ()) -> None:
+        self.path = path
+        self.links: Set[str] = set(links)
+        self.added = 0
+
+    @classmethod
+    def load(cls, path: str, seed_files: Iterable[str] = ()) -> "KnownJobIndex":
+
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return cls(path, (line.rstrip("\n") for line in f if line.strip()))
+
+        seed = latest_history(seed_files)
+        if seed:
+            return cls(path, read_job_links(seed))
+
+        return cls(path)
+
+    def __contains__(self, link: str) -> bool:
+        return link in self.links
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def add(self, link: str) -> None:
+        if link not in self.links:
+            self.links.add(link)
+            self.added += 1
+
+    def save(self) -> None:
+        """
+        Writes the index to a temp file and swaps it in, so a crash never leaves a truncated index behind
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for link in sorted(self.links):
+                f.write(f"{link}\n")
+        os.replace(tmp_path, self.path)
+
+class PageCheckpoint:
+    """
+    Records the listing pages whose jobs were all yielded, one page number per line.
+    Lines are flushed as they are written so an interrupted crawl can resume the missing pages only.
+
+    With defer_writes the pages are only written by commit(), for feeds that are published when the spider closes:
+    the pages of a run must not be recorded unless its rows were published as well. Until then they go to a .pending
+    file with the number of rows they yielded, so that the pages of a run that is killed before it publishes can be
+    recovered from the .part file of its feed by recover()
+    """
+
+    def __init__(self, path: str, defer_writes: bool = False) -> None:
+        self.path = path
+        self.pending_path = f"{path}.pending"
+        self.defer_writes = defer_writes
+        self.done: Set[int] = set()
+        self.uncommitted: Set[int] = set()
+        # pages of an earlier run that did not commit them, with the number of rows they yielded
+        self.orphaned: Dict[int, int] = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {int(line) for line in f if line.strip()}
+
+        if defer_writes and os.path.exists(self.pending_path):
+            with open(self.pending_path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    # a line cut short by the kill is ignored, its page is crawled again
+                    if len(parts) == 2 and line.endswith("\n"):
+                        self.orphaned[int(parts[0])] = int(parts[1])
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = open(self.pending_path, "a", encoding="utf-8") if defer_writes else None
+
+    def __contains__(self, page_number: int) -> bool:
+        return page_number in self.done
+
+    def mark_done(self, page_number: int, rows: int = 0) -> None:
+        if page_number not in self.done:
+            self.done.add(page_number)
+            if self.defer_writes:
+                self.uncommitted.add(page_number)
+                self._pending.write(f"{page_number} {rows}\n")
+                self._pending.flush()
+            else:
+                self._file.write(f"{page_number}\n")
+                self._file.flush()
+
+    def recover(self, pages: Iterable[int]) -> None:
+        """
+        Commits the orphaned pages whose rows were recovered, the other orphaned pages are forgotten
+        """
+        for page_number in sorted(set(pages) - self.done):
+            self.done.add(page_number)
+            self._file.write(f"{page_number}\n")
+        self._file.flush()
+        self.orphaned = {}
+        self._reset_pending()
+
+    def commit(self) -> None:
+        for page_number in sorted(self.uncommitted):
+            self._file.write(f"{page_number}\n")
+        self._file.flush()
+        self.uncommitted = set()
+        self._reset_pending()
+
+    def _reset_pending(self) -> None:
+        if self._pending is not None:
+            self._pending.close()
+            self._pending = open(self.pending_path, "w", encoding="utf-8")
+
+    def close(self) -> None:
+        self._file.close()
+        if self._pending is not None:
+            self._pending.close()
+
+    def clear(self) -> None:
+        """
+        Removes the checkpoint file, the next crawl starts from scratch
+        """
+        self.close()
+        self.done = set()
+        self.uncommitted = set()
+        for path in (self.path, self.pending_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+PAGE_NUMBER_RE = re.compile(r"[?&]page=(\d+)")
+
+def page_number_of(url: str) -> int:
+    """
+    Returns the page query parameter of a listing url, -1 when it has none
+    """
+    match = PAGE_NUMBER_RE.search(url or "")
+    return int(match.group(1)) if match else -1
+
+def _read_records(path: str, compression: Optional[str]) -> Tuple[List[List[str]], bool]:
+    """
+    The csv records of a feed that may have been cut short, and whether it was read to a clean end. A compressed
+    stream that was cut raises before the line it cut is returned, a plain file that was cut ends without a newline
+    """
+    records: List[List[str]] = []
+    try:
+        with open_feed(path, "rt", compression) as f:
+            records.extend(csv.reader(f))
+    except (EOFError, OSError, zlib.error, csv.Error, UnicodeDecodeError):
+        return records, False
+
+    if compression is None and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return records, f.read(1) == b"\n"
+    return records, True
+
+def recover_orphaned_rows(path: str, pages: Dict[int, int]) -> Set[int]:
+    """
+    Publishes the rows that a crawl killed before it published its csv feed left in the .part file, for the pages that
+    have all of their rows in it. pages are the pages the crawl finished with the number of rows they yielded. The .part
+    starts with a copy of the published feed, the rows after it are the crawl's. Returns the pages that were published,
+    the others have to be crawled again
+    """
+    part = part_path(path)
+    if not os.path.exists(part) or path.endswith(".parquet"):
+        return set()
+
+    csv.field_size_limit(1 << 24)
+    compression = compression_of(path)
+    published, _ = _read_records(path, compression) if os.path.exists(path) else ([], True)
+    records, clean = _read_records(part, compression)
+    if not clean and records:
+        # the last record may have been cut
+        records.pop()
+
+    header = (published or records or [None])[0]
+    new_rows = [record for record in records[len(published):] if record != header]
+    recovered: Set[int] = set()
+
+    if header is not None and "origin_page" in header and new_rows:
+        origin_page = header.index("origin_page")
+        counts = Counter(page_number_of(row[origin_page]) if len(row) > origin_page else -1 for row in new_rows)
+        recovered = {page for page, rows in pages.items() if rows and counts.get(page) == rows}
+        new_rows = [row for row in new_rows if len(row) > origin_page and page_number_of(row[origin_page]) in recovered]
+
+    if recovered:
+        tmp_path = f"{path}.tmp"
+        if published:
+            shutil.copyfile(path, tmp_path)
+        # appended like a resumed crawl appends, a compressed feed gets a new gzip member or zstd frame
+        with open_feed(tmp_path, "at" if published else "wt", compression) as f:
+            writer = csv.writer(f)
+            if not published:
+                writer.writerow(header)
+            writer.writerows(new_rows)
+        os.replace(tmp_path, path)
+
+    print(f"Recovered {len(new_rows)} rows of {len(recovered)} of {len(pages)} pages from {part}")
+    os.remove(part)
+    return recovered
+
+def rebuild_page_order(path: str) -> int:
+    """
+    Rewrites a feed csv so that its rows follow the listing page order (by origin_page), keeping the order of the jobs within a page.
+    Repeated header rows, left behind by crawls that were resumed and appended to the same file, are dropped. Returns the number of rows.
+    Compressed feeds (.gz, .zst) are rewritten with the same compression
+    """
+    csv.field_size_limit(1 << 24)
+
+    with open_feed(path, "rt") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return 0
+        rows = [row for row in reader if row != header]
+
+    origin_page = header.index("origin_page")
+    # sorted is stable, so jobs keep their order within their page
+    rows.sort(key=lambda row: page_number_of(row[origin_page]) if len(row) > origin_page else -1)
+
+    tmp_path = f"{path}.tmp"
+    with open_feed(tmp_path, "wt", compression=compression_of(path)) as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+    return len(rows)
+
 if __name__ == '__main__':
     print(lower_bound_date_check('12 April 2026'))
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os
+import time
+
+import pytest
+
+from benchmarks.synthetic import daily_frame
+from eurex_feature_engineering import main
+from eurex_scrapper import settings
+from eurex_scrapper.utils import KnownJobIndex, latest_history, read_job_links
+
+MERGE_ONLY = {"metrics_dir": None, "details_dir": None, "rollups_file": None, "search_file": None}
+
+
+@pytest.fixture
+def merge_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(main.DAILY_DIR)
+    os.makedirs(os.path.dirname(main.COMBINED_FILE))
+    return tmp_path
+
+
+@pytest.mark.parametrize("storage", ["csv", "parquet", "sqlite"])
+def test_spiders_read_the_history_of_every_storage(merge_dir, storage):
+    jobs = daily_frame(100, seed=3)
+    jobs.to_csv(f"{main.DAILY_DIR}/jobs_2026-10-01.csv", index=False)
+    main.group_and_merge_data(storage=storage, **MERGE_ONLY)
+
+    history = latest_history(settings.HISTORY_FILES)
+    assert history is not None
+    assert set(read_job_links(history)) == set(jobs["job_link"])
+
+    index = KnownJobIndex.load("known_job_links.txt.gz", seed_files=settings.KNOWN_JOBS_SEED_FILES)
+    assert len(index) == jobs["job_link"].nunique()
+
+
+def test_the_latest_written_history_wins(merge_dir):
+    daily_frame(50, seed=1).to_csv(f"{main.DAILY_DIR}/jobs_2026-10-01.csv", index=False)
+    main.group_and_merge_data(**MERGE_ONLY)
+    # a csv left behind by an earlier run with the default storage is older than the store the merge now writes
+    time.sleep(0.05)
+    daily_frame(50, seed=2).to_csv(f"{main.DAILY_DIR}/jobs_2026-10-02.csv", index=False)
+    main.group_and_merge_data(storage="sqlite", **MERGE_ONLY)
+
+    assert latest_history(settings.HISTORY_FILES) == main.SQLITE_FILE
+    assert len(set(read_job_links(main.SQLITE_FILE))) > len(set(read_job_links(main.COMBINED_FILE)))
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import daily_frame
+from eurex_feature_engineering import main
+
+# only the merge itself, the side outputs have their own tests
+MERGE_ONLY = {"metrics_dir": None, "details_dir": None, "rollups_file": None, "search_file": None}
+
+
+@pytest.fixture
+def merge_dir(tmp_path, monkeypatch):
+    """
+    An empty output tree in a scratch directory, the paths of main.py are relative to the working directory
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(main.DAILY_DIR)
+    os.makedirs(os.path.dirname(main.COMBINED_FILE))
+    return tmp_path
+
+
+def read_combined() -> pd.DataFrame:
+    return pd.read_csv(main.COMBINED_FILE, dtype={"job_id": str})
+
+
+@pytest.mark.parametrize("compact_dtypes", [True, False])
+def test_incremental_merge_keeps_one_row_per_job(merge_dir, compact_dtypes):
+    jobs = daily_frame(200, seed=1, duplicate_share=0)
+    jobs.iloc[:150].to_csv(f"{main.DAILY_DIR}/jobs_2026-10-01.csv", index=False)
+
+    # an existing combined csv, written without a manifest
+    main.group_and_merge_data(compact_dtypes=compact_dtypes, **MERGE_ONLY)
+    assert len(read_combined()) == 150
+
+    # the first incremental run re-transforms the history and writes the manifest
+    main.group_and_merge_data(incremental=True, compact_dtypes=compact_dtypes, **MERGE_ONLY)
+    combined = read_combined()
+    assert len(combined) == combined["job_id"].nunique() == 150
+
+    # the second one only reads the combined csv back, 100 of the jobs of the new file are already in it
+    jobs.iloc[50:].to_csv(f"{main.DAILY_DIR}/jobs_2026-10-02.csv", index=False)
+    main.group_and_merge_data(incremental=True, compact_dtypes=compact_dtypes, **MERGE_ONLY)
+    combined = read_combined()
+    assert len(combined) == combined["job_id"].nunique() == 200
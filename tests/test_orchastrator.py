@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from eurex_feature_engineering.basetransformer import BaseTransformer
+from eurex_feature_engineering.orchastrator import Pipeline, plan_stages, transformer_key
+
+
+# is_transformation stays False, the test transformers are not added to the registry of the real pipeline
+class Double(BaseTransformer):
+    inputs = ["a"]
+    outputs = ["b"]
+    version = "1"
+
+    def process(self, df):
+        df["b"] = df["a"] * 2
+        return df
+
+
+class AddOne(BaseTransformer):
+    inputs = ["b"]
+    outputs = ["c"]
+    version = "1"
+
+    def process(self, df):
+        df["c"] = df["b"] + 1
+        return df
+
+
+class OverwriteA(BaseTransformer):
+    inputs = []
+    outputs = ["a"]
+    version = "1"
+
+    def process(self, df):
+        df["a"] = -1
+        return df
+
+
+class Square(BaseTransformer):
+    inputs = ["a"]
+    outputs = ["d"]
+    version = "1"
+
+    def process(self, df):
+        df["d"] = df["a"] ** 2
+        return df
+
+
+class Negate(BaseTransformer):
+    inputs = ["x"]
+    outputs = ["y"]
+    version = "1"
+
+    def process(self, df):
+        df["y"] = -df["x"]
+        return df
+
+
+class Undeclared(BaseTransformer):
+    def process(self, df):
+        df["e"] = 0
+        return df
+
+
+class NeedsMissing(BaseTransformer):
+    inputs = ["missing"]
+    outputs = ["f"]
+
+    def process(self, df):
+        return df
+
+
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({"a": np.arange(10), "x": np.arange(10, 20)})
+
+
+def test_read_after_write_puts_the_reader_in_a_later_stage():
+    stages, dependencies = plan_stages([Double(), AddOne()])
+    assert stages == [[0], [1]]
+    assert dependencies[1] == {0}
+
+
+def test_write_after_read_puts_the_writer_in_a_later_stage():
+    stages, dependencies = plan_stages([Double(), OverwriteA()])
+    assert stages == [[0], [1]]
+    assert dependencies[1] == {0}
+
+
+def test_independent_transformers_share_a_stage():
+    stages, dependencies = plan_stages([Double(), Square(), Negate()])
+    assert stages == [[0, 1, 2]]
+    assert dependencies == {0: set(), 1: set(), 2: set()}
+
+
+def test_an_undeclared_transformer_is_alone_in_its_stage():
+    stages, dependencies = plan_stages([Double(), Undeclared(), Negate()])
+    assert stages == [[0], [1], [2]]
+    assert dependencies[1] == {0}
+    assert dependencies[2] == {1}
+
+
+def test_a_skip_is_invalidated_when_a_dependency_ran_again():
+    pipeline = Pipeline([Double(), AddOne()])
+    df = pipeline.run(frame())
+    up_to_date = {transformer_key(Double): "1", transformer_key(AddOne): "1"}
+
+    assert pipeline.is_up_to_date(0, df, up_to_date, ran=set())
+    assert pipeline.is_up_to_date(1, df, up_to_date, ran=set())
+    # Double ran again, so AddOne has to as well
+    assert not pipeline.is_up_to_date(1, df, up_to_date, ran={0})
+    # a version bump is not up to date either, and neither is a dataframe without the outputs
+    assert not pipeline.is_up_to_date(0, df, {**up_to_date, transformer_key(Double): "0"}, ran=set())
+    assert not pipeline.is_up_to_date(1, df.drop(columns="c"), up_to_date, ran=set())
+
+    # when the history is up to date with AddOne but not with Double, both run
+    timings = []
+    pipeline.run(frame().assign(b=0, c=0), timings=timings, up_to_date={transformer_key(AddOne): "1"})
+    assert [timing.get("skipped", False) for timing in timings] == [False, False]
+
+
+def test_a_missing_input_raises_a_key_error():
+    with pytest.raises(KeyError, match="missing"):
+        Pipeline([NeedsMissing()]).run(frame())
+
+
+def test_outputs_are_copied_back_without_touching_the_inputs():
+    pipeline = Pipeline([Double()])
+    df = frame()
+    part = df[["a"]].copy()
+    result = Double()(part.copy())
+
+    out = pipeline._apply_outputs(Double(), df, part, result)
+    assert out["b"].tolist() == (np.arange(10) * 2).tolist()
+    assert out["a"].tolist() == list(range(10))
+
+    with pytest.raises(ValueError):
+        pipeline._apply_outputs(Double(), frame(), part, result.iloc[:5])
+
+
+def test_threaded_output_matches_sequential_output():
+    transformers = [Double(), Square(), Negate(), AddOne(), Undeclared()]
+    sequential = Pipeline(transformers, threads=1).run(frame())
+    threaded = Pipeline(transformers, threads=4).run(frame())
+
+    pd.testing.assert_frame_equal(threaded, sequential)
+    assert list(sequential.columns) == ["a", "x", "b", "d", "y", "c", "e"]
@@ -0,0 +1,75 @@
+import csv
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from eurex_scrapper.feeds import part_path
+from eurex_scrapper.utils import PageCheckpoint, recover_orphaned_rows
+
+HEADER = ["job_link", "title", "origin_page"]
+
+
+def rows_of(page: int, count: int) -> list:
+    return [[f"https://example.org/jobs/{page}-{i}", f"job {page}-{i}", f"https://example.org/jobs/search?page={page}"] for i in range(count)]
+
+
+def gzip_csv(rows: list) -> bytes:
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return gzip.compress(text.getvalue().encode("utf-8"))
+
+
+@pytest.mark.parametrize("published", [True, False])
+def test_a_killed_crawl_keeps_the_pages_that_reached_the_part_file(tmp_path, published):
+    output_file = str(tmp_path / "jobs.csv.gz")
+    checkpoint_file = str(tmp_path / "jobs_checkpoint.txt")
+
+    published_bytes = b""
+    if published:
+        # page 1 was crawled and published by an earlier run
+        published_bytes = gzip_csv([HEADER] + rows_of(1, 2))
+        with open(output_file, "wb") as f:
+            f.write(published_bytes)
+        with open(checkpoint_file, "w") as f:
+            f.write("1\n")
+
+    # the killed run finished pages 2 to 4, page 4's second row was still in the write buffer and the gzip member
+    # lost its trailer. Page 5's pending line was cut as well
+    killed = gzip_csv([HEADER] + rows_of(2, 3) + rows_of(3, 2) + rows_of(4, 1))[:-8]
+    with open(part_path(output_file), "wb") as f:
+        f.write(published_bytes + killed)
+    with open(f"{checkpoint_file}.pending", "w") as f:
+        f.write("2 3\n3 2\n4 2\n5")
+
+    checkpoint = PageCheckpoint(checkpoint_file, defer_writes=True)
+    assert checkpoint.orphaned == {2: 3, 3: 2, 4: 2}
+
+    checkpoint.recover(recover_orphaned_rows(output_file, checkpoint.orphaned))
+    checkpoint.close()
+
+    expected_pages = {1, 2, 3} if published else {2, 3}
+    assert PageCheckpoint(checkpoint_file, defer_writes=True).done == expected_pages
+    with open(f"{checkpoint_file}.pending") as f:
+        assert f.read() == ""
+
+    jobs = pd.read_csv(output_file)
+    expected_rows = (rows_of(1, 2) if published else []) + rows_of(2, 3) + rows_of(3, 2)
+    assert jobs.values.tolist() == expected_rows
+    assert not (tmp_path / "jobs.csv.gz.part").exists()
+
+
+def test_nothing_to_recover_after_a_published_run(tmp_path):
+    output_file = str(tmp_path / "jobs.csv.gz")
+    checkpoint_file = str(tmp_path / "jobs_checkpoint.txt")
+
+    checkpoint = PageCheckpoint(checkpoint_file, defer_writes=True)
+    checkpoint.mark_done(7, rows=3)
+    checkpoint.commit()
+    checkpoint.close()
+
+    checkpoint = PageCheckpoint(checkpoint_file, defer_writes=True)
+    assert checkpoint.orphaned == {}
+    assert recover_orphaned_rows(output_file, checkpoint.orphaned) == set()
+    assert checkpoint.done == {7}
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import daily_frame
+from eurex_feature_engineering.utils.stack_and_dedup import StreamingDedup, stream_dedup
+
+
+def chunks_with_repeats() -> list:
+    """
+    Daily frames whose job ids repeat within and across the frames, the last one has a column the others do not
+    """
+    chunks = []
+    for seed in range(4):
+        df = daily_frame(120, seed=seed % 2, duplicate_share=0.3)
+        df["job_id"] = df["job_link"].str.rsplit("/", n=1).str[-1]
+        df["seen_on"] = seed
+        chunks.append(df)
+    chunks[-1]["extra"] = "x"
+    # a missing id is one id of its own, like in drop_duplicates
+    chunks[1].loc[5, "job_id"] = np.nan
+    chunks[2].loc[7, "job_id"] = np.nan
+    return chunks
+
+
+def expected(chunks: list) -> pd.DataFrame:
+    return pd.concat(chunks, ignore_index=True).drop_duplicates(subset="job_id", keep="last")
+
+
+@pytest.mark.parametrize("max_rows_in_memory", [1_000_000, 100, 10])
+def test_matches_concat_and_drop_duplicates(max_rows_in_memory, tmp_path):
+    chunks = chunks_with_repeats()
+    dedup = StreamingDedup("job_id", max_rows_in_memory=max_rows_in_memory, partitions=4, spill_dir=str(tmp_path))
+    for chunk in chunks:
+        dedup.add(chunk.copy())
+
+    assert dedup.spilled == (max_rows_in_memory < 1_000_000)
+    pd.testing.assert_frame_equal(dedup.result(), expected(chunks))
+    # the spilled parts are gone once the result was read
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_iter_result_yields_rows_in_order_of_last_occurrence(tmp_path):
+    chunks = chunks_with_repeats()
+    dedup = StreamingDedup("job_id", max_rows_in_memory=10, partitions=4, spill_dir=str(tmp_path))
+    for chunk in chunks:
+        dedup.add(chunk.copy())
+
+    parts = list(dedup.iter_result())
+    assert len(parts) > 1
+    positions = np.concatenate([part.index.to_numpy() for part in parts])
+    assert (np.diff(positions) > 0).all()
+    assert positions.tolist() == expected(chunks).index.tolist()
+
+
+@pytest.mark.parametrize("max_rows_in_memory", [1_000_000, 10])
+def test_stream_dedup_reports_the_same_counts(max_rows_in_memory, capsys):
+    chunks = chunks_with_repeats()
+    stacked = pd.concat(chunks, ignore_index=True)
+    unique_ids = stacked["job_id"].nunique()
+
+    result = stream_dedup([chunk.copy() for chunk in chunks], id_column="job_id", max_rows_in_memory=max_rows_in_memory, partitions=4)
+
+    out = capsys.readouterr().out
+    assert f"Number of unique IDs: {unique_ids}" in out
+    assert f"Number of duplicate IDs: {len(stacked) - unique_ids}" in out
+    assert f"Total number of rows: {len(stacked)}" in out
+    assert len(result) == len(expected(chunks))
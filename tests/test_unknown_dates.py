@@ -0,0 +1,42 @@
+import pytest
+
+from benchmarks.synthetic import daily_frame
+from eurex_feature_engineering.orchastrator import get_pipeline
+from eurex_feature_engineering.utils.rollups import RollupStore
+from eurex_feature_engineering.utils.search import SearchIndex
+
+
+@pytest.fixture
+def jobs():
+    """
+    Transformed jobs, 50 of them without a posting date, which TimeExtractors turns into 1901-01-01
+    """
+    df = daily_frame(200, seed=4, duplicate_share=0)
+    # read from a csv, an empty posted_on is missing
+    df.loc[df.index[:50], "posted_on"] = None
+    return get_pipeline().run(df)
+
+
+def test_rollups_leave_out_the_jobs_without_a_posting_date(jobs, tmp_path):
+    with RollupStore(str(tmp_path / "rollups.sqlite")) as rollups:
+        assert rollups.update(jobs) == 200
+
+        postings = rollups.postings(grain="month")
+        assert not postings["period"].str.startswith("1901").any()
+        assert postings["count"].sum() == 150
+
+        lead_times = rollups.lead_times()
+        assert lead_times["count"].sum() == 150
+        assert lead_times["mean_days"].max() < 365
+
+
+def test_search_does_not_order_or_filter_on_the_default_date(jobs, tmp_path):
+    with SearchIndex(str(tmp_path / "search.sqlite")) as index:
+        index.update(jobs)
+
+        assert len(index.search(posted_to="1950-01-01", limit=1000)) == 0
+        newest = index.search(limit=1000)
+        assert len(newest) == 200
+        # the jobs without a posting date come last, with no date
+        assert newest["posted_on_date"].iloc[-50:].isna().all()
+        assert newest["posted_on_date"].iloc[:150].notna().all()